@@ -1,13 +1,18 @@
 import sys
 sys.path.append(".")
 from datetime import datetime
-from bs4 import BeautifulSoup, Tag
+from typing import Dict, Iterator, List, Tuple
+from bs4 import Tag
 from urllib.parse import urlparse, urlunparse
 
-from utils import get_html_from_url
+from utils import get_html_from_url, find_target, collect_changed, CircuitOpenError, CIRCUIT_OPEN_ERR_CODE, DeadlineExceeded, DEADLINE_ERR_CODE, phase
 from model import News, NewsResponse
 
 
+# 日报正文所在的标签, 该标签结束后即停止下载日报页面
+POST_TARGET = ('div', {'class': 'overflow-hidden space-y-[20px] text-[15px] leading-[25px] break-words mainColor post-content text-wrap'})
+
+
 class AiNewsCrawler:
     def __init__(self, 
                  url: str):
@@ -29,66 +34,91 @@ class AiNewsCrawler:
     
     def get_daily_new_url(self):
         html_text = get_html_from_url(url=self.url)
-        soup = BeautifulSoup(html_text.encode('utf-8'), "html5lib")  # type: ignore
-        # 通过class锚定目标div
-        target_div = soup.find('div', class_="grid grid-cols-1 md:grid-cols-1 md:gap-[16px] gap-[32px] w-full pb-[40px]")
+        with phase("extract"):
+            return self.parse_daily_new_url(html_text) # type: ignore
+    
+    def parse_daily_new_url(self, html_text: str):
+        """解析日报列表页, 返回最新一篇日报的url"""
+        # 通过class锚定目标div, 只解析该div子树
+        target_div = find_target(html_text, 'div', {'class': "grid grid-cols-1 md:grid-cols-1 md:gap-[16px] gap-[32px] w-full pb-[40px]"}) # type: ignore
         # 获取目标div下的跳转链接，这些链接是按照时间顺序倒序排序，选择第一个链接作为今日推送
         daily_a_tag = target_div.find('a') # type: ignore
         base_url = self.get_base_url()
         target_url = base_url + daily_a_tag.get('href', None) # type: ignore
         return target_url
     
-    def get_news(self) -> NewsResponse:
-        try:
-            target_url = self.get_daily_new_url()
-            html_text = get_html_from_url(url=target_url)
-            soup = BeautifulSoup(html_text.encode('utf-8'), "html5lib")  # type: ignore
-            # 通过class锚定目标div
-            class_name = 'overflow-hidden space-y-[20px] text-[15px] leading-[25px] break-words mainColor post-content text-wrap'
-            target_div = soup.find('div', class_=class_name)
-            # 搜集所有p标签, 根据规则筛选重要文本内容
-            p_tags = target_div.find_all('p') # type: ignore
+    def iter_news(self) -> Iterator[News]:
+        """逐条产出日报中的新闻"""
+        target_url = self.get_daily_new_url()
+        html_text = get_html_from_url(url=target_url, until=POST_TARGET)
+        # 日报为单个页面, 先整体解析再逐条产出, 使提取耗时不包含调用方处理每条新闻的时间
+        with phase("extract"):
+            news_list = list(self.parse_daily_news(html_text, target_url)) # type: ignore
+        yield from news_list
+    
+    def collect(self, news_url_dict: Dict[str, str]) -> Tuple[List[News], list]:
+        """获取日报页面并解析其中的全部新闻, 返回(新闻列表, 失败结果)"""
+        news_list = []
+        for target_url in news_url_dict.values():
+            html_text = get_html_from_url(url=target_url, until=POST_TARGET)
+            with phase("extract"):
+                news_list.extend(self.parse_daily_news(html_text, target_url)) # type: ignore
+        return news_list, []
+
+    def parse_daily_news(self, html_text: str, target_url: str) -> Iterator[News]:
+        """解析日报详情页, 逐条产出其中的新闻"""
+        # 通过class锚定目标div, 只解析该div子树
+        target_div = find_target(html_text, *POST_TARGET) # type: ignore
+        # 搜集所有p标签, 根据规则筛选重要文本内容
+        p_tags = target_div.find_all('p') # type: ignore
+        
+        title, texts = "", []
+        for idx, p in enumerate(p_tags):
+            if idx == 0 or idx == 1: # 跳过无用信息
+                continue
             
-            title, texts, news_lst = "", [], []
-            for idx, p in enumerate(p_tags):
-                if idx == 0 or idx == 1: # 跳过无用信息
+            # 获取所有直接子标签(仅一级，不包含嵌套标签)
+            direct_children = [child for child in p.children if isinstance(child, Tag)] # type: ignore
+            # 条件1:仅存在一个strong标签
+            if len(direct_children) > 0 and direct_children[0].name == 'strong': # type: ignore
+                strong_tag = p.find('strong') # type: ignore
+                strong_direct_children = [child for child in strong_tag.children if isinstance(child, Tag)] # type: ignore
+                if len(strong_direct_children) > 0 and strong_direct_children[0].name == 'img': # 跳过图片
                     continue
-                
-                # 获取所有直接子标签(仅一级，不包含嵌套标签)
-                direct_children = [child for child in p.children if isinstance(child, Tag)] # type: ignore
-                # 条件1:仅存在一个strong标签
-                if len(direct_children) > 0 and direct_children[0].name == 'strong': # type: ignore
-                    strong_tag = p.find('strong') # type: ignore
-                    strong_direct_children = [child for child in strong_tag.children if isinstance(child, Tag)] # type: ignore
-                    if len(strong_direct_children) > 0 and strong_direct_children[0].name == 'img': # 跳过图片
-                        continue
-                    if len(texts) > 0:
-                        # 结束上一篇新闻
-                        summary = "".join(texts)
-                        texts = [] # 清空历史记录
-                        today_str = datetime.strftime(datetime.today(), r"%Y-%m-%d")
-                        news = News(title=title, url=target_url, origin="Aibase", summary=summary, publish_date=today_str)
-                        news_lst.append(news)
-                    title = strong_tag.get_text(strip=True) # type: ignore
-                # 条件2:没有子标签
-                else:
-                    text = p.get_text(strip=True) # type: ignore
-                    texts.append(text)
-                
-                if idx == len(p_tags)-1:
-                    # 手动回收最后一个新闻
+                if len(texts) > 0:
+                    # 结束上一篇新闻
                     summary = "".join(texts)
+                    texts = [] # 清空历史记录
                     today_str = datetime.strftime(datetime.today(), r"%Y-%m-%d")
-                    news = News(title=title, url=target_url, origin="Aibase", summary=summary, publish_date=today_str)
-                    news_lst.append(news)
+                    yield News(title=title, url=target_url, origin="Aibase", summary=summary, publish_date=today_str)
+                title = strong_tag.get_text(strip=True) # type: ignore
+            # 条件2:没有子标签
+            else:
+                text = p.get_text(strip=True) # type: ignore
+                texts.append(text)
+            
+            if idx == len(p_tags)-1:
+                # 手动回收最后一个新闻
+                summary = "".join(texts)
+                today_str = datetime.strftime(datetime.today(), r"%Y-%m-%d")
+                yield News(title=title, url=target_url, origin="Aibase", summary=summary, publish_date=today_str)
+    
+    def get_news(self) -> NewsResponse:
+        try:
+            # 最新一篇日报与上次成功爬取相同时直接返回上次的新闻, 不再下载日报页面
+            target_url = self.get_daily_new_url()
+            news_lst, _ = collect_changed(f"{type(self).__name__}:{self.url}", {"日报": target_url}, self.collect)
             
             # 构造最终返回结果 简要和详细内容
             result = NewsResponse(news_list=news_lst) if len(news_lst) > 0 else NewsResponse(news_list=None, status="OK", err_code=None, err_info="未在时效范围内爬取到数据")
+        except CircuitOpenError as e:
+            result = NewsResponse(news_list=None, status='ERROR', err_code=CIRCUIT_OPEN_ERR_CODE, err_info=f'{str(e)}')
+        except DeadlineExceeded as e:
+            result = NewsResponse(news_list=None, status='ERROR', err_code=DEADLINE_ERR_CODE, err_info=f'{str(e)}')
         except Exception as e:
             result = NewsResponse(news_list=None, status='ERROR', err_code='500', err_info=f'{str(e)}')
         return result
 
-
 if __name__ == '__main__':
     url = r'https://news.aibase.com/zh/daily'
     crawler = AiNewsCrawler(url=url)
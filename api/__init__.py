@@ -1,6 +1,10 @@
 from .cctv_news_api import cctv_news_router
 from .ai_news_api import ai_news_router
 from .gov_news_api import gov_news_router
+from .news_api import news_router
+from .metrics_api import metrics_router
+from .backfill_api import backfill_router
+from .diagnostics import RequestTimingMiddleware
 
 
-__all__ = ['cctv_news_router', 'ai_news_router', 'gov_news_router']
+__all__ = ['cctv_news_router', 'ai_news_router', 'gov_news_router', 'news_router', 'metrics_router', 'backfill_router', 'RequestTimingMiddleware']
@@ -0,0 +1,48 @@
+import sys
+sys.path.append(".")
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from model import BackfillResponse
+from service.backfill import backfill_manager, BACKFILL_WORKERS
+
+
+backfill_router = APIRouter()
+
+DATE_PATTERN = r"^\d{4}-\d{2}-\d{2}$"
+
+
+@backfill_router.post("/backfill/{source}", status_code=202)
+async def start_backfill(source: str,
+                         start_date: str = Query(pattern=DATE_PATTERN, description="起始日期, YYYY-MM-DD"),
+                         end_date: Optional[str] = Query(default=None, pattern=DATE_PATTERN, description="结束日期, 默认为当天"),
+                         workers: int = Query(default=BACKFILL_WORKERS, ge=1, le=32, description="同时处理的列表页(或天)数")) -> BackfillResponse:
+    """
+    在后台回填来源在日期范围内的历史新闻并写入文章存储, 立即返回任务进度
+    相同的任务正在执行时返回其进度; 中断的任务再次提交时从检查点继续
+    """
+    try:
+        # 创建爬虫与读取检查点文件不在事件循环中执行
+        return await asyncio.to_thread(backfill_manager.submit, source, start_date, end_date, workers)
+
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Backfill error: {str(e)}"
+        )
+
+
+@backfill_router.get("/backfill/{source}")
+async def get_backfill_status(source: str,
+                              start_date: str = Query(pattern=DATE_PATTERN, description="起始日期, YYYY-MM-DD"),
+                              end_date: Optional[str] = Query(default=None, pattern=DATE_PATTERN, description="结束日期, 默认为当天")) -> BackfillResponse:
+    """
+    查询回填任务的进度, 本进程未执行过该任务时根据检查点返回已完成的页面数
+    """
+    result = await asyncio.to_thread(backfill_manager.status, source, start_date, end_date)
+    if result is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Backfill not found: {source} {start_date}..{end_date or 'today'}"
+        )
+    return result
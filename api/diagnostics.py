@@ -0,0 +1,112 @@
+import sys
+sys.path.append(".")
+import os
+import hmac
+import json
+import logging
+from typing import Iterable, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import PlainTextResponse, Response
+from pydantic import BaseModel
+
+from service import profile_source_news
+from utils import PhaseTimer, timing_scope, phase
+
+
+logger = logging.getLogger(__name__)
+
+# 开启?profile=1所需的令牌, 请求头X-Profile-Token与之一致时才会分析; 未设置时不允许分析
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+# 采样间隔毫秒数
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+
+
+class RequestTimingMiddleware:
+    def __init__(self, app, exclude_paths: Iterable[str] = ("/metrics",)):
+        """
+        为每个请求创建阶段计时器, 响应头中输出Server-Timing, 请求结束后输出一行JSON格式的耗时日志
+
+        流式响应的响应头在首条数据前发出, Server-Timing只包含此前完成的阶段, 日志中为整个请求的耗时
+
+        Args:
+            app: ASGI应用
+            exclude_paths: 不输出耗时日志的路径, 如Prometheus定时抓取的/metrics
+        """
+        super(RequestTimingMiddleware, self).__init__()
+        self.app = app
+        self.exclude_paths = set(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timer.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        with timing_scope() as timer:
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                if scope["path"] not in self.exclude_paths:
+                    self.log(scope, status_code, timer)
+
+    @staticmethod
+    def log(scope, status_code: int, timer: PhaseTimer):
+        record = {"event": "request_timing",
+                  "method": scope["method"],
+                  "path": scope["path"],
+                  "query": scope.get("query_string", b"").decode("latin-1"),
+                  "status": status_code,
+                  "total_ms": round(timer.elapsed() * 1000, 1),
+                  "phases": timer.summary()}
+        logger.info(json.dumps(record, ensure_ascii=False))
+
+
+def json_response(content: BaseModel) -> Response:
+    """序列化响应模型并计入serialize阶段, 与FastAPI按返回值类型序列化的结果一致"""
+    with phase("serialize"):
+        body = content.model_dump_json()
+    return Response(content=body, media_type="application/json")
+
+
+def authorize_profile(request: Request):
+    """
+    检查请求是否允许开启分析
+
+    Raises:
+        HTTPException: 未配置PROFILE_TOKEN或请求头中的令牌不一致时返回403
+    """
+    if not PROFILE_TOKEN:
+        raise HTTPException(status_code=403, detail="Profiling disabled: PROFILE_TOKEN is not configured")
+    token = request.headers.get(PROFILE_TOKEN_HEADER, "")
+    if not hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail=f"Profiling requires a valid {PROFILE_TOKEN_HEADER} header")
+
+
+async def profile_response(request: Request, source: str, timeout: Optional[float] = None) -> PlainTextResponse:
+    """
+    重新爬取来源并返回折叠栈格式的采样结果, 可直接交给flamegraph.pl或speedscope生成火焰图
+    爬取结果的状态与新闻条数在响应头X-Crawl-Status、X-Crawl-Count中返回
+
+    Raises:
+        HTTPException: 请求未获授权
+        CrawlRejectedError: 来源排队任务数达到上限
+    """
+    authorize_profile(request)
+    result, profiler = await profile_source_news(source, timeout=timeout, interval=PROFILE_INTERVAL_MS / 1000)
+    logger.info(f"{source}分析完成, 采样{profiler.samples}次")
+    return PlainTextResponse(profiler.collapsed(),
+                             headers={"X-Crawl-Status": result.status,
+                                      "X-Crawl-Count": str(len(result.news_list or [])),
+                                      "X-Profile-Samples": str(profiler.samples),
+                                      "X-Profile-Interval-Ms": f"{PROFILE_INTERVAL_MS:g}"})
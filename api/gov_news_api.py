@@ -1,52 +1,95 @@
 import sys
 sys.path.append(".")
-from fastapi import APIRouter, HTTPException
-from gov_news import TransportNewsCrawler, CommerceNewsCrawler
+from fastapi import APIRouter, HTTPException, Request
 from model import NewsResponse
+from .streaming import news_streaming_response, StreamFormat
+from .params import TimeoutParam, ProfileParam
+from .diagnostics import json_response, profile_response
+from service import get_source_news, CrawlRejectedError
 
 
 gov_news_router = APIRouter()
 
 
 @gov_news_router.get("/get_transport_gov_news")
-async def get_transport_gov_news() -> NewsResponse:
+async def get_transport_gov_news(request: Request, timeout: TimeoutParam = None, profile: ProfileParam = False) -> NewsResponse:
     """
     获取n-1日的新闻连播内容
     """
     try:
-        # 创建交通部新闻爬取机器人
-        url = r'https://www.mot.gov.cn/jiaotongyaowen/'
-        transport_gov_news_crawler = TransportNewsCrawler(url=url)
+        if profile:
+            # 授权调用方可重新爬取并获取本次爬取的采样分析结果
+            return await profile_response(request, "transport", timeout=timeout)
+        # 优先返回缓存(含后台调度预爬取的结果), 缓存缺失时在爬虫线程池中爬取
+        daily_news = await get_source_news("transport", timeout=timeout)
         
-        # 获取交通部新闻内容数据
-        daily_news = transport_gov_news_crawler.get_news()
-        
-        return daily_news
+        return json_response(daily_news)
         
     except ValueError as e:
         raise HTTPException(
             status_code=404,
             detail=f"Website url error: {str(e)}"
         )
+    except CrawlRejectedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Crawler busy: {str(e)}"
+        )
+
+@gov_news_router.get("/get_transport_gov_news/stream")
+async def stream_transport_gov_news(format: StreamFormat = "ndjson", timeout: TimeoutParam = None):
+    """
+    逐条推送交通部新闻内容, 每解析完一条新闻立即输出
+    format=ndjson时输出换行分隔的JSON, format=sse时输出Server-Sent Events
+    最后一条记录为status, 包含status、err_code、err_info与新闻条数
+    """
+    try:
+        return news_streaming_response("transport", format, timeout=timeout)
+        
+    except CrawlRejectedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Crawler busy: {str(e)}"
+        )
 
 
 @gov_news_router.get("/get_commerce_gov_news")
-async def get_commerce_gov_news() -> NewsResponse:
+async def get_commerce_gov_news(request: Request, timeout: TimeoutParam = None, profile: ProfileParam = False) -> NewsResponse:
     """
     获取n-1日的新闻连播内容
     """
     try:
-        # 创建商务部新闻爬取机器人
-        url = r'https://www.mofcom.gov.cn/'
-        commerce_gov_news_crawler = CommerceNewsCrawler(url=url)
+        if profile:
+            # 授权调用方可重新爬取并获取本次爬取的采样分析结果
+            return await profile_response(request, "commerce", timeout=timeout)
+        # 优先返回缓存(含后台调度预爬取的结果), 缓存缺失时在爬虫线程池中爬取
+        daily_news = await get_source_news("commerce", timeout=timeout)
         
-        # 获取商务部新闻内容数据
-        daily_news = commerce_gov_news_crawler.get_news()
-        
-        return daily_news
+        return json_response(daily_news)
         
     except ValueError as e:
         raise HTTPException(
             status_code=404,
             detail=f"Website url error: {str(e)}"
         )
+    except CrawlRejectedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Crawler busy: {str(e)}"
+        )
+
+@gov_news_router.get("/get_commerce_gov_news/stream")
+async def stream_commerce_gov_news(format: StreamFormat = "ndjson", timeout: TimeoutParam = None):
+    """
+    逐条推送商务部新闻内容, 每解析完一条新闻立即输出
+    format=ndjson时输出换行分隔的JSON, format=sse时输出Server-Sent Events
+    最后一条记录为status, 包含status、err_code、err_info与新闻条数
+    """
+    try:
+        return news_streaming_response("commerce", format, timeout=timeout)
+        
+    except CrawlRejectedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Crawler busy: {str(e)}"
+        )
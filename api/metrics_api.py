@@ -0,0 +1,19 @@
+import sys
+sys.path.append(".")
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from utils import get_metrics_registry
+
+
+metrics_router = APIRouter()
+
+# Prometheus文本格式的Content-Type
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    """
+    以Prometheus文本格式导出抓取、解析、缓存与爬取的指标
+    """
+    return PlainTextResponse(get_metrics_registry().render(), media_type=METRICS_CONTENT_TYPE)
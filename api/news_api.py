@@ -0,0 +1,73 @@
+import sys
+sys.path.append(".")
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from model import AggregatedNewsResponse, NewsResponse
+from service import aggregate_news, resolve_sources, get_source_news, CrawlRejectedError
+from .streaming import news_streaming_response, StreamFormat
+from .params import TimeoutParam, ProfileParam
+from .diagnostics import json_response, profile_response
+
+
+news_router = APIRouter()
+
+
+@news_router.get("/news")
+async def get_news(sources: Optional[str] = Query(default=None, description="逗号分隔的来源, 如cctv,ai,transport,commerce, 为空时获取全部"),
+                   timeout: TimeoutParam = None) -> AggregatedNewsResponse:
+    """
+    并发获取多个来源的新闻并合并, 超时或出错的来源在sources中单独标记
+    """
+    try:
+        source_list = [source.strip() for source in sources.split(",") if source.strip()] if sources else None
+        return json_response(await aggregate_news(source_list, timeout=timeout))
+
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Source error: {str(e)}"
+        )
+
+
+@news_router.get("/news/{source}")
+async def get_single_source_news(request: Request, source: str, timeout: TimeoutParam = None, profile: ProfileParam = False) -> NewsResponse:
+    """
+    获取单个来源的新闻, 包括只在config/sources中以YAML描述的来源
+    """
+    try:
+        resolve_sources([source])
+        if profile:
+            return await profile_response(request, source, timeout=timeout)
+        return json_response(await get_source_news(source, timeout=timeout))
+
+    except ValueError as e:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Source error: {str(e)}"
+        )
+    except CrawlRejectedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Crawler busy: {str(e)}"
+        )
+
+
+@news_router.get("/news/{source}/stream")
+async def stream_single_source_news(source: str, format: StreamFormat = "ndjson", timeout: TimeoutParam = None):
+    """
+    逐条推送单个来源的新闻, 格式与各来源的/stream接口一致
+    """
+    try:
+        resolve_sources([source])
+        return news_streaming_response(source, format, timeout=timeout)
+
+    except ValueError as e:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Source error: {str(e)}"
+        )
+    except CrawlRejectedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Crawler busy: {str(e)}"
+        )
@@ -0,0 +1,11 @@
+import sys
+sys.path.append(".")
+from typing import Annotated, Optional
+
+from fastapi import Query
+
+
+# 各接口共用的请求时限参数, 未指定时使用来源的默认时限
+TimeoutParam = Annotated[Optional[float], Query(gt=0, le=300, description="本次请求的时限(秒), 到达时限后返回已获取的部分结果")]
+# 为True时重新爬取并返回折叠栈格式的采样分析结果, 需在请求头X-Profile-Token中携带PROFILE_TOKEN
+ProfileParam = Annotated[bool, Query(description="返回本次爬取的采样分析结果(折叠栈格式), 需要X-Profile-Token请求头")]
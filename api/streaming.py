@@ -0,0 +1,72 @@
+import sys
+sys.path.append(".")
+import json
+from typing import AsyncIterator, Dict, List, Literal, Optional
+
+from fastapi.responses import StreamingResponse
+
+from model import NewsResponse
+from service import crawl_executor, stream_source_news
+from utils import FetchResult, summarize_failures, CircuitOpenError, CIRCUIT_OPEN_ERR_CODE, DeadlineExceeded, DEADLINE_ERR_CODE, phase
+
+
+StreamFormat = Literal["ndjson", "sse"]
+MEDIA_TYPES: Dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+
+def encode_record(kind: str, data: Dict, stream_format: StreamFormat) -> str:
+    """
+    将一条记录编码为NDJSON行或SSE事件
+
+    NDJSON: {"type": "news", "data": {...}}
+    SSE:    event: news\\ndata: {...}
+    """
+    if stream_format == "sse":
+        return f"event: {kind}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    return json.dumps({"type": kind, "data": data}, ensure_ascii=False) + "\n"
+
+
+async def stream_news_records(source: str, stream_format: StreamFormat, timeout: Optional[float] = None) -> AsyncIterator[str]:
+    """逐条输出news记录, 最后输出一条与NewsResponse字段一致(不含news_list)的status记录"""
+    count, failures = 0, []  # type: int, List[FetchResult]
+    try:
+        async for item in stream_source_news(source, timeout=timeout):
+            if isinstance(item, FetchResult):
+                failures.append(item)
+                continue
+            count += 1
+            with phase("serialize"):
+                record = encode_record("news", item.model_dump(), stream_format)
+            yield record
+        err_info = summarize_failures(failures)
+        if count > 0:
+            status = NewsResponse(news_list=None, err_info=err_info)
+        elif err_info:
+            status = NewsResponse(news_list=None, status="ERROR", err_code="500", err_info=err_info)
+        else:
+            status = NewsResponse(news_list=None, status="OK", err_code=None, err_info="未在时效范围内爬取到数据")
+    except CircuitOpenError as e:
+        status = NewsResponse(news_list=None, status="ERROR", err_code=CIRCUIT_OPEN_ERR_CODE, err_info=f"{str(e)}")
+    except DeadlineExceeded as e:
+        status = NewsResponse(news_list=None, status="ERROR", err_code=DEADLINE_ERR_CODE, err_info=f"{str(e)}")
+    except Exception as e:
+        status = NewsResponse(news_list=None, status="ERROR", err_code="500", err_info=f"{str(e)}")
+    record = status.model_dump(exclude={"news_list"})
+    record["count"] = count
+    yield encode_record("status", record, stream_format)
+
+
+def news_streaming_response(source: str, stream_format: StreamFormat, timeout: Optional[float] = None) -> StreamingResponse:
+    """
+    构造来源的流式响应
+
+    Raises:
+        CrawlRejectedError: 来源排队任务数达到上限, 在开始输出前抛出以便返回503
+    """
+    crawl_executor.check_capacity(source)
+    return StreamingResponse(stream_news_records(source, stream_format, timeout=timeout),
+                             media_type=MEDIA_TYPES[stream_format],
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
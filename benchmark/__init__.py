@@ -0,0 +1,3 @@
+"""
+基准测试模块, 使用录制的页面离线运行
+"""
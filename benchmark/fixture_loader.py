@@ -0,0 +1,20 @@
+"""
+读取benchmark/fixtures中录制的页面
+"""
+import os
+from datetime import datetime, timedelta
+
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_fixture(name: str) -> str:
+    """
+    读取录制的页面, 将{{date:N}}替换为N天前的日期, 使按日期过滤的逻辑在任何一天都得到相同的条目数
+    """
+    with open(os.path.join(FIXTURE_DIR, name), "r", encoding="utf-8") as f:
+        text = f.read()
+    today = datetime.today()
+    for offset in range(7):
+        text = text.replace("{{date:%d}}" % offset, (today - timedelta(days=offset)).strftime(r"%Y-%m-%d"))
+    return text
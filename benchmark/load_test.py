@@ -0,0 +1,232 @@
+"""
+压测脚本: 按目标RPS与并发驱动FastAPI应用, 统计各接口的吞吐量与p50/p95/p99延迟
+
+默认在进程内运行main.app并启动回放源站, 爬虫经URL_REWRITE访问回放源站, 不会请求真实网站;
+指定--url时压测已启动的服务, 此时服务需自行设置URL_REWRITE指向回放源站
+
+Example:
+    python -m benchmark.load_test --rps 20 --duration 30
+    python -m benchmark.load_test --cold --rps 5 --latency 300 --error-rate 0.1
+    python -m benchmark.load_test --url http://127.0.0.1:8000 --endpoints /api/news --rps 50
+"""
+import sys
+sys.path.append(".")
+import os
+import json
+import time
+import asyncio
+import argparse
+import logging
+import statistics
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+
+from benchmark.replay_origin import ReplayOrigin, add_behavior_arguments, behavior_from_args
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_ENDPOINTS = ("/api/get_daily_cctv_news",
+                     "/api/get_daily_ai_news",
+                     "/api/get_transport_gov_news",
+                     "/api/get_commerce_gov_news",
+                     "/api/news")
+DEFAULT_OUTPUT = os.path.join("data", "benchmark", "load_test.json")
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class LoadRecorder:
+    def __init__(self):
+        """按接口记录每个请求的延迟与结果"""
+        super(LoadRecorder, self).__init__()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint: str, latency: float, status: str):
+        self.latencies[endpoint].append(latency)
+        self.statuses[endpoint][status] += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Dict[str, Any]]:
+        """
+        各接口的统计结果, 延迟单位为毫秒
+        延迟从计划发出请求的时间算起, 并发名额不足导致的排队也计入延迟
+        """
+        result = {}
+        for endpoint, latencies in self.latencies.items():
+            statuses = dict(self.statuses[endpoint])
+            ok = statuses.get("200", 0)
+            result[endpoint] = {"requests": len(latencies),
+                                "ok": ok,
+                                "errors": len(latencies) - ok,
+                                "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+                                "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+                                "p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+                                "p99_ms": round(_percentile(latencies, 99) * 1000, 1),
+                                "mean_ms": round(statistics.mean(latencies) * 1000, 1),
+                                "max_ms": round(max(latencies) * 1000, 1),
+                                "statuses": statuses}
+        return result
+
+
+def _status_label(response: httpx.Response) -> str:
+    """HTTP状态码; 200但爬取失败(status为ERROR)时使用响应中的err_code, 以区分缓存兜底与真正成功"""
+    if response.status_code != 200:
+        return str(response.status_code)
+    try:
+        body = response.json()
+    except ValueError:
+        return "200"
+    if isinstance(body, dict) and body.get("status") == "ERROR":
+        return f"200/{body.get('err_code')}"
+    return "200"
+
+
+async def run_load(client: httpx.AsyncClient,
+                   endpoints: Sequence[str],
+                   rps: float,
+                   concurrency: int,
+                   duration: float,
+                   timeout: float) -> Dict[str, Any]:
+    """
+    开环压测: 按固定间隔计划请求, 依次轮询各接口, 同时进行的请求不超过concurrency
+
+    Returns:
+        包含整体与各接口统计结果的字典
+    """
+    recorder = LoadRecorder()
+    semaphore = asyncio.Semaphore(concurrency)
+    total = max(1, int(rps * duration))
+    started_at = time.monotonic()
+
+    async def one(index: int, scheduled_at: float):
+        endpoint = endpoints[index % len(endpoints)]
+        async with semaphore:
+            try:
+                response = await client.get(endpoint, timeout=timeout)
+                status = _status_label(response)
+            except httpx.TimeoutException:
+                status = "timeout"
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+        recorder.record(endpoint, time.monotonic() - scheduled_at, status)
+
+    tasks = []
+    for index in range(total):
+        scheduled_at = started_at + index / rps
+        delay = scheduled_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(index, scheduled_at)))
+    await asyncio.gather(*tasks)
+    elapsed = time.monotonic() - started_at
+
+    endpoints_summary = recorder.summary(elapsed)
+    all_latencies = [latency for latencies in recorder.latencies.values() for latency in latencies]
+    return {"requests": len(all_latencies),
+            "elapsed_s": round(elapsed, 2),
+            "throughput_rps": round(len(all_latencies) / elapsed, 2),
+            "p50_ms": round(_percentile(all_latencies, 50) * 1000, 1),
+            "p95_ms": round(_percentile(all_latencies, 95) * 1000, 1),
+            "p99_ms": round(_percentile(all_latencies, 99) * 1000, 1),
+            "endpoints": endpoints_summary}
+
+
+def _prepare_in_process(origin: ReplayOrigin, cold: bool):
+    """在导入应用前设置环境变量: 改写源站地址、关闭调度器, cold时关闭各级缓存"""
+    os.environ["URL_REWRITE"] = origin.rewrite_env()
+    os.environ["SCHEDULER_ENABLED"] = "0"
+    if cold:
+        os.environ["ARTICLE_STORE_PATH"] = ""
+        os.environ["HTTP_CACHE_DIR"] = ""
+    from utils import set_url_rewrites
+    # 应用可能已被导入, 同时更新进程内的改写规则
+    set_url_rewrites(origin.rewrite_rules())
+
+
+async def _run_in_process(args: argparse.Namespace, endpoints: Sequence[str]) -> Dict[str, Any]:
+    from main import app
+    from service import news_cache
+    if args.cold:
+        # 每个请求都重新爬取, 同一来源同时到达的请求仍只爬取一次
+        news_cache.policies = {source: (0, 0) for source in news_cache.policies}
+        news_cache.default_policy = (0, 0)
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test") as client:
+            return await run_load(client, endpoints, args.rps, args.concurrency, args.duration, args.timeout)
+
+
+async def _run_remote(args: argparse.Namespace, endpoints: Sequence[str]) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits) as client:
+        return await run_load(client, endpoints, args.rps, args.concurrency, args.duration, args.timeout)
+
+
+def format_summary(report: Dict[str, Any]) -> str:
+    lines = [f"{'接口':<34}{'请求':>6}{'错误':>6}{'RPS':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  状态"]
+    for endpoint, item in report["endpoints"].items():
+        statuses = " ".join(f"{status}:{count}" for status, count in sorted(item["statuses"].items()))
+        lines.append(f"{endpoint:<34}{item['requests']:>6}{item['errors']:>6}{item['throughput_rps']:>8.2f}"
+                     f"{item['p50_ms']:>10.1f}{item['p95_ms']:>10.1f}{item['p99_ms']:>10.1f}  {statuses}")
+    lines.append(f"{'合计':<34}{report['requests']:>6}{'':>6}{report['throughput_rps']:>8.2f}"
+                 f"{report['p50_ms']:>10.1f}{report['p95_ms']:>10.1f}{report['p99_ms']:>10.1f}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="FastAPI应用压测")
+    arg_parser.add_argument("--url", default=None, help="压测已启动的服务, 如http://127.0.0.1:8000; 默认在进程内运行main.app")
+    arg_parser.add_argument("--endpoints", default=",".join(DEFAULT_ENDPOINTS), help="逗号分隔的接口路径, 依次轮询")
+    arg_parser.add_argument("--rps", type=float, default=10, help="目标每秒请求数")
+    arg_parser.add_argument("--concurrency", type=int, default=32, help="最大并发请求数")
+    arg_parser.add_argument("--duration", type=float, default=30, help="压测秒数")
+    arg_parser.add_argument("--timeout", type=float, default=60, help="单个请求的超时秒数")
+    arg_parser.add_argument("--cold", action="store_true", help="关闭响应缓存、文章存储与HTTP缓存, 每次请求都经过爬虫")
+    arg_parser.add_argument("--origin-port", type=int, default=0, help="进程内回放源站的端口, 默认随机")
+    arg_parser.add_argument("--output", default=DEFAULT_OUTPUT, help="结果JSON文件路径")
+    add_behavior_arguments(arg_parser)
+    args = arg_parser.parse_args(argv)
+    endpoints = [endpoint.strip() for endpoint in args.endpoints.split(",") if endpoint.strip()]
+
+    origin = None
+    if args.url:
+        report = asyncio.run(_run_remote(args, endpoints))
+    else:
+        behavior, overrides = behavior_from_args(args)
+        origin = ReplayOrigin(port=args.origin_port, behavior=behavior, overrides=overrides, seed=args.seed).start()
+        try:
+            _prepare_in_process(origin, args.cold)
+            report = asyncio.run(_run_in_process(args, endpoints))
+        finally:
+            origin.stop()
+
+    report = {"meta": {"created_at": datetime.now().isoformat(timespec="seconds"),
+                       "target": args.url or "in-process",
+                       "rps": args.rps,
+                       "concurrency": args.concurrency,
+                       "duration": args.duration,
+                       "cold": args.cold},
+              **report}
+    if origin is not None:
+        report["origin"] = origin.snapshot()
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(format_summary(report))
+    if origin is not None:
+        print(f"回放源站请求统计: {json.dumps(report['origin'], ensure_ascii=False)}")
+    print(f"结果已写入{args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""
+离线解析基准测试: 使用benchmark/fixtures中录制的页面, 按页面与解析器统计各爬虫提取逻辑的耗时与内存
+
+Example:
+    python -m benchmark.parse_bench
+    python -m benchmark.parse_bench --cases generic_mot_list,generic_mot_article --parsers lxml --repeat 50
+    python -m benchmark.parse_bench --baseline benchmark/baseline.json
+    python -m benchmark.parse_bench --save-baseline
+"""
+import sys
+sys.path.append(".")
+import os
+import gc
+import json
+import time
+import argparse
+import platform
+import statistics
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import bs4
+from lxml import etree
+
+import utils.parser
+from utils import ArticleStore
+from ai_news import AiNewsCrawler
+from gov_news import CommerceNewsCrawler
+from generic_news import ExtractionPlan, GenericNewsCrawler, load_source_configs
+from benchmark.fixture_loader import load_fixture
+
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join("data", "benchmark", "parse_bench.json")
+# 支持的解析器, 与环境变量HTML_PARSER的取值一致
+PARSERS = ("lxml", "html.parser", "html5lib")
+# 中位数耗时增加超过该比例且超过最小差值时视为性能退化
+DEFAULT_TOLERANCE = 0.25
+MIN_REGRESSION_MS = 0.05
+
+
+@contextmanager
+def use_parser(parser: str) -> Iterator[None]:
+    """临时切换utils.parser的默认解析器, 爬虫代码无需修改"""
+    previous = utils.parser.HTML_PARSER
+    utils.parser.HTML_PARSER = parser
+    try:
+        yield
+    finally:
+        utils.parser.HTML_PARSER = previous
+
+
+@dataclass
+class BenchCase:
+    """
+    一个基准用例
+
+    Attributes:
+        name: 用例名称, 与结果中的键对应
+        fixture: 页面文件名
+        build: 接收页面文本, 返回被计时的无参函数, 该函数返回提取到的条目数
+        parsers: 适用的解析器, 不依赖BeautifulSoup的用例只在lxml下运行
+    """
+    name: str
+    fixture: str
+    build: Callable[[str], Callable[[], int]]
+    parsers: Sequence[str] = PARSERS
+
+
+def _generic_crawler(name: str, store: ArticleStore) -> GenericNewsCrawler:
+    configs = {config.name: config for config in load_source_configs()}
+    return GenericNewsCrawler(ExtractionPlan(configs[name]), article_store=store)
+
+
+def build_cases() -> List[BenchCase]:
+    # 爬虫只调用解析方法, 不发起网络请求; 文章存储仅保存在内存中
+    store = ArticleStore(":memory:")
+    ai = AiNewsCrawler(url=r"https://news.aibase.com/zh/daily")
+    commerce = CommerceNewsCrawler(url=r"https://www.mofcom.gov.cn/", article_store=store)
+    generic_transport = _generic_crawler("transport", store)
+    generic_cctv = _generic_crawler("cctv", store)
+    article_title = f"标题;{datetime.today().strftime(r'%Y-%m-%d')}"
+    article_url = "https://example.com/article.html"
+
+    def mofcom_snippet(text: str) -> str:
+        return json.loads(text)["data"]["html"]
+
+    return [
+        BenchCase("aibase_daily", "aibase_daily.html",
+                  lambda html: lambda: int(bool(ai.parse_daily_new_url(html)))),
+        BenchCase("aibase_post", "aibase_post.html",
+                  lambda html: lambda: len(list(ai.parse_daily_news(html, article_url)))),
+        BenchCase("mofcom_list", "mofcom_list.html",
+                  lambda html: lambda: len(commerce.parse_index_page(html)[1])),
+        BenchCase("mofcom_data", "mofcom_data.json",
+                  lambda text: (lambda snippet: lambda: len(commerce.parse_news_url_dict(snippet)))(mofcom_snippet(text))),
+        BenchCase("mofcom_article", "mofcom_article.html",
+                  lambda html: lambda: len(commerce.build_news(article_title, article_url, html).summary)),
+        # YAML配置的通用爬虫直接使用lxml, 与解析器设置无关
+        BenchCase("generic_cctv_index", "cctv_index.html",
+                  lambda html: lambda: len(generic_cctv.parse_news_url_dict(html)), parsers=("lxml",)),
+        BenchCase("generic_cctv_story", "cctv_story.html",
+                  lambda html: lambda: len(generic_cctv.build_news(article_title, article_url, html).summary), parsers=("lxml",)),
+        BenchCase("generic_mot_list", "mot_list.html",
+                  lambda html: lambda: len(generic_transport.parse_news_url_dict(html)), parsers=("lxml",)),
+        BenchCase("generic_mot_article", "mot_article.html",
+                  lambda html: lambda: len(generic_transport.build_news(article_title, article_url, html).summary), parsers=("lxml",)),
+    ]
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(func: Callable[[], int], repeat: int, warmup: int = 2) -> Dict[str, Any]:
+    """
+    统计函数的耗时与内存
+
+    Returns:
+        耗时(毫秒)的min/median/mean/p95/stdev, Python堆内存峰值(KiB)与提取到的条目数
+        lxml在C层分配的内存不计入tracemalloc, 内存峰值主要反映BeautifulSoup对象树的大小
+    """
+    for _ in range(warmup):
+        items = func()
+    timings = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started_at = time.perf_counter()
+            items = func()
+            timings.append((time.perf_counter() - started_at) * 1000)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"items": items,
+            "repeat": repeat,
+            "min_ms": round(min(timings), 4),
+            "median_ms": round(statistics.median(timings), 4),
+            "mean_ms": round(statistics.mean(timings), 4),
+            "p95_ms": round(_percentile(timings, 95), 4),
+            "stdev_ms": round(statistics.stdev(timings), 4) if len(timings) > 1 else 0.0,
+            "peak_kib": round(peak / 1024, 1)}
+
+
+def run_benchmarks(case_names: Optional[Sequence[str]] = None,
+                   parsers: Sequence[str] = PARSERS,
+                   repeat: int = 20) -> Dict[str, Any]:
+    """
+    运行基准用例
+
+    Args:
+        case_names: 要运行的用例名称, 为空时运行全部
+        parsers: 要测试的解析器
+        repeat: 每个用例的计时次数
+
+    Returns:
+        包含运行环境meta与以"用例/解析器"为键的results
+
+    Raises:
+        ValueError: 用例名称或解析器未知, 或用例没有提取到任何内容
+    """
+    cases = build_cases()
+    known = {case.name for case in cases}
+    unknown = [name for name in (case_names or []) if name not in known]
+    if unknown:
+        raise ValueError(f"未知的用例: {', '.join(unknown)}, 可选: {', '.join(sorted(known))}")
+    unknown_parsers = [parser for parser in parsers if parser not in PARSERS]
+    if unknown_parsers:
+        raise ValueError(f"未知的解析器: {', '.join(unknown_parsers)}, 可选: {', '.join(PARSERS)}")
+    results: Dict[str, Dict[str, Any]] = {}
+    for case in cases:
+        if case_names and case.name not in case_names:
+            continue
+        html_text = load_fixture(case.fixture)
+        for parser in parsers:
+            if parser not in case.parsers:
+                continue
+            with use_parser(parser):
+                result = measure(case.build(html_text), repeat=repeat)
+            if not result["items"]:
+                # 提取结果为空说明页面结构与爬虫不匹配, 此时的耗时没有意义
+                raise ValueError(f"{case.name}/{parser}没有提取到内容, 请检查{case.fixture}")
+            results[f"{case.name}/{parser}"] = result
+    return {"meta": {"created_at": datetime.now().isoformat(timespec="seconds"),
+                     "python": platform.python_version(),
+                     "platform": platform.platform(),
+                     "lxml": ".".join(str(part) for part in etree.LXML_VERSION),
+                     "bs4": bs4.__version__,
+                     "repeat": repeat},
+            "results": results}
+
+
+def compare_with_baseline(report: Dict[str, Any],
+                          baseline: Dict[str, Any],
+                          tolerance: float = DEFAULT_TOLERANCE) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    按中位数耗时与基线比较
+
+    Returns:
+        (每个用例的比较结果, 退化的用例名称)
+    """
+    rows, regressions = [], []
+    baseline_results = baseline.get("results", {})
+    for key, result in report["results"].items():
+        base = baseline_results.get(key)
+        if base is None:
+            rows.append({"case": key, "median_ms": result["median_ms"], "baseline_ms": None, "ratio": None})
+            continue
+        ratio = result["median_ms"] / base["median_ms"] if base["median_ms"] else float("inf")
+        regressed = ratio > 1 + tolerance and result["median_ms"] - base["median_ms"] > MIN_REGRESSION_MS
+        rows.append({"case": key,
+                     "median_ms": result["median_ms"],
+                     "baseline_ms": base["median_ms"],
+                     "ratio": round(ratio, 3),
+                     "regressed": regressed})
+        if regressed:
+            regressions.append(key)
+    return rows, regressions
+
+
+def format_report(report: Dict[str, Any], rows: Optional[List[Dict[str, Any]]] = None) -> str:
+    ratios = {row["case"]: row for row in rows or []}
+    lines = [f"{'用例/解析器':<36}{'条目':>6}{'中位数ms':>12}{'p95 ms':>10}{'峰值KiB':>10}{'基线比':>10}"]
+    for key, result in report["results"].items():
+        row = ratios.get(key, {})
+        ratio = "" if row.get("ratio") is None else f"{row['ratio']:.2f}" + (" !" if row.get("regressed") else "")
+        lines.append(f"{key:<36}{result['items']:>6}{result['median_ms']:>12.3f}{result['p95_ms']:>10.3f}"
+                     f"{result['peak_kib']:>10.1f}{ratio:>10}")
+    return "\n".join(lines)
+
+
+def _write_json(path: str, data: Dict[str, Any]):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="离线解析基准测试")
+    arg_parser.add_argument("--cases", default="", help="逗号分隔的用例名称, 默认全部")
+    arg_parser.add_argument("--parsers", default=",".join(PARSERS), help="逗号分隔的解析器")
+    arg_parser.add_argument("--repeat", type=int, default=20, help="每个用例的计时次数")
+    arg_parser.add_argument("--output", default=DEFAULT_OUTPUT, help="结果JSON文件路径")
+    arg_parser.add_argument("--baseline", default=None, help="与该基线JSON比较, 有退化时返回非0")
+    arg_parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="允许的中位数耗时增幅")
+    arg_parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, default=None,
+                            help="将本次结果保存为基线, 默认保存到benchmark/baseline.json")
+    args = arg_parser.parse_args(argv)
+
+    case_names = [name.strip() for name in args.cases.split(",") if name.strip()]
+    parsers = [parser.strip() for parser in args.parsers.split(",") if parser.strip()]
+    report = run_benchmarks(case_names or None, parsers=parsers, repeat=args.repeat)
+
+    rows, regressions = None, []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows, regressions = compare_with_baseline(report, baseline, tolerance=args.tolerance)
+        report["baseline"] = {"path": args.baseline,
+                              "tolerance": args.tolerance,
+                              "comparison": rows,
+                              "regressions": regressions}
+    _write_json(args.output, report)
+    if args.save_baseline:
+        _write_json(args.save_baseline, {"meta": report["meta"], "results": report["results"]})
+    print(format_report(report, rows))
+    print(f"结果已写入{args.output}")
+    if regressions:
+        print(f"{len(regressions)}个用例比基线慢{args.tolerance:.0%}以上: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+解析进程池基准测试: 按不同的子进程数解析同一批详情页, 统计每秒解析的页面数, 并与单线程、线程池对比
+
+线程池受GIL限制, 解析耗时基本不随线程数下降; 进程池的吞吐量随子进程数增长, 直到用满CPU核心
+
+Example:
+    python -m benchmark.parse_pool_bench
+    python -m benchmark.parse_pool_bench --workers 1,2,4 --items 800 --parser html5lib
+"""
+import sys
+sys.path.append(".")
+import os
+import json
+import time
+import argparse
+import platform
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import utils.parser
+from utils import ParsePool
+from model import News
+from gov_news import CommerceNewsCrawler
+from generic_news import load_source_configs
+from generic_news.generic_news_crawler import build_config_news
+from benchmark.fixture_loader import load_fixture
+
+
+DEFAULT_OUTPUT = os.path.join("data", "benchmark", "parse_pool_bench.json")
+
+# (解析函数, 标题, url, 页面)
+ParseItem = Tuple[Callable[[str, str, str], News], str, str, str]
+
+
+def build_items(count: int) -> List[ParseItem]:
+    """轮流使用各来源的详情页, 生成count个解析任务"""
+    configs = {config.name: config for config in load_source_configs()}
+    article_title = f"标题;{datetime.today().strftime(r'%Y-%m-%d')}"
+    article_url = "https://example.com/article.html"
+    templates: List[ParseItem] = [
+        (partial(build_config_news, configs["cctv"]), article_title, article_url, load_fixture("cctv_story.html")),
+        (partial(build_config_news, configs["transport"]), article_title, article_url, load_fixture("mot_article.html")),
+        (CommerceNewsCrawler.build_news, article_title, article_url, load_fixture("mofcom_article.html")),
+    ]
+    return [templates[index % len(templates)] for index in range(count)]
+
+
+def _run_inline(items: Sequence[ParseItem]) -> int:
+    return sum(len(build_news(title, url, html).summary) for build_news, title, url, html in items)
+
+
+def _run_threads(items: Sequence[ParseItem], workers: int) -> int:
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(build_news, title, url, html) for build_news, title, url, html in items]
+        return sum(len(future.result().summary) for future in futures)
+
+
+def _run_processes(pool: ParsePool, items: Sequence[ParseItem]) -> int:
+    futures = [pool.submit(build_news, title, url, html) for build_news, title, url, html in items]
+    return sum(len(future.result()[0].summary) for future in futures)
+
+
+def _timed(mode: str, workers: int, func: Callable[[], int], items: int) -> Dict[str, Any]:
+    started_at = time.perf_counter()
+    chars = func()
+    elapsed = time.perf_counter() - started_at
+    return {"mode": mode,
+            "workers": workers,
+            "items": items,
+            "elapsed_s": round(elapsed, 3),
+            "items_per_s": round(items / elapsed, 1),
+            "summary_chars": chars}
+
+
+def run_benchmark(worker_counts: Sequence[int], item_count: int, max_tasks_per_child: int) -> Dict[str, Any]:
+    """
+    依次测量单线程、线程池与各子进程数的进程池
+
+    Returns:
+        包含环境信息与各组结果的字典, 结果中speedup为相对单线程的吞吐量倍数
+    """
+    items = build_items(item_count)
+    # 预热: 导入与XPath编译等一次性开销不计入单线程结果
+    _run_inline(items[:8])
+    results = [_timed("inline", 1, lambda: _run_inline(items), item_count)]
+    for workers in worker_counts:
+        results.append(_timed("threads", workers, lambda: _run_threads(items, workers), item_count))
+    for workers in worker_counts:
+        pool = ParsePool(max_workers=workers, max_tasks_per_child=max_tasks_per_child).start()
+        try:
+            # 子进程启动与预热不计入结果
+            _run_processes(pool, items[:workers * 4])
+            results.append(_timed("processes", workers, lambda: _run_processes(pool, items), item_count))
+        finally:
+            pool.shutdown(wait=True)
+    inline_rate = results[0]["items_per_s"]
+    for result in results:
+        result["speedup"] = round(result["items_per_s"] / inline_rate, 2)
+    return {"meta": {"created_at": datetime.now().isoformat(timespec="seconds"),
+                     "python": platform.python_version(),
+                     "platform": platform.platform(),
+                     "cpu_count": os.cpu_count(),
+                     "parser": utils.parser.HTML_PARSER,
+                     "max_tasks_per_child": max_tasks_per_child},
+            "results": results}
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [f"解析器: {report['meta']['parser']}, CPU核心数: {report['meta']['cpu_count']}",
+             f"{'模式':<12}{'并发':>6}{'页面数':>8}{'耗时(s)':>10}{'页面/秒':>10}{'倍数':>8}"]
+    for result in report["results"]:
+        lines.append(f"{result['mode']:<12}{result['workers']:>6}{result['items']:>8}{result['elapsed_s']:>10.3f}"
+                     f"{result['items_per_s']:>10.1f}{result['speedup']:>8.2f}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="解析进程池基准测试")
+    default_workers = sorted({1, 2, 4, os.cpu_count() or 1})
+    arg_parser.add_argument("--workers", default=",".join(str(count) for count in default_workers), help="逗号分隔的并发数")
+    arg_parser.add_argument("--items", type=int, default=400, help="解析的详情页数")
+    arg_parser.add_argument("--parser", default=None, help="HTML解析器, 默认使用环境变量HTML_PARSER")
+    arg_parser.add_argument("--max-tasks-per-child", type=int, default=200, help="子进程重启前执行的任务数")
+    arg_parser.add_argument("--output", default=DEFAULT_OUTPUT, help="结果JSON文件路径")
+    args = arg_parser.parse_args(argv)
+    if args.parser:
+        # 子进程启动时读取环境变量, 主进程直接修改模块变量
+        os.environ["HTML_PARSER"] = args.parser
+        utils.parser.HTML_PARSER = args.parser
+
+    worker_counts = [int(count) for count in args.workers.split(",") if count.strip()]
+    report = run_benchmark(worker_counts, args.items, args.max_tasks_per_child)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(format_report(report))
+    print(f"结果已写入{args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,298 @@
+"""
+本地回放源站: 用录制的页面模拟新闻联播、Aibase、交通部、商务部四个源站, 可配置延迟、抖动、错误率与慢速响应
+
+请求路径为 /<源站域名>/<原路径>, 爬虫通过URL_REWRITE将源站地址改写到这里, 如
+    URL_REWRITE="https://www.mot.gov.cn=http://127.0.0.1:8900/www.mot.gov.cn"
+
+Example:
+    python -m benchmark.replay_origin --port 8900 --latency 80 --jitter 40 --error-rate 0.05
+    python -m benchmark.replay_origin --override www.mofcom.gov.cn:latency=2000,slow_rate=0.2
+"""
+import sys
+sys.path.append(".")
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass, fields, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from benchmark.fixture_loader import load_fixture
+
+
+logger = logging.getLogger(__name__)
+
+
+# (源站域名, 路径正则, 页面文件), 按顺序匹配第一条
+ROUTES: List[Tuple[str, str, str]] = [
+    ("tv.cctv.com", r"^/lm/xwlb/index\.shtml$", "cctv_index.html"),
+    ("tv.cctv.com", r"\.shtml$", "cctv_story.html"),
+    ("news.aibase.com", r"^/zh/daily/?$", "aibase_daily.html"),
+    ("news.aibase.com", r"^/zh/daily/\d+", "aibase_post.html"),
+    ("www.mot.gov.cn", r"^/jiaotongyaowen/(index\.html)?$", "mot_list.html"),
+    ("www.mot.gov.cn", r"\.html$", "mot_article.html"),
+    ("www.mofcom.gov.cn", r"^/xwfb/\w+/index\.html$", "mofcom_list.html"),
+    ("www.mofcom.gov.cn", r"^/api-gateway/", "mofcom_data.json"),
+    ("www.mofcom.gov.cn", r"\.html$", "mofcom_article.html"),
+]
+ORIGIN_HOSTS = tuple(dict.fromkeys(host for host, _, _ in ROUTES))
+
+
+@dataclass
+class OriginBehavior:
+    """
+    源站的响应行为
+
+    Attributes:
+        latency: 返回响应前的固定延迟秒数
+        jitter: 在latency基础上增加的0~jitter秒随机延迟
+        error_rate: 返回错误状态码的概率
+        error_status: 错误响应的状态码, 429/503时附带Retry-After
+        retry_after: 错误响应中Retry-After的秒数, 0表示不返回该头
+        slow_rate: 慢速响应的概率, 慢速响应按块缓慢发送响应体, 模拟slow-loris式的源站
+        slow_chunk_size: 慢速响应每块的字节数
+        slow_chunk_delay: 慢速响应每块之间的间隔秒数
+    """
+    latency: float = 0.05
+    jitter: float = 0.02
+    error_rate: float = 0.0
+    error_status: int = 503
+    retry_after: float = 0.0
+    slow_rate: float = 0.0
+    slow_chunk_size: int = 1024
+    slow_chunk_delay: float = 0.2
+
+
+def parse_behavior_override(text: str, base: OriginBehavior) -> Tuple[str, OriginBehavior]:
+    """
+    解析"域名:字段=值,字段=值"形式的按源站覆盖, latency、jitter、slow_chunk_delay的单位为毫秒, 与命令行参数一致
+
+    Raises:
+        ValueError: 格式或字段名不合法
+    """
+    host, sep, assignments = text.partition(":")
+    if not sep or not host.strip():
+        raise ValueError(f"按源站覆盖的格式应为 域名:字段=值,...: {text}")
+    types = {field.name: field.type for field in fields(OriginBehavior)}
+    changes = {}
+    for item in assignments.split(","):
+        key, _, value = item.partition("=")
+        key = key.strip()
+        if key not in types:
+            raise ValueError(f"未知的字段: {key}, 可选: {', '.join(types)}")
+        number = float(value)
+        if key in ("latency", "jitter", "slow_chunk_delay"):
+            number /= 1000
+        changes[key] = int(number) if types[key] in (int, "int") else number
+    return host.strip().lower(), replace(base, **changes)
+
+
+class ReplayOrigin:
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 8900,
+                 behavior: Optional[OriginBehavior] = None,
+                 overrides: Optional[Dict[str, OriginBehavior]] = None,
+                 seed: Optional[int] = None):
+        """
+        回放源站, 在后台线程中运行, 每个连接一个线程
+
+        Args:
+            host: 监听地址
+            port: 监听端口, 0表示随机端口
+            behavior: 默认响应行为
+            overrides: 按源站域名覆盖的响应行为
+            seed: 随机数种子, 用于复现错误与慢速响应的分布
+        """
+        super(ReplayOrigin, self).__init__()
+        self.behavior = behavior or OriginBehavior()
+        self.overrides = overrides or {}
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._routes = [(host_name, re.compile(pattern), fixture) for host_name, pattern, fixture in ROUTES]
+        # 页面在启动时读取一次, 日期占位符按启动当天替换
+        self._bodies: Dict[str, Tuple[bytes, str]] = {}
+        for _, _, fixture in ROUTES:
+            if fixture not in self._bodies:
+                body = load_fixture(fixture).encode("utf-8")
+                self._bodies[fixture] = (body, '"%s"' % hashlib.md5(body).hexdigest())
+        self._stats: Counter = Counter()
+        self._stats_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _ReplayHandler)
+        self._server.daemon_threads = True
+        self._server.origin = self # type: ignore
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def rewrite_rules(self) -> List[Tuple[str, str]]:
+        """将四个源站的http与https地址改写到回放源站的规则, 可直接传给utils.set_url_rewrites"""
+        return [(f"{scheme}://{host}", f"{self.base_url}/{host}") for host in ORIGIN_HOSTS for scheme in ("https", "http")]
+
+    def rewrite_env(self) -> str:
+        """URL_REWRITE环境变量的值"""
+        return ",".join(f"{prefix}={replacement}" for prefix, replacement in self.rewrite_rules())
+
+    def behavior_for(self, host: str) -> OriginBehavior:
+        return self.overrides.get(host, self.behavior)
+
+    def resolve(self, host: str, path: str) -> Optional[str]:
+        """返回路径对应的页面文件名, 没有匹配时返回None"""
+        for route_host, pattern, fixture in self._routes:
+            if route_host == host and pattern.search(path):
+                return fixture
+        return None
+
+    def body(self, fixture: str) -> Tuple[bytes, str]:
+        return self._bodies[fixture]
+
+    def roll(self) -> float:
+        with self._random_lock:
+            return self._random.random()
+
+    def record(self, host: str, status: int, slow: bool = False):
+        with self._stats_lock:
+            self._stats[(host, status, slow)] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """各源站按状态码统计的请求数, 慢速响应单独计数"""
+        with self._stats_lock:
+            items = list(self._stats.items())
+        result: Dict[str, Dict[str, int]] = {}
+        for (host, status, slow), count in items:
+            key = f"{status}_slow" if slow else str(status)
+            result.setdefault(host, {})[key] = result.get(host, {}).get(key, 0) + count
+        return result
+
+    def start(self) -> "ReplayOrigin":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="replay-origin", daemon=True)
+        self._thread.start()
+        logger.info(f"回放源站已启动: {self.base_url}")
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    # 使用HTTP/1.1以便爬虫的会话复用keep-alive连接
+    protocol_version = "HTTP/1.1"
+    server_version = "ReplayOrigin/1.0"
+
+    @property
+    def origin(self) -> ReplayOrigin:
+        return self.server.origin # type: ignore
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None, slow: Optional[OriginBehavior] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if slow is None:
+            self.wfile.write(body)
+            return
+        for start in range(0, len(body), slow.slow_chunk_size):
+            self.wfile.write(body[start:start + slow.slow_chunk_size])
+            self.wfile.flush()
+            time.sleep(slow.slow_chunk_delay)
+
+    def do_GET(self):
+        path, _, _ = self.path.partition("?")
+        if path == "/__stats":
+            self._send(200, json.dumps(self.origin.snapshot()).encode("utf-8"), "application/json")
+            return
+        _, host, rest = path.split("/", 2) if path.count("/") >= 2 else ("", path.strip("/"), "")
+        host = host.lower()
+        behavior = self.origin.behavior_for(host)
+        time.sleep(behavior.latency + behavior.jitter * self.origin.roll())
+
+        fixture = self.origin.resolve(host, "/" + rest)
+        if fixture is None:
+            self.origin.record(host, 404)
+            self._send(404, b"not found", "text/plain; charset=utf-8")
+            return
+        if self.origin.roll() < behavior.error_rate:
+            headers = {}
+            if behavior.retry_after and behavior.error_status in (429, 503):
+                headers["Retry-After"] = str(int(behavior.retry_after))
+            self.origin.record(host, behavior.error_status)
+            self._send(behavior.error_status, b"replayed error", "text/plain; charset=utf-8", headers)
+            return
+
+        body, etag = self.origin.body(fixture)
+        if self.headers.get("If-None-Match") == etag:
+            self.origin.record(host, 304)
+            self._send(304, b"", "text/html; charset=utf-8", {"ETag": etag})
+            return
+        content_type = "application/json; charset=utf-8" if fixture.endswith(".json") else "text/html; charset=utf-8"
+        slow = self.origin.roll() < behavior.slow_rate
+        self.origin.record(host, 200, slow=slow)
+        self._send(200, body, content_type, {"ETag": etag}, slow=behavior if slow else None)
+
+
+def add_behavior_arguments(arg_parser: argparse.ArgumentParser):
+    """添加回放源站响应行为的命令行参数, 供压测脚本复用"""
+    arg_parser.add_argument("--latency", type=float, default=50, help="固定延迟毫秒数")
+    arg_parser.add_argument("--jitter", type=float, default=20, help="随机延迟的最大毫秒数")
+    arg_parser.add_argument("--error-rate", type=float, default=0.0, help="返回错误状态码的概率")
+    arg_parser.add_argument("--error-status", type=int, default=503, help="错误响应的状态码")
+    arg_parser.add_argument("--retry-after", type=float, default=0, help="429/503响应的Retry-After秒数")
+    arg_parser.add_argument("--slow-rate", type=float, default=0.0, help="慢速发送响应体的概率")
+    arg_parser.add_argument("--slow-chunk-size", type=int, default=1024, help="慢速响应每块的字节数")
+    arg_parser.add_argument("--slow-chunk-delay", type=float, default=200, help="慢速响应每块之间的毫秒数")
+    arg_parser.add_argument("--override", action="append", default=[],
+                            help="按源站覆盖, 如www.mofcom.gov.cn:latency=2000,error_rate=0.2, 可重复")
+    arg_parser.add_argument("--seed", type=int, default=None, help="随机数种子")
+
+
+def behavior_from_args(args: argparse.Namespace) -> Tuple[OriginBehavior, Dict[str, OriginBehavior]]:
+    behavior = OriginBehavior(latency=args.latency / 1000,
+                              jitter=args.jitter / 1000,
+                              error_rate=args.error_rate,
+                              error_status=args.error_status,
+                              retry_after=args.retry_after,
+                              slow_rate=args.slow_rate,
+                              slow_chunk_size=args.slow_chunk_size,
+                              slow_chunk_delay=args.slow_chunk_delay / 1000)
+    overrides = dict(parse_behavior_override(text, behavior) for text in args.override)
+    return behavior, overrides
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    arg_parser = argparse.ArgumentParser(description="本地回放源站")
+    arg_parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    arg_parser.add_argument("--port", type=int, default=8900, help="监听端口")
+    add_behavior_arguments(arg_parser)
+    args = arg_parser.parse_args(argv)
+    behavior, overrides = behavior_from_args(args)
+    origin = ReplayOrigin(host=args.host, port=args.port, behavior=behavior, overrides=overrides, seed=args.seed)
+    print(f"回放源站: {origin.base_url}, 请求统计: {origin.base_url}/__stats")
+    print(f'启动服务时设置: URL_REWRITE="{origin.rewrite_env()}"')
+    try:
+        origin.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
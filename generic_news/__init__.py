@@ -0,0 +1,10 @@
+"""
+配置驱动的通用新闻爬虫模块, 来源定义见config/sources/*.yaml
+"""
+from .source_config import SourceConfig, ListRule, DetailRule, PaginationRule, load_source_config, load_source_configs
+from .extraction_plan import ExtractionPlan, ListPlan, DetailPlan
+from .generic_news_crawler import GenericNewsCrawler, get_source_plan
+
+
+__all__ = ['SourceConfig', 'ListRule', 'DetailRule', 'PaginationRule', 'load_source_config', 'load_source_configs',
+           'ExtractionPlan', 'ListPlan', 'DetailPlan', 'GenericNewsCrawler', 'get_source_plan']
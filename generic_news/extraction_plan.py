@@ -0,0 +1,157 @@
+import sys
+sys.path.append(".")
+import re
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Any, List, Optional
+
+from lxml import etree
+
+from utils import build_xpath, parse_document, join_urls
+from .source_config import ListRule, DetailRule, Selector, SourceConfig
+
+
+def compile_selector(selector: Selector, relative: bool = False) -> etree.XPath:
+    """
+    将选择器编译为XPath对象
+
+    Args:
+        selector: XPath字符串或{"tag": ..., "attrs": {...}}, 后者的class匹配规则与BeautifulSoup.find一致
+        relative: 是否相对于上下文节点查找, 仅对标签与属性形式的选择器生效
+
+    Raises:
+        ValueError: 选择器不是合法的XPath
+    """
+    if isinstance(selector, dict):
+        expression = build_xpath(selector["tag"], selector.get("attrs"))
+        if relative:
+            expression = "." + expression
+    else:
+        expression = selector
+    try:
+        return etree.XPath(expression)
+    except etree.XPathSyntaxError as e:
+        raise ValueError(f"XPath不合法: {expression}({e})") from e
+
+
+def node_text(node: Any) -> str:
+    """与BeautifulSoup的get_text(strip=True)一致: 逐个文本片段去除首尾空白后直接拼接"""
+    if isinstance(node, str):
+        return node.strip()
+    return "".join(text.strip() for text in node.itertext())
+
+
+def _first_text(result: Any) -> Optional[str]:
+    # XPath可能返回节点列表、属性字符串列表或string()等函数的字符串结果
+    if isinstance(result, list):
+        result = result[0] if result else None
+    if result is None:
+        return None
+    return node_text(result) or None
+
+
+@dataclass
+class ListEntry:
+    title: str
+    url: str
+    date: Optional[str] = None
+
+
+class ListPlan:
+    def __init__(self, rule: ListRule):
+        """列表页的提取计划, 所有XPath在创建时编译一次"""
+        super(ListPlan, self).__init__()
+        self.rule = rule
+        self.container = compile_selector(rule.container)
+        self.item = compile_selector(rule.item, relative=True)
+        self.link = etree.XPath(rule.link)
+        self.title = etree.XPath(rule.title)
+        self.date = etree.XPath(rule.date) if rule.date else None
+        self.date_pattern = re.compile(rule.date_pattern)
+        self.title_pattern = re.compile(rule.title_pattern) if rule.title_pattern else None
+
+    def _normalize_date(self, text: Optional[str]) -> Optional[str]:
+        if not text:
+            return None
+        match = self.date_pattern.search(text)
+        if match is None:
+            return None
+        value = match.group(0)
+        if self.rule.date_format:
+            # 非YYYY-MM-DD格式的日期统一转换, 以便与日期窗口比较
+            value = datetime.strptime(value, self.rule.date_format).strftime(r"%Y-%m-%d")
+        return value
+
+    def _normalize_title(self, text: Optional[str]) -> Optional[str]:
+        if text and self.title_pattern is not None:
+            match = self.title_pattern.match(text)
+            if match is not None:
+                text = match.group(1).strip()
+        return text or None
+
+    def extract(self, html_text: str, base_url: str) -> List[ListEntry]:
+        """
+        从列表页中提取新闻条目, 缺少链接或标题的条目会被跳过
+
+        Raises:
+            ValueError: 页面中没有找到列表容器
+        """
+        root = parse_document(html_text)
+        containers = self.container(root) if root is not None else []
+        if not containers:
+            raise ValueError(f"列表页中未找到容器节点: {self.rule.container}")
+        entries = []
+        for container in containers:
+            for item in self.item(container):
+                href = _first_text(self.link(item))
+                title = self._normalize_title(_first_text(self.title(item)))
+                if not href or not title:
+                    continue
+                date = self._normalize_date(_first_text(self.date(item))) if self.date is not None else None
+                entries.append(ListEntry(title=title, url=join_urls(base_url, href), date=date))
+        return entries
+
+
+class DetailPlan:
+    def __init__(self, rule: DetailRule):
+        """详情页的提取计划, 所有XPath在创建时编译一次"""
+        super(DetailPlan, self).__init__()
+        self.rule = rule
+        self.container = compile_selector(rule.container)
+        self.paragraphs = etree.XPath(rule.paragraphs)
+        # 标签与属性形式的容器可在下载过程中识别, 容器结束后即停止下载; XPath形式的容器需要完整页面
+        self.until = (rule.container["tag"], rule.container.get("attrs") or {}) if isinstance(rule.container, dict) else None
+
+    def extract(self, html_text: str) -> str:
+        """
+        提取正文, 各段落文本直接拼接
+
+        Raises:
+            ValueError: 页面中没有找到正文容器
+        """
+        root = parse_document(html_text)
+        containers = self.container(root) if root is not None else []
+        if not containers:
+            raise ValueError(f"详情页中未找到正文节点: {self.rule.container}")
+        return "".join(node_text(paragraph) for paragraph in self.paragraphs(containers[0]))
+
+
+class ExtractionPlan:
+    def __init__(self, config: SourceConfig):
+        """
+        来源的完整提取计划, 在加载配置时创建一次, 之后每次爬取复用
+
+        Raises:
+            ValueError: 配置中的XPath不合法
+        """
+        super(ExtractionPlan, self).__init__()
+        self.config = config
+        try:
+            self.list_plan = ListPlan(config.list)
+            self.detail_plan = DetailPlan(config.detail)
+            # 历史列表页的容器与首页不同时单独编译, 否则与首页共用
+            self.history_list_plan = self.list_plan
+            if config.pagination is not None and config.pagination.container:
+                self.history_list_plan = ListPlan(replace(config.list, container=config.pagination.container))
+        except (ValueError, etree.XPathSyntaxError, re.error) as e:
+            raise ValueError(f"{config.source_file or config.name}: {e}") from e
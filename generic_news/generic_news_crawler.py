@@ -0,0 +1,222 @@
+import sys
+sys.path.append(".")
+import functools
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from utils import get_html_from_url, fetch_html, FetchError, get_few_days_ago, join_urls, entry_date, parse_date, collect_news, iter_collect_news, collect_changed, summarize_failures, get_article_store, ArticleStore, FetchResult, CircuitOpenError, CIRCUIT_OPEN_ERR_CODE, DeadlineExceeded, DEADLINE_ERR_CODE, phase
+from model import News, NewsResponse
+from .source_config import SourceConfig, load_source_configs
+from .extraction_plan import ExtractionPlan, ListPlan
+
+
+# 本进程中按来源名称缓存的提取计划, 解析进程池的子进程中首次解析某个来源时编译一次
+_plans: Dict[str, ExtractionPlan] = {}
+_plans_lock = threading.Lock()
+
+
+def _get_plan(config: SourceConfig) -> ExtractionPlan:
+    plan = _plans.get(config.name)
+    if plan is None or (plan.config is not config and plan.config != config):
+        with _plans_lock:
+            plan = _plans[config.name] = ExtractionPlan(config)
+    return plan
+
+
+def get_source_plan(name: str) -> ExtractionPlan:
+    """
+    按来源名称获取YAML配置编译出的提取计划, 本进程中已编译过时直接复用
+
+    Raises:
+        ValueError: 配置目录中没有该来源
+    """
+    plan = _plans.get(name)
+    if plan is None:
+        configs = {config.name: config for config in load_source_configs()}
+        if name not in configs:
+            raise ValueError(f"配置目录中没有来源{name}")
+        plan = _get_plan(configs[name])
+    return plan
+
+
+def build_config_news(config: SourceConfig, title: str, url: str, html_text: str) -> News:
+    """
+    按来源配置解析单个新闻详情页, title为 标题;日期 格式
+
+    只依赖可序列化的SourceConfig, 以functools.partial(build_config_news, config)的形式交给解析进程池执行
+    """
+    summary = _get_plan(config).detail_plan.extract(html_text)
+    title, publish_date = title.rsplit(";", 1)
+    return News(title=title,
+                url=url,
+                origin=config.origin,
+                summary=summary,
+                publish_date=publish_date)
+
+
+class GenericNewsCrawler:
+    def __init__(self,
+                 plan: ExtractionPlan,
+                 url: Optional[str] = None,
+                 article_store: Optional[ArticleStore] = None):
+        """
+        按YAML配置爬取 列表页 -> 按日期过滤 -> 详情页 的通用爬虫
+
+        Args:
+            plan: 已编译的提取计划, 同一来源的所有爬虫共享
+            url: 列表页url, 默认使用配置中的url
+            article_store: 文章存储, 默认使用共享存储
+        """
+        super(GenericNewsCrawler, self).__init__()
+        self.plan = plan
+        self.config = plan.config
+        self.url = url or self.config.url
+        # 已解析过的详情页保存在文章存储中, 不再重复下载
+        self.article_store = article_store if article_store is not None else get_article_store()
+        # 本进程中直接复用已编译的提取计划
+        _plans[self.config.name] = plan
+        self.extractor: Callable[[str, str, str], News] = functools.partial(build_config_news, self.config)
+
+    def default_publish_date(self) -> str:
+        """列表页没有日期时使用的发布日期"""
+        return datetime.strftime(datetime.today() - timedelta(days=self.config.date_offset), r"%Y-%m-%d")
+
+    def get_news_url_dict(self) -> Dict[str, str]:
+        """
+        解析列表页, 返回 标题;日期 -> 详情页url 的映射
+        """
+        html_text = get_html_from_url(url=self.url)
+        if html_text is None:
+            raise RuntimeError(f"列表页获取失败: {self.url}")
+        with phase("extract"):
+            return self.parse_news_url_dict(html_text)
+
+    def parse_news_url_dict(self, html_text: str) -> Dict[str, str]:
+        """解析列表页html, 按日期窗口过滤条目"""
+        news_url_dict = self.parse_entries(html_text, self.url)
+        if self.config.date_window > 0:
+            few_days = set(get_few_days_ago(day_offset=self.config.date_window))
+            # 日期不在检索范围内则跳过
+            news_url_dict = {title: url for title, url in news_url_dict.items() if entry_date(title) in few_days}
+        return news_url_dict
+
+    def parse_entries(self,
+                      html_text: str,
+                      base_url: str,
+                      list_plan: Optional[ListPlan] = None,
+                      default_date: Optional[str] = None) -> Dict[str, str]:
+        """
+        解析列表页html, 返回全部条目的 标题;日期 -> 详情页url 映射, 不按日期过滤
+
+        Args:
+            html_text: 列表页html
+            base_url: 列表页url, 用于拼接相对链接
+            list_plan: 列表页的提取计划, 默认为首页的提取计划
+            default_date: 条目没有日期时使用的发布日期, 默认为default_publish_date()
+        """
+        list_plan = list_plan or self.plan.list_plan
+        default_date = default_date or self.default_publish_date()
+        return {f"{entry.title};{entry.date or default_date}": entry.url
+                for entry in list_plan.extract(html_text, base_url=base_url)}
+
+    @property
+    def backfill_mode(self) -> Optional[str]:
+        """回填时遍历历史列表的方式: paged按页码翻页, daily按日期访问, 配置中没有pagination时为None"""
+        pagination = self.config.pagination
+        if pagination is None:
+            return None
+        return "paged" if pagination.page_url else "daily"
+
+    @property
+    def backfill_max_pages(self) -> int:
+        return self.config.pagination.max_pages if self.config.pagination is not None else 0
+
+    def backfill_channels(self) -> List[str]:
+        """按页码翻页的栏目, 通用爬虫只有来源本身一个栏目"""
+        return [self.config.name]
+
+    def get_page_entries(self, channel: str, page: int) -> Optional[Dict[str, str]]:
+        """
+        获取第page页历史列表的全部条目, 第0页为来源的url
+
+        Returns:
+            标题;日期 -> 详情页url 的映射, 页面不存在(404)时返回None
+
+        Raises:
+            FetchError: 页面获取失败(网络错误、超时、5xx等), 不能当作列表已结束
+        """
+        url = self.url if page == 0 else join_urls(self.url, self.config.pagination.page_url.format(page=page)) # type: ignore
+        try:
+            html_text = fetch_html(url=url)
+        except FetchError as e:
+            if e.not_found:
+                return None
+            raise
+        with phase("extract"):
+            return self.parse_entries(html_text, url, list_plan=self.plan.list_plan if page == 0 else self.plan.history_list_plan)
+
+    def get_day_entries(self, day: str) -> Dict[str, str]:
+        """
+        获取某一天列表页的全部条目, 没有日期的条目以该天为发布日期
+
+        Args:
+            day: YYYY-MM-DD格式的日期
+
+        Returns:
+            标题;日期 -> 详情页url 的映射, 当天的列表页不存在(404, 如尚未发布)时为空
+
+        Raises:
+            FetchError: 页面获取失败(网络错误、超时、5xx等), 不能当作当天没有新闻
+        """
+        url = join_urls(self.url, self.config.pagination.day_url.format(date=parse_date(day))) # type: ignore
+        try:
+            html_text = fetch_html(url=url)
+        except FetchError as e:
+            if e.not_found:
+                return {}
+            raise
+        with phase("extract"):
+            return self.parse_entries(html_text, url, list_plan=self.plan.history_list_plan, default_date=day)
+
+    def collect(self, news_url_dict: Dict[str, str]) -> Tuple[List[News], List[FetchResult]]:
+        """并发获取一组详情页, 文章存储中已有的不再下载, 返回(新闻列表, 失败结果)"""
+        return collect_news(news_url_dict, self.extractor, store=self.article_store, until=self.plan.detail_plan.until)
+
+    def build_news(self, title: str, url: str, html_text: str) -> News:
+        """解析单个新闻详情页, title为 标题;日期 格式"""
+        return self.extractor(title, url, html_text)
+
+    def iter_news(self) -> Iterator[Union[News, FetchResult]]:
+        """
+        逐条产出新闻, 详情页按获取完成的顺序解析并产出
+        获取或解析失败的详情页以FetchResult形式产出
+        """
+        news_url_dict = self.get_news_url_dict()
+        yield from iter_collect_news(news_url_dict, self.extractor, store=self.article_store, until=self.plan.detail_plan.until)
+
+    def get_news(self) -> NewsResponse:
+        try:
+            news_url_dict = self.get_news_url_dict()
+            # 列表与上次成功爬取相同时直接返回上次的新闻, 否则只获取新增且文章存储中没有的详情页
+            news_lst, failed_results = collect_changed(f"{type(self).__name__}:{self.url}", news_url_dict, self.collect)
+            failures = summarize_failures(failed_results)
+            if len(news_lst) > 0:
+                return NewsResponse(news_list=news_lst, err_info=failures)
+            elif failures:
+                return NewsResponse(news_list=None, status="ERROR", err_code="500", err_info=failures)
+            else:
+                return NewsResponse(news_list=None, status="OK", err_code=None, err_info="未在时效范围内爬取到数据")
+        except CircuitOpenError as e:
+            return NewsResponse(news_list=None, status="ERROR", err_code=CIRCUIT_OPEN_ERR_CODE, err_info=f"{str(e)}")
+        except DeadlineExceeded as e:
+            return NewsResponse(news_list=None, status="ERROR", err_code=DEADLINE_ERR_CODE, err_info=f"{str(e)}")
+        except Exception as e:
+            return NewsResponse(news_list=None, status="ERROR", err_code="500", err_info=f"{str(e)}")
+
+
+if __name__ == '__main__':
+    from generic_news.source_config import load_source_configs
+    for config in load_source_configs():
+        crawler = GenericNewsCrawler(ExtractionPlan(config))
+        print(config.name, crawler.get_news())
@@ -0,0 +1,141 @@
+import sys
+sys.path.append(".")
+import os
+import glob
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+import yaml
+
+
+# 来源配置文件所在目录, 可通过环境变量SOURCE_CONFIG_DIR指定
+DEFAULT_CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "sources")
+
+# 选择器可以是XPath字符串, 也可以是{"tag": "div", "attrs": {"id": "Zoom"}}形式的标签与属性
+Selector = Union[str, Dict[str, Any]]
+
+
+@dataclass
+class ListRule:
+    """列表页规则: 容器节点、新闻条目, 以及从条目中提取链接、标题、日期的XPath"""
+    container: Selector
+    item: Selector
+    link: str = "@href"
+    title: str = "@title"
+    date: Optional[str] = None
+    date_pattern: str = r"\d{4}-\d{2}-\d{2}"
+    date_format: Optional[str] = None
+    title_pattern: Optional[str] = None
+
+
+@dataclass
+class DetailRule:
+    """详情页规则: 正文容器节点与段落XPath, 段落文本直接拼接"""
+    container: Selector
+    paragraphs: str = ".//p"
+
+
+@dataclass
+class PaginationRule:
+    """
+    历史列表页规则, 用于按日期范围回填: page_url按页码翻页, day_url按日期访问当天的列表页, 二者选一
+
+    page_url中的{page}为从1开始的页码, 第0页为来源的url; day_url中的{date}为日期, 可带格式, 如{date:%Y%m%d}
+    历史列表页与首页结构不同时, container指定历史列表页中的容器节点, 条目、链接等仍使用list中的规则
+    """
+    page_url: Optional[str] = None
+    day_url: Optional[str] = None
+    container: Optional[Selector] = None
+    max_pages: int = 500
+
+
+@dataclass
+class SourceConfig:
+    """
+    YAML描述的新闻来源
+
+    Example:
+        name: transport
+        origin: 交通部
+        url: https://www.mot.gov.cn/jiaotongyaowen/
+        schedule: "*/30 8-18 * * 1-5"
+        date_window: 2
+        list:
+          container: {tag: div, attrs: {class: list-group tab-content}}
+          item: ".//a[contains(@class, 'list-group-item')]"
+          date: ".//span[contains(@class, 'badge')]"
+        detail:
+          container: {tag: div, attrs: {id: Zoom}}
+        pagination:
+          page_url: "index_{page}.html"
+    """
+    name: str
+    origin: str
+    url: str
+    list: ListRule
+    detail: DetailRule
+    schedule: str = "@every 1h"
+    deadline: float = 20.0
+    # 只保留最近date_window天(含当天)发布的新闻, 0表示不按日期过滤
+    date_window: int = 0
+    # 列表页没有日期时, 发布日期取当天往前date_offset天
+    date_offset: int = 0
+    # 历史列表页规则, 没有时不支持回填
+    pagination: Optional[PaginationRule] = None
+    source_file: Optional[str] = field(default=None, repr=False)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], source_file: Optional[str] = None) -> "SourceConfig":
+        """
+        根据YAML解析结果创建配置
+
+        Raises:
+            ValueError: 缺少必填字段或字段不合法
+        """
+        where = source_file or "来源配置"
+        missing = [key for key in ("name", "origin", "url", "list", "detail") if not data.get(key)]
+        if missing:
+            raise ValueError(f"{where}缺少字段: {', '.join(missing)}")
+        try:
+            list_rule = ListRule(**data["list"])
+            detail_rule = DetailRule(**data["detail"])
+            pagination_rule = PaginationRule(**data["pagination"]) if data.get("pagination") else None
+        except TypeError as e:
+            raise ValueError(f"{where}字段不合法: {e}") from e
+        if pagination_rule is not None and bool(pagination_rule.page_url) == bool(pagination_rule.day_url):
+            raise ValueError(f"{where}的pagination需要且只能指定page_url与day_url中的一个")
+        options = {key: data[key] for key in ("schedule", "deadline", "date_window", "date_offset") if key in data}
+        return cls(name=str(data["name"]),
+                   origin=str(data["origin"]),
+                   url=str(data["url"]),
+                   list=list_rule,
+                   detail=detail_rule,
+                   pagination=pagination_rule,
+                   source_file=source_file,
+                   **options)
+
+
+def load_source_config(path: str) -> SourceConfig:
+    """读取单个YAML来源配置"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}的内容必须是映射")
+    return SourceConfig.from_dict(data, source_file=path)
+
+
+def load_source_configs(config_dir: Optional[str] = None) -> List[SourceConfig]:
+    """
+    读取目录下所有*.yaml/*.yml来源配置, 按文件名排序
+
+    Args:
+        config_dir: 配置目录, 默认读取环境变量SOURCE_CONFIG_DIR, 未设置时为config/sources
+    """
+    config_dir = config_dir or os.getenv("SOURCE_CONFIG_DIR") or DEFAULT_CONFIG_DIR
+    paths = sorted(glob.glob(os.path.join(config_dir, "*.yaml")) + glob.glob(os.path.join(config_dir, "*.yml")))
+    configs = [load_source_config(path) for path in paths]
+    names = [config.name for config in configs]
+    duplicated = {name for name in names if names.count(name) > 1}
+    if duplicated:
+        raise ValueError(f"来源名称重复: {', '.join(sorted(duplicated))}")
+    return configs
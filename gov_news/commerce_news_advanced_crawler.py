@@ -1,40 +1,41 @@
 import sys
 sys.path.append(".")
-from selenium import webdriver
+import logging
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from bs4 import BeautifulSoup
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
-from utils import get_html_from_url, get_few_days_ago, join_urls
+from utils import get_few_days_ago, join_urls, find_target, collect_news, iter_collect_news, collect_changed, summarize_failures, get_article_store, ArticleStore, FetchError, FetchResult, CircuitOpenError, CIRCUIT_OPEN_ERR_CODE, DeadlineExceeded, DEADLINE_ERR_CODE, remaining, expired, clamp_timeout, rewrite_url, phase
+from utils.browser_pool import get_selenium_pool
 from model import News, NewsResponse
 
 
+logger = logging.getLogger(__name__)
+
+
+# 详情页正文所在的标签, 该标签结束后即停止下载详情页
+ARTICLE_TARGET = ('div', {'class': 'art-con art-con-bottonmLine'})
+
+
+# ChromeDriver默认的页面加载超时与浏览器池设置的隐式等待秒数
+PAGE_LOAD_TIMEOUT = 300
+IMPLICIT_WAIT = 5
+
+
 class CommerceNewsAdvancedCrawler:
     def __init__(self, 
                  url: str,
-                 headless: bool = False,
-                 timeout: int = 5):
+                 headless: bool = True,
+                 timeout: int = 5,
+                 article_store: Optional[ArticleStore] = None):
         super(CommerceNewsAdvancedCrawler, self).__init__()
         self.url = url
         self.headless = headless
         self.timeout = timeout
-    
-    def _setup_driver(self):
-        """设置Selenium WebDriver"""
-        options = webdriver.ChromeOptions()
-        if self.headless:
-            options.add_argument('--headless')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--window-size=1920,1080')
-        options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
-        
-        driver = webdriver.Chrome(options=options)
-        driver.implicitly_wait(5)  # 设置隐式等待时间
-        return driver
+        # 已解析过的详情页保存在文章存储中, 不再重复下载
+        self.article_store = article_store if article_store is not None else get_article_store()
     
     def get_news_url_dict(self, child_url):
         """使用Selenium获取新闻URL字典"""
@@ -42,111 +43,144 @@ class CommerceNewsAdvancedCrawler:
         few_days = get_few_days_ago(day_offset=1)
         news_url_dict = {}
         
-        driver = self._setup_driver()
         try:
-            # 访问页面
-            driver.get(url)
+            # 从常驻的ChromeDriver池借出驱动, 使用结束后自动归还
+            with get_selenium_pool(headless=self.headless).driver(timeout=remaining()) as driver:
+                try:
+                    # 页面加载与查找元素的隐式等待都不超过剩余时限, 驱动会被复用因此每次重新设置
+                    left = remaining()
+                    driver.set_page_load_timeout(left if left is not None else PAGE_LOAD_TIMEOUT)
+                    driver.implicitly_wait(min(IMPLICIT_WAIT, left) if left is not None else IMPLICIT_WAIT)
+                
+                    # 访问页面
+                    with phase("render"):
+                        driver.get(rewrite_url(url))
             
-            # 等待页面加载完成
-            wait = WebDriverWait(driver, self.timeout)
+                    # 等待页面加载完成
+                    wait = WebDriverWait(driver, clamp_timeout(self.timeout, f"未渲染{url}")) # type: ignore
             
-            # 等待ul元素出现
-            ul_selector = "ul.txtList_01"
-            ul_element = wait.until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, ul_selector))
-            )
+                    # 等待ul元素出现
+                    ul_selector = "ul.txtList_01"
+                    ul_element = wait.until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, ul_selector))
+                    )
             
-            # 获取所有li元素
-            li_elements = ul_element.find_elements(By.CSS_SELECTOR, "li")
+                    # 获取所有li元素
+                    li_elements = ul_element.find_elements(By.CSS_SELECTOR, "li")
             
-            # 提取每个li标签下的url title date
-            for li in li_elements:
-                try:
-                    # 查找li下的第一个a标签
-                    a_tag = li.find_element(By.CSS_SELECTOR, "a")
-                    # 查找直接子span标签
-                    span_tag = li.find_element(By.CSS_SELECTOR, "span")
+                    # 提取每个li标签下的url title date
+                    for li in li_elements:
+                        if expired():
+                            # 时限已用完, 返回已解析的部分
+                            break
+                        try:
+                            # 查找li下的第一个a标签
+                            a_tag = li.find_element(By.CSS_SELECTOR, "a")
+                            # 查找直接子span标签
+                            span_tag = li.find_element(By.CSS_SELECTOR, "span")
                     
-                    # 提取a标签的href和title
-                    href = a_tag.get_attribute("href") or None
-                    title = a_tag.get_attribute("title") or a_tag.text.strip() or None
-                    date_text = span_tag.text.strip() if span_tag else None
+                            # 提取a标签的href和title
+                            href = a_tag.get_attribute("href") or None
+                            title = a_tag.get_attribute("title") or a_tag.text.strip() or None
+                            date_text = span_tag.text.strip() if span_tag else None
                     
-                    if date_text:
-                        # 处理日期格式，去掉括号
-                        date = date_text[1:-1] if date_text.startswith('[') and date_text.endswith(']') else date_text
-                    else:
-                        date = None
+                            if date_text:
+                                # 处理日期格式，去掉括号
+                                date = date_text[1:-1] if date_text.startswith('[') and date_text.endswith(']') else date_text
+                            else:
+                                date = None
                     
-                    if not all([href, title, date]):
-                        continue
+                            if not all([href, title, date]):
+                                continue
                     
-                    if date not in few_days:
-                        # 跳过超过时效的新闻
-                        continue
+                            if date not in few_days:
+                                # 跳过超过时效的新闻
+                                continue
                     
-                    news_title = f"{title};{date}"
-                    final_url = join_urls(self.url, child_url=href)
-                    news_url_dict[news_title] = final_url
+                            news_title = f"{title};{date}"
+                            final_url = join_urls(self.url, child_url=href)
+                            news_url_dict[news_title] = final_url
                     
-                except NoSuchElementException:
-                    # 如果某个元素不存在，跳过这个li
-                    continue
-                except Exception as e:
-                    print(f"处理li元素时出错: {str(e)}")
-                    continue
+                        except NoSuchElementException:
+                            # 如果某个元素不存在，跳过这个li
+                            continue
+                        except Exception as e:
+                            logger.warning(f"处理li元素时出错: {str(e)}")
+                            continue
             
-            return news_url_dict
+                    return news_url_dict
         
-        except TimeoutException:
-            print(f"等待元素超时: {url}")
-            return {}
-        except Exception as e:
-            print(f"获取过程出错: {str(e)}")
+                except TimeoutException:
+                    logger.error(f"等待元素超时: {url}")
+                    return {}
+                except Exception as e:
+                    logger.error(f"获取过程出错 {url}: {str(e)}")
+                    return {}
+        except (TimeoutError, WebDriverException) as e:
+            # 等待空闲驱动超时或创建驱动失败时同样返回空结果, 由get_news记录为未爬取到数据
+            logger.error(f"借出ChromeDriver失败: {str(e)}")
             return {}
+    
+    @staticmethod
+    def build_news(title: str, url: str, html_text: str) -> News:
+        """解析单个新闻详情页, title为 标题;日期 格式, 不依赖爬虫实例, 可交给解析进程池执行"""
+        # 获取文章内容, 只解析文章所在的div子树
+        div = find_target(html_text, *ARTICLE_TARGET)
+        p_tags = div.find_all('p', style='text-align: justify; text-indent: 2em;') # type: ignore
+        text = "".join([p.get_text(strip=True) for p in p_tags])
         
-        finally:
-            # 确保浏览器关闭
-            driver.quit()
+        title_part, publish_date = title.split(";")
+        return News(
+            title=title_part, 
+            url=url,
+            origin='商务部', 
+            summary=text, 
+            publish_date=publish_date
+        )
     
-    def get_news(self):
-        """获取新闻列表"""
+    def get_merged_news_url_dict(self):
+        """合并领导人活动与部领导活动两个栏目的新闻链接"""
         ldrhd_news_url_dict = self.get_news_url_dict(child_url=r'xwfb/ldrhd/index.html')
         bldhd_news_url_dict = self.get_news_url_dict(child_url=r'xwfb/bldhd/index.html')
-        merged = {**ldrhd_news_url_dict, **bldhd_news_url_dict}
-        news_lst = []
-        
-        for title, url in merged.items():
-            try:
-                html_text = get_html_from_url(url=url)
-                if not html_text:
-                    continue
-                    
-                soup = BeautifulSoup(html_text.encode('utf-8'), "html5lib")
-                
-                # 获取文章内容
-                div = soup.find('div', class_='art-con art-con-bottonmLine')
-                p_tags = div.find_all('p', style='text-align: justify; text-indent: 2em;') # type: ignore
-                text = "".join([p.get_text(strip=True) for p in p_tags])
-                
-                title_part, publish_date = title.split(";")
-                news_lst.append(News(
-                    title=title_part, 
-                    url=url,
-                    origin='商务部', 
-                    summary=text, 
-                    publish_date=publish_date
-                ))
-                
-            except Exception as e:
-                print(f"处理新闻内容时出错 {url}: {str(e)}")
-                continue
-        result = NewsResponse(news_list=news_lst) if len(news_lst) > 0 else NewsResponse(news_list=None, status="OK", err_code=None, err_info="未在时效范围内爬取到数据")
-        return result
+        return {**ldrhd_news_url_dict, **bldhd_news_url_dict}
+    
+    def collect(self, news_url_dict: Dict[str, str]) -> Tuple[List[News], List[FetchResult]]:
+        """并发获取一组详情页, 文章存储中已有的不再下载, 返回(新闻列表, 失败结果)"""
+        return collect_news(news_url_dict, self.build_news, store=self.article_store, until=ARTICLE_TARGET)
 
+    def iter_news(self) -> Iterator[Union[News, FetchResult]]:
+        """
+        逐条产出新闻, 详情页按获取完成的顺序解析并产出
+        获取或解析失败的详情页以FetchResult形式产出
+        """
+        merged = self.get_merged_news_url_dict()
+        yield from iter_collect_news(merged, self.build_news, store=self.article_store, until=ARTICLE_TARGET)
+    
+    def get_news(self):
+        """获取新闻列表"""
+        try:
+            merged = self.get_merged_news_url_dict()
+            # 列表与上次成功爬取相同时直接返回上次的新闻, 否则只获取新增且文章存储中没有的详情页, 获取或解析失败的详情页会被跳过并记录
+            news_lst, failed_results = collect_changed(f"{type(self).__name__}:{self.url}", merged, self.collect)
+            for failed_result in failed_results:
+                logger.warning(f"处理新闻内容时出错 {failed_result.url}: {failed_result.error}")
+            failures = summarize_failures(failed_results)
+            if len(news_lst) > 0:
+                return NewsResponse(news_list=news_lst, err_info=failures)
+            elif failures:
+                return NewsResponse(news_list=None, status="ERROR", err_code='500', err_info=failures)
+            else:
+                return NewsResponse(news_list=None, status="OK", err_code=None, err_info="未在时效范围内爬取到数据")
+        except CircuitOpenError as e:
+            return NewsResponse(news_list=None, status="ERROR", err_code=CIRCUIT_OPEN_ERR_CODE, err_info=f"{str(e)}")
+        except DeadlineExceeded as e:
+            return NewsResponse(news_list=None, status="ERROR", err_code=DEADLINE_ERR_CODE, err_info=f"{str(e)}")
+        except (FetchError, WebDriverException, RuntimeError) as e:
+            logger.error(f"爬取商务部新闻失败: {str(e)}")
+            return NewsResponse(news_list=None, status="ERROR", err_code='500', err_info=f"{str(e)}")
 
 if __name__ == '__main__':
     url = r'https://www.mofcom.gov.cn/'
-    crawler = CommerceNewsAdvancedCrawler(url=url, headless=False)
+    crawler = CommerceNewsAdvancedCrawler(url=url, headless=True)
     result = crawler.get_news()
     print(result)
\ No newline at end of file
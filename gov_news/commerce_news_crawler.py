@@ -1,79 +1,102 @@
 import sys
 sys.path.append(".")
+import os
 import json
-import random
+import time
+import logging
+import threading
 import requests
-from typing import Optional
-from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from playwright.sync_api import Page
+from bs4 import BeautifulSoup, SoupStrainer
 from urllib.parse import urljoin
 
-from utils import get_html_from_url, get_few_days_ago, join_urls
+from utils import fetch_html, FetchError, get_few_days_ago, join_urls, parse_html, find_target, collect_news, iter_collect_news, collect_changed, summarize_failures, get_session, get_article_store, ArticleStore, FetchResult, CircuitOpenError, CIRCUIT_OPEN_ERR_CODE, DeadlineExceeded, DEADLINE_ERR_CODE, get_circuit_breaker, get_domain_from_url, rewrite_url, check_deadline, clamp_timeout, remaining, get_host_limiter, record_phase, entry_date, oldest_date, walk_pages, phase
+from utils.browser_pool import get_playwright_pool
 from model import News, NewsResponse
 
 
+logger = logging.getLogger(__name__)
+
+# 详情页正文所在的标签, 该标签结束后即停止下载详情页
+ARTICLE_TARGET = ('div', {'class': 'art-con art-con-bottonmLine'})
+# 领导人活动与部领导活动两个栏目, 栏目页为<栏目>/index.html
+CHANNELS = ('xwfb/ldrhd', 'xwfb/bldhd')
+# 第一页的条目都在时效范围内时, 同时请求的后续页数与最多请求的页数
+PAGE_WORKERS = int(os.getenv("COMMERCE_PAGE_WORKERS", "3"))
+MAX_PAGES = int(os.getenv("COMMERCE_MAX_PAGES", "10"))
+# 分页接口单次请求的超时秒数, 不超过剩余时限
+API_TIMEOUT = 15
+
+# 各栏目页中解析出的(栏目页url, 分页接口url, queryData), 按(入口url, 栏目)缓存, 接口请求失败时丢弃
+_request_params: Dict[Tuple[str, str], Tuple[str, str, Dict[str, str]]] = {}
+_request_params_lock = threading.Lock()
+
+
 class CommerceNewsCrawler:
+    # 回填时按栏目分页接口的pageNo翻页
+    backfill_mode = "paged"
+
     def __init__(self, 
-                 url: str):
+                 url: str,
+                 article_store: Optional[ArticleStore] = None):
         super(CommerceNewsCrawler, self).__init__()
         self.url = url
-        self.user_agent = [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:131.0) Gecko/20100101 Firefox/131.0",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Safari/605.1.15"
-            ]
+        # 已解析过的详情页保存在文章存储中, 不再重复下载
+        self.article_store = article_store if article_store is not None else get_article_store()
     
     def get_news_url_dict_by_playwright(self, child_url):
         url = join_urls(self.url, child_url=child_url)
         few_days = get_few_days_ago(day_offset=4)
-        news_url_dict = {}
-        with sync_playwright() as p:
-            # 启动浏览器（可选chromium、firefox、webkit）
-            browser = p.chromium.launch(headless=False)  # headless=True表示无头模式（无界面）
-            page = browser.new_page()
-            
-            try:
-                # 访问页面并等待JS渲染完成
-                page.goto(url, wait_until="networkidle")  # 等待网络空闲，确保JS渲染完成
-            
-                # 定位class为"txtList_01"的ul标签
-                ul_selector = "ul.txtList_01"
-            
-                # 等待ul元素出现（防止页面加载慢导致元素未渲染）
-                page.wait_for_selector(ul_selector, timeout=1000)  # 超时3秒
-            
-                # 获取ul下的所有li标签
-                li_selector = f"{ul_selector} > li"  # 直接子元素li
-            
-                # 获取所有li元素
-                li_elements = page.query_selector_all(li_selector)
-            
-                # 提取每个li标签下的url title date
-                for li in li_elements:
-                    a_tag = li.query_selector("a")  # 查找li下的第一个a标签
-                    span_tag = li.query_selector("> span")  # 仅查找直接子span
-                    if not a_tag or not span_tag:
-                        continue
-                    # 提取a标签的href和title
-                    href = a_tag.get_attribute("href") or None
-                    title = a_tag.get_attribute("title") or None
-                    date = span_tag.text_content().strip()[1:-1] or None # type: ignore
-                    if date not in few_days:
-                        # 跳过超过时效的新闻
-                        continue
-                    news_title = f"{title};{date}"
-                    final_url = join_urls(self.url, child_url=href)
-                    news_url_dict[news_title] = final_url
-            
-                return news_url_dict
         
-            except Exception as e:
-                print(f"获取过程出错: {str(e)}")
-                return {}
+        # 浏览器池线程中读取不到请求时限, 在提交前换算为各步骤的等待毫秒数
+        budget = clamp_timeout(None, f"未渲染{url}")
+        
+        def extract(page: Page):
+            news_url_dict = {}
+            # 访问页面, 图片、字体、样式等资源已被浏览器池拦截
+            page.goto(rewrite_url(url), wait_until="domcontentloaded", timeout=budget * 1000 if budget is not None else None)
+        
+            # 定位class为"txtList_01"的ul标签
+            ul_selector = "ul.txtList_01"
+        
+            # 等待ul元素出现（防止页面加载慢导致元素未渲染）, 最多3秒且不超过剩余时限
+            # Playwright中timeout=0表示不限时, 因此至少等待1毫秒
+            wait_ms = 3000 if budget is None else min(3000, max((budget - (time.monotonic() - submitted_at)) * 1000, 1))
+            page.wait_for_selector(ul_selector, timeout=wait_ms)
+        
+            # 获取ul下的所有li标签
+            li_selector = f"{ul_selector} > li"  # 直接子元素li
         
-            finally:
-                # 确保浏览器关闭
-                browser.close()
+            # 获取所有li元素
+            li_elements = page.query_selector_all(li_selector)
+        
+            # 提取每个li标签下的url title date
+            for li in li_elements:
+                a_tag = li.query_selector("a")  # 查找li下的第一个a标签
+                span_tag = li.query_selector("> span")  # 仅查找直接子span
+                if not a_tag or not span_tag:
+                    continue
+                # 提取a标签的href和title
+                href = a_tag.get_attribute("href") or None
+                title = a_tag.get_attribute("title") or None
+                date = span_tag.text_content().strip()[1:-1] or None # type: ignore
+                if date not in few_days:
+                    # 跳过超过时效的新闻
+                    continue
+                news_title = f"{title};{date}"
+                final_url = join_urls(self.url, child_url=href)
+                news_url_dict[news_title] = final_url
+            return news_url_dict
+        
+        try:
+            # 在常驻的无头浏览器池中渲染, 每次使用独立的浏览器上下文
+            submitted_at = time.monotonic()
+            with phase("render"):
+                return get_playwright_pool().run(extract, timeout=budget)
+        except Exception as e:
+            logger.error(f"获取过程出错 {url}: {str(e)}")
+            return {}
     
     def extract_request_params(self, soup: Optional[BeautifulSoup]):
         if not soup:
@@ -106,81 +129,232 @@ class CommerceNewsCrawler:
     def simulate_request(self, 
                          index_url: str, 
                          api_url: str, 
-                         request_params:dict):
-        session = requests.Session()
-        session.verify = False
-        session.trust_env = False
+                         request_params:dict,
+                         page_no: int = 1) -> Optional[str]:
+        """
+        请求栏目分页接口的第page_no页
+
+        Returns:
+            列表的html片段, 接口明确返回没有内容(success为false或html为空)时返回None, 表示列表已结束
+
+        Raises:
+            requests.exceptions.RequestException: 请求失败、HTTP状态码错误或返回的不是JSON
+            CircuitOpenError: 商务部域名已熔断
+            DeadlineExceeded: 当前请求的时限已用完
+        """
+        # 复用商务部域名的共享会话, User-Agent由会话统一设置
+        session = get_session(api_url)
         headers = {
-            "User-Agent": random.choice(self.user_agent),
             "Accept": "application/json, text/javascript, */*; q=0.01",
             "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.5",
             "Referer": index_url,
             "X-Requested-With": "XMLHttpRequest",
         }
-        request_params["pageNo"] = "1"
-        resp = session.get(api_url, params=request_params, headers=headers, timeout=15)
+        request_params = {**request_params, "pageNo": str(page_no)}
+        # 接口请求与页面请求共用商务部域名的限速器与熔断器, 多页并发请求时同样受域名并发数限制
+        host = get_domain_from_url(api_url) or ""
+        limiter = get_host_limiter(host)
+        breaker = get_circuit_breaker(host)
+        check_deadline(f"未请求{api_url}")
+        breaker.before_call()
+        # 请求结果计入熔断器后为True, 否则(时限用完或其他异常)在finally中归还半开状态的探测名额
+        recorded = False
+        wait_started_at = time.perf_counter()
+        try:
+            with limiter.slot(timeout=remaining()):
+                record_phase("wait", time.perf_counter() - wait_started_at)
+                request_timeout = clamp_timeout(API_TIMEOUT, f"未请求{api_url}")
+                started_at = time.monotonic()
+                try:
+                    with phase("fetch"):
+                        resp = session.get(rewrite_url(api_url), params=request_params, headers=headers, timeout=request_timeout)
+                except requests.exceptions.Timeout:
+                    if request_timeout < API_TIMEOUT: # type: ignore
+                        # 因剩余时限缩短的超时不计入源站故障
+                        raise DeadlineExceeded(f"请求{api_url}未完成")
+                    limiter.record(time.monotonic() - started_at, timeout=True)
+                    breaker.record_failure()
+                    recorded = True
+                    raise
+                except requests.exceptions.RequestException:
+                    limiter.record(time.monotonic() - started_at, error=True)
+                    breaker.record_failure()
+                    recorded = True
+                    raise
+                limiter.record(time.monotonic() - started_at, status_code=resp.status_code)
+            breaker.record_status(resp.status_code)
+            recorded = True
+        finally:
+            if not recorded:
+                # 未得到结果的请求不计入源站的成功或失败
+                breaker.release()
         resp.raise_for_status()
-        payload = resp.json()
+        with phase("decode"):
+            payload = resp.json()
         if not payload.get("success"):
-            raise RuntimeError(f"页面{api_url}获取失败")
-        html_snippet = (payload.get("data") or {}).get("html")
-        if not html_snippet:
-            raise RuntimeError(f"页面{api_url}信息获取失败")
-        return html_snippet
+            return None
+        return (payload.get("data") or {}).get("html") or None
     
-    def get_news_url_dict(self, child_url):
-        try:
-            url = join_urls(self.url, child_url=child_url)
-            html_text = get_html_from_url(url=url)
-            soup = BeautifulSoup(html_text.encode('utf-8'), "html5lib")  # type: ignore
-            api_url, params = self.extract_request_params(soup=soup)
-            # 通过请求获取实际需要的html页面
-            html_snippet = self.simulate_request(index_url=url, api_url=api_url, request_params=params) # type: ignore
-            html_snippet_soup = BeautifulSoup(html_snippet, "html5lib")
-            few_days = get_few_days_ago(day_offset=1)
-            news_url_dict = {}
-            for li in html_snippet_soup.select("ul.txtList_01 li, ul.txtList_02 li, ul.txtList_03 li"):
-                a_tag = li.find("a")
-                if not a_tag:
-                    continue
-                title = (a_tag.get("title") or a_tag.get_text(strip=True) or "").strip() # type: ignore
-                href = a_tag.get("href", "").strip() # type: ignore
-                if not title or not href:
-                    continue
-                span = li.find("span")
-                date_text = (span.get_text(strip=True) if span else li.get_text(" ", strip=True)).strip("[] ")
-                if date_text not in few_days:
-                    continue
-                title = f"{title};{date_text}"
-                complete_url = urljoin(self.url, href)
-                news_url_dict[title] = complete_url
-            return news_url_dict
-        except RuntimeError as e:
-            print(e)
+    def get_request_params(self, channel: str) -> Tuple[str, str, Dict[str, str]]:
+        """
+        获取栏目分页接口的请求参数, 每个栏目只获取并解析一次栏目页
+
+        Returns:
+            (栏目页url, 分页接口url, queryData)
+
+        Raises:
+            FetchError: 栏目页获取失败
+            RuntimeError: 栏目页中没有分页接口的参数
+        """
+        key = (self.url, channel)
+        cached = _request_params.get(key)
+        if cached is not None:
+            return cached
+        url = join_urls(self.url, child_url=f'{channel}/index.html')
+        html_text = fetch_html(url=url)
+        with phase("extract"):
+            api_url, params = self.parse_index_page(html_text)
+        with _request_params_lock:
+            _request_params[key] = (url, api_url, params) # type: ignore
+        return _request_params[key]
+
+    def get_news_url_dict(self, channel: str):
+        """
+        获取栏目时效范围内的 标题;日期 -> 详情页url 映射
+        先请求第一页, 第一页的条目都在时效范围内时并发请求之后的页, 直到某一页的最早日期超出时效范围
+
+        Raises:
+            FetchError: 某一页获取失败
+            RuntimeError: 第一页没有内容或栏目页中没有分页接口的参数
+        """
+        few_days = get_few_days_ago(day_offset=1)
+        first_page = self.get_page_entries(channel, 0)
+        if first_page is None:
+            raise RuntimeError(f"{channel}栏目列表没有内容")
+        pages = {0: first_page}
+        if first_page and min(few_days) <= (oldest_date(first_page) or ""):
+            for page, entries in walk_pages(lambda page: self.get_page_entries(channel, page),
+                                            since=min(few_days), workers=PAGE_WORKERS, max_pages=MAX_PAGES - 1, first_page=1):
+                pages[page] = entries
+        news_url_dict = {}
+        # 并发请求的页按完成顺序返回, 合并时恢复页码顺序
+        for page in sorted(pages):
+            news_url_dict.update({title: url for title, url in pages[page].items() if entry_date(title) in few_days})
+        return news_url_dict
+    
+    def parse_index_page(self, html_text: str):
+        """解析栏目页, 返回分页接口的url与请求参数"""
+        # 只需要页面中的script标签
+        soup = parse_html(html_text, parse_only=SoupStrainer('script'))
+        return self.extract_request_params(soup=soup)
+    
+    def parse_news_url_dict(self, html_snippet: str):
+        """解析分页接口返回的html片段, 返回时效范围内的 标题;日期 -> 详情页url 的映射"""
+        few_days = get_few_days_ago(day_offset=1)
+        return {title: url for title, url in self.parse_entries(html_snippet).items() if entry_date(title) in few_days}
+
+    def parse_entries(self, html_snippet: str) -> Dict[str, str]:
+        """解析分页接口返回的html片段, 返回全部条目的 标题;日期 -> 详情页url 的映射"""
+        html_snippet_soup = parse_html(html_snippet)
+        news_url_dict = {}
+        for li in html_snippet_soup.select("ul.txtList_01 li, ul.txtList_02 li, ul.txtList_03 li"):
+            a_tag = li.find("a")
+            if not a_tag:
+                continue
+            title = (a_tag.get("title") or a_tag.get_text(strip=True) or "").strip() # type: ignore
+            href = a_tag.get("href", "").strip() # type: ignore
+            if not title or not href:
+                continue
+            span = li.find("span")
+            date_text = (span.get_text(strip=True) if span else li.get_text(" ", strip=True)).strip("[] ")
+            title = f"{title};{date_text}"
+            complete_url = urljoin(self.url, href)
+            news_url_dict[title] = complete_url
+        return news_url_dict
         
+    @staticmethod
+    def build_news(title: str, url: str, html_text: str) -> News:
+        """解析单个新闻详情页, title为 标题;日期 格式, 不依赖爬虫实例, 可交给解析进程池执行"""
+        div = find_target(html_text, *ARTICLE_TARGET)
+        p_tags = div.find_all('p', style='text-align: justify; text-indent: 2em;') # type: ignore
+        text = "".join([p.get_text(strip=True) for p in p_tags])
+        title, publish_date = title.split(";")
+        return News(title=title, 
+                    url=url,
+                    origin='商务部', 
+                    summary=text, 
+                    publish_date=publish_date)
+    
+    def get_merged_news_url_dict(self):
+        """合并领导人活动与部领导活动两个栏目的新闻链接"""
+        merged = {}
+        for channel in CHANNELS:
+            merged.update(self.get_news_url_dict(channel))
+        return merged
+
+    def backfill_channels(self) -> List[str]:
+        return list(CHANNELS)
+
+    def get_page_entries(self, channel: str, page: int) -> Optional[Dict[str, str]]:
+        """
+        获取栏目分页接口第page页(pageNo为page+1)的全部条目
+
+        Returns:
+            标题;日期 -> 详情页url 的映射, 接口明确返回没有内容时返回None, 表示列表已结束
+
+        Raises:
+            FetchError: 栏目页或接口请求失败(网络错误、超时、5xx/429等), 不能当作列表已结束
+            RuntimeError: 栏目页中没有分页接口的参数
+        """
+        url, api_url, params = self.get_request_params(channel)
+        try:
+            html_snippet = self.simulate_request(index_url=url, api_url=api_url, request_params=params, page_no=page + 1)
+        except requests.exceptions.RequestException as e:
+            if page == 0:
+                # 第一页请求失败时, 缓存的接口参数可能已失效(如栏目改版), 下次重新解析栏目页
+                with _request_params_lock:
+                    _request_params.pop((self.url, channel), None)
+            status_code = e.response.status_code if e.response is not None else None
+            raise FetchError(api_url, f"{type(e).__name__}: {e}", status_code=status_code) from e
+        if html_snippet is None:
+            if page == 0:
+                with _request_params_lock:
+                    _request_params.pop((self.url, channel), None)
+            logger.info(f"{channel}第{page + 1}页没有内容, 列表结束")
+            return None
+        with phase("extract"):
+            return self.parse_entries(html_snippet)
+
+    def collect(self, news_url_dict: Dict[str, str]) -> Tuple[List[News], List[FetchResult]]:
+        """并发获取一组详情页, 文章存储中已有的不再下载, 返回(新闻列表, 失败结果)"""
+        return collect_news(news_url_dict, self.build_news, store=self.article_store, until=ARTICLE_TARGET)
+    
+    def iter_news(self) -> Iterator[Union[News, FetchResult]]:
+        """
+        逐条产出新闻, 详情页按获取完成的顺序解析并产出
+        获取或解析失败的详情页以FetchResult形式产出
+        """
+        merged = self.get_merged_news_url_dict()
+        yield from iter_collect_news(merged, self.build_news, store=self.article_store, until=ARTICLE_TARGET)
+    
     def get_news(self):
         try:
-            ldrhd_news_url_dict = self.get_news_url_dict(child_url=r'xwfb/ldrhd/index.html')
-            bldhd_news_url_dict = self.get_news_url_dict(child_url=r'xwfb/bldhd/index.html')
-            merged = {** ldrhd_news_url_dict, ** bldhd_news_url_dict} # type: ignore
-            news_lst = []
-            for title, url in merged.items():
-                html_text = get_html_from_url(url=url)
-                soup = BeautifulSoup(html_text.encode('utf-8'), "html5lib")  # type: ignore
-                div = soup.find('div', class_='art-con art-con-bottonmLine')
-                p_tags = div.find_all('p', style='text-align: justify; text-indent: 2em;') # type: ignore
-                text = "".join([p.get_text(strip=True) for p in p_tags])
-                title, publish_date = title.split(";")
-                news_lst.append(News(title=title, 
-                                     url=url,
-                                     origin='商务部', 
-                                     summary=text, 
-                                     publish_date=publish_date))
+            merged = self.get_merged_news_url_dict()
+            # 列表与上次成功爬取相同时直接返回上次的新闻, 否则只获取新增且文章存储中没有的详情页
+            news_lst, failed_results = collect_changed(f"{type(self).__name__}:{self.url}", merged, self.collect)
+            failures = summarize_failures(failed_results)
             if len(news_lst) > 0: 
-                return NewsResponse(news_list=news_lst)
+                return NewsResponse(news_list=news_lst, err_info=failures)
+            elif failures:
+                return NewsResponse(news_list=None, status="ERROR", err_code='500', err_info=failures)
             else:
                 return NewsResponse(news_list=None, status="OK", err_code=None, err_info="有效时限内未有新闻")
-        except RuntimeError as e:
+        except CircuitOpenError as e:
+            return NewsResponse(news_list=None, status="ERROR", err_code=CIRCUIT_OPEN_ERR_CODE, err_info=f"{str(e)}")
+        except DeadlineExceeded as e:
+            return NewsResponse(news_list=None, status="ERROR", err_code=DEADLINE_ERR_CODE, err_info=f"{str(e)}")
+        except (FetchError, requests.exceptions.RequestException, RuntimeError) as e:
+            # 任意一页获取失败时不返回可能缺页的列表
             return NewsResponse(news_list=None, status="ERROR", err_code='500', err_info=f"{str(e)}")
 
 if __name__ == '__main__':
@@ -1,13 +1,44 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 # 导入API路由
-from api import cctv_news_router, ai_news_router, gov_news_router
+from api import cctv_news_router, ai_news_router, gov_news_router, news_router, metrics_router, backfill_router, RequestTimingMiddleware
+from service import crawl_executor, create_crawl_scheduler
+from service.backfill import backfill_manager
+from utils.browser_pool import shutdown_browser_pools
+from utils.parse_pool import get_parse_pool, shutdown_parse_pool
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 启用解析进程池时预先启动所有子进程, 第一次爬取不再等待子进程启动
+    parse_pool = get_parse_pool()
+    if parse_pool is not None:
+        await asyncio.to_thread(parse_pool.start)
+    # 启动后台调度器, 按各来源的发布节奏预爬取并写入缓存
+    scheduler = create_crawl_scheduler()
+    if scheduler is not None:
+        scheduler.start()
+    yield
+    if scheduler is not None:
+        await scheduler.stop()
+    # 应用退出时关闭爬虫线程池与常驻浏览器, 回填任务在当前页面完成后停止, 之后可从检查点继续
+    crawl_executor.shutdown()
+    backfill_manager.shutdown()
+    shutdown_browser_pools()
+    shutdown_parse_pool()
+
+
+app = FastAPI(lifespan=lifespan)
+# 各请求的分阶段耗时, 输出为Server-Timing响应头与结构化日志
+app.add_middleware(RequestTimingMiddleware)
 
 
 # 注册路由
 app.include_router(cctv_news_router, prefix="/api", tags=["CCTV News"])
 app.include_router(ai_news_router, prefix="/api", tags=["AI News"])
 app.include_router(gov_news_router, prefix="/api", tags=["GOVERNMENT News"])
-
+app.include_router(news_router, prefix="/api", tags=["Aggregated News"])
+app.include_router(backfill_router, prefix="/api", tags=["Backfill"])
+# Prometheus约定的抓取路径, 不加/api前缀
+app.include_router(metrics_router, tags=["Metrics"])
\ No newline at end of file
@@ -1,5 +1,7 @@
 from .response.news_response import NewsResponse
 from .response.news import News
+from .response.aggregated_news_response import AggregatedNewsResponse, SourceStatus
+from .response.backfill_response import BackfillResponse
 
 
-__all__ = ['NewsResponse', 'News']
+__all__ = ['NewsResponse', 'News', 'AggregatedNewsResponse', 'SourceStatus', 'BackfillResponse']
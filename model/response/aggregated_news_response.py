@@ -0,0 +1,16 @@
+from typing import Optional, Dict
+from pydantic import BaseModel, Field
+
+from .news_response import NewsResponse
+
+
+class SourceStatus(BaseModel):
+    status: str = Field(default="OK", description="Source status flag, OK/ERROR/TIMEOUT")
+    err_code: Optional[str] = Field(default=None, description="Error code")
+    err_info: Optional[str] = Field(default=None, description="Error info")
+    count: int = Field(default=0, description="The number of news from this source")
+    elapsed_ms: Optional[float] = Field(default=None, description="Time spent on this source in milliseconds")
+
+
+class AggregatedNewsResponse(NewsResponse):
+    sources: Dict[str, SourceStatus] = Field(default_factory=dict, description="The status of each requested source")
@@ -0,0 +1,16 @@
+from typing import Optional
+from pydantic import BaseModel, Field
+
+
+class BackfillResponse(BaseModel):
+    source: str = Field(description="The source being backfilled")
+    start_date: str = Field(description="First publish date of the range, YYYY-MM-DD")
+    end_date: str = Field(description="Last publish date of the range, YYYY-MM-DD")
+    status: str = Field(default="RUNNING", description="Job status flag, PENDING/RUNNING/FINISHED/CANCELLED/ERROR")
+    units_done: int = Field(default=0, description="The number of list pages or days completed, including those resumed from the checkpoint")
+    units_resumed: int = Field(default=0, description="The number of list pages or days skipped because the checkpoint had them")
+    units_failed: int = Field(default=0, description="The number of list pages or days that could not be fetched, retried on the next run")
+    news_count: int = Field(default=0, description="The number of news in the range stored in the archive by this run")
+    failed_count: int = Field(default=0, description="The number of detail pages that failed, retried on the next run")
+    elapsed_ms: Optional[float] = Field(default=None, description="Time spent on this run in milliseconds")
+    err_info: Optional[str] = Field(default=None, description="Error info")
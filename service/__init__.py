@@ -0,0 +1,20 @@
+"""
+服务模块，负责爬虫任务的调度与执行
+"""
+from .crawl_executor import CrawlExecutor, CrawlRejectedError, crawl_executor
+from .news_cache import NewsCache, news_cache, SOURCE_CACHE_POLICY
+from .sources import SourceSpec, SOURCES, crawl_source, get_deadline, register_config_sources
+from .news_service import load_source_news, get_source_news, refresh_source_news, profile_source_news
+from .news_stream import iter_source_news, stream_source_news
+from .news_aggregator import aggregate_news, resolve_sources
+from .scheduler import CrawlScheduler, CronSchedule, IntervalSchedule, create_crawl_scheduler
+# 回填模块同时是命令行入口(python -m service.backfill), 不在包中导入, 避免以-m运行时重复导入
+
+
+__all__ = ['CrawlExecutor', 'CrawlRejectedError', 'crawl_executor',
+           'NewsCache', 'news_cache', 'SOURCE_CACHE_POLICY',
+           'SourceSpec', 'SOURCES', 'crawl_source', 'get_deadline', 'register_config_sources',
+           'load_source_news', 'get_source_news', 'refresh_source_news', 'profile_source_news',
+           'iter_source_news', 'stream_source_news',
+           'aggregate_news', 'resolve_sources',
+           'CrawlScheduler', 'CronSchedule', 'IntervalSchedule', 'create_crawl_scheduler']
\ No newline at end of file
@@ -0,0 +1,416 @@
+"""
+历史回填: 按日期范围遍历来源的历史列表(按页码翻页或按日期访问), 并发获取详情页并写入文章存储
+
+每完成一个列表页(或一天)即写入检查点, 中断后以相同的来源与日期范围重新运行, 已完成的页面不再获取;
+未完成页面中已保存的详情页由文章存储直接返回, 同样不再下载
+
+Example:
+    python -m service.backfill transport=2025-01-01..2025-03-31 cctv=2025-03-01..2025-03-31
+    python -m service.backfill transport commerce --start 2025-01-01 --workers 8
+"""
+import sys
+sys.path.append(".")
+import os
+import json
+import time
+import logging
+import argparse
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from model import BackfillResponse
+from utils import FetchError, filter_entries, oldest_date, iter_days, parse_date, walk_pages, source_scope
+from .sources import SOURCES
+
+
+logger = logging.getLogger(__name__)
+
+# 检查点所在目录
+BACKFILL_DIR = os.getenv("BACKFILL_DIR", os.path.join("data", "backfill"))
+# 每个来源同时处理的列表页(或天)数, 详情页由共享抓取引擎并发获取, 同一域名的请求速率仍受限速器控制
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", "4"))
+
+
+class BackfillCheckpoint:
+    def __init__(self, path: str, source: str, start_date: str, end_date: str):
+        """
+        回填进度的JSON检查点, 记录已完成的列表页(或天), 线程安全
+
+        Args:
+            path: 检查点文件路径, 文件已存在时读取其中的进度
+            source: 来源名称
+            start_date: 起始日期
+            end_date: 结束日期
+        """
+        super(BackfillCheckpoint, self).__init__()
+        self.path = path
+        self._lock = threading.Lock()
+        self._data: Dict[str, Any] = {"source": source,
+                                      "start_date": start_date,
+                                      "end_date": end_date,
+                                      "finished": False,
+                                      "units": {}}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._data.update(json.load(f))
+
+    @classmethod
+    def for_job(cls, source: str, start_date: str, end_date: str, checkpoint_dir: Optional[str] = None) -> "BackfillCheckpoint":
+        """同一来源与日期范围使用同一个检查点文件"""
+        path = os.path.join(checkpoint_dir or BACKFILL_DIR, f"{source}_{start_date}_{end_date}.json")
+        return cls(path, source, start_date, end_date)
+
+    @property
+    def finished(self) -> bool:
+        return bool(self._data["finished"])
+
+    def units(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return dict(self._data["units"])
+
+    def get(self, unit: str) -> Optional[Dict[str, Any]]:
+        """已完成单元的记录, 未完成时返回None"""
+        with self._lock:
+            return self._data["units"].get(unit)
+
+    def mark_done(self, unit: str, record: Dict[str, Any]):
+        with self._lock:
+            self._data["units"][unit] = record
+            self._save()
+
+    def finish(self):
+        with self._lock:
+            self._data["finished"] = True
+            self._save()
+
+    def _save(self):
+        # 先写临时文件再替换, 进程在写入过程中被终止也不会损坏已有的检查点
+        self._data["updated_at"] = datetime.now().isoformat(timespec="seconds")
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+
+class BackfillJob:
+    def __init__(self,
+                 source: str,
+                 start_date: str,
+                 end_date: Optional[str] = None,
+                 workers: int = BACKFILL_WORKERS,
+                 checkpoint_dir: Optional[str] = None):
+        """
+        单个来源在[start_date, end_date]内的回填任务
+
+        Args:
+            source: 来源名称, 需支持回填(爬虫提供backfill_mode)
+            start_date: 起始日期, YYYY-MM-DD
+            end_date: 结束日期, 默认为当天
+            workers: 同时处理的列表页(或天)数
+            checkpoint_dir: 检查点目录, 默认读取环境变量BACKFILL_DIR
+
+        Raises:
+            ValueError: 来源不存在或不支持回填、日期不合法、文章存储未开启
+        """
+        super(BackfillJob, self).__init__()
+        if source not in SOURCES:
+            raise ValueError(f"未知的来源{source}")
+        end_date = end_date or datetime.today().strftime(r"%Y-%m-%d")
+        if parse_date(start_date) > parse_date(end_date):
+            raise ValueError(f"起始日期{start_date}晚于结束日期{end_date}")
+        self.source = source
+        self.start_date = start_date
+        self.end_date = end_date
+        self.workers = max(1, workers)
+        self.crawler = SOURCES[source].build_crawler()
+        self.mode: Optional[str] = getattr(self.crawler, "backfill_mode", None)
+        if self.mode is None:
+            raise ValueError(f"来源{source}不支持回填")
+        if self.crawler.article_store is None:
+            raise ValueError("回填结果保存在文章存储中, 请设置ARTICLE_STORE_PATH")
+        self.checkpoint = BackfillCheckpoint.for_job(source, start_date, end_date, checkpoint_dir)
+        self.status = "PENDING"
+        self.err_info: Optional[str] = None
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._units_done = 0
+        self._units_resumed = 0
+        self._units_failed = 0
+        self._news_count = 0
+        self._failed_count = 0
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+
+    @property
+    def job_id(self) -> str:
+        return f"{self.source}_{self.start_date}_{self.end_date}"
+
+    def cancel(self):
+        """不再开始新的列表页, 正在处理的页面完成后结束, 之后可从检查点继续"""
+        self._cancelled.set()
+
+    def run(self) -> BackfillResponse:
+        """同步执行回填, 返回本次运行的统计"""
+        self._started_at = time.perf_counter()
+        self.status = "RUNNING"
+        logger.info(f"开始回填{self.source}: {self.start_date}至{self.end_date}, 并发{self.workers}")
+        try:
+            # 回填过程中的抓取、解析指标以该来源为标签
+            with source_scope(self.source):
+                if self.mode == "daily":
+                    self._run_daily()
+                else:
+                    for channel in self.crawler.backfill_channels():
+                        self._run_paged(channel)
+            if self._cancelled.is_set():
+                self.status = "CANCELLED"
+            elif self._units_failed or self._failed_count:
+                # 获取失败的列表页与有详情页失败的页面未记入检查点, 重新运行时只获取这些页面
+                self.status = "ERROR"
+                failures = []
+                if self._units_failed:
+                    failures.append(f"{self._units_failed}个列表页(或天)获取失败")
+                if self._failed_count:
+                    failures.append(f"{self._failed_count}个详情页获取失败")
+                self.err_info = f"{', '.join(failures)}, 重新运行可继续回填"
+            else:
+                self.status = "FINISHED"
+                self.checkpoint.finish()
+        except Exception as e:
+            logger.exception(f"回填{self.source}失败")
+            self.status = "ERROR"
+            self.err_info = f"{type(e).__name__}: {e}"
+        self._finished_at = time.perf_counter()
+        result = self.snapshot()
+        logger.info(f"回填{self.source}结束: {result.model_dump_json()}")
+        return result
+
+    def snapshot(self) -> BackfillResponse:
+        """当前进度, 可在执行过程中从其他线程调用"""
+        elapsed = None
+        if self._started_at is not None:
+            elapsed = ((self._finished_at or time.perf_counter()) - self._started_at) * 1000
+        with self._lock:
+            return BackfillResponse(source=self.source,
+                                    start_date=self.start_date,
+                                    end_date=self.end_date,
+                                    status=self.status,
+                                    units_done=self._units_done,
+                                    units_resumed=self._units_resumed,
+                                    units_failed=self._units_failed,
+                                    news_count=self._news_count,
+                                    failed_count=self._failed_count,
+                                    elapsed_ms=round(elapsed, 1) if elapsed is not None else None,
+                                    err_info=self.err_info)
+
+    def _collect(self, unit: str, entries: Dict[str, str], record: Dict[str, Any]):
+        """获取单元内日期范围中的详情页, 全部成功后记入检查点"""
+        in_range = filter_entries(entries, self.start_date, self.end_date)
+        news_list, failed_results = self.crawler.collect(in_range) if in_range else ([], [])
+        with self._lock:
+            self._news_count += len(news_list)
+            self._failed_count += len(failed_results)
+        if failed_results:
+            logger.warning(f"{self.source} {unit}有{len(failed_results)}个详情页获取失败, 未记入检查点")
+            return
+        self.checkpoint.mark_done(unit, {**record, "news": len(news_list)})
+        with self._lock:
+            self._units_done += 1
+
+    def _fail_unit(self, unit: str, error: FetchError):
+        """列表页获取失败不能当作列表结束或当天没有新闻, 记为失败且不记入检查点"""
+        logger.warning(f"{self.source} {unit}获取失败, 未记入检查点: {error}")
+        with self._lock:
+            self._units_failed += 1
+
+    def _resume(self, unit: str) -> Optional[Dict[str, Any]]:
+        record = self.checkpoint.get(unit)
+        if record is not None:
+            with self._lock:
+                self._units_done += 1
+                self._units_resumed += 1
+        return record
+
+    def _run_paged(self, channel: str):
+        # 并发翻页时页面乱序完成, 检查点中第N页完成时第N-1页可能失败; 之后有新文章时条目向后移动,
+        # 移到第N页的条目不在其检查点中. 因此只复用从第0页开始连续完成的页面, 之后的页面重新获取
+        prefix = f"page:{channel}:"
+        done_pages = {int(unit[len(prefix):]): record for unit, record in self.checkpoint.units().items() if unit.startswith(prefix)}
+        resumable = 0
+        while resumable in done_pages:
+            resumable += 1
+
+        def load_page(page: int) -> Optional[Dict[str, str]]:
+            if self._cancelled.is_set():
+                return None
+            unit = f"page:{channel}:{page}"
+            record = self._resume(unit) if page < resumable else None
+            if record is not None:
+                # 新文章总是出现在第一页, 连续完成的页面中的条目只会移到之后的页面, 不会漏掉
+                return record["entries"]
+            try:
+                entries = self.crawler.get_page_entries(channel, page)
+            except FetchError as e:
+                # 无法判断之后的页码是否还在日期范围内, 不再翻页, 重新运行时从该页继续
+                self._fail_unit(unit, e)
+                return None
+            if entries is None:
+                logger.info(f"{self.source} {channel}第{page}页不存在, 列表结束")
+                return None
+            # 保存该页的全部条目, 继续运行时直接用于判断是否翻到了起始日期之前
+            self._collect(unit, entries, {"entries": entries, "oldest": oldest_date(entries)})
+            return entries
+
+        max_pages = getattr(self.crawler, "backfill_max_pages", 500)
+        # 连续完成的页面中已有早于起始日期的页面时, 之后的页码不需要再获取
+        for page in range(resumable):
+            oldest = done_pages[page].get("oldest")
+            if oldest and oldest < self.start_date:
+                max_pages = min(max_pages, page + 1)
+                break
+        for page, entries in walk_pages(load_page, since=self.start_date, workers=self.workers, max_pages=max_pages):
+            logger.debug("%s %s第%d页完成, %d条", self.source, channel, page, len(entries))
+
+    def _run_daily(self):
+        def load_day(day: str):
+            if self._cancelled.is_set():
+                return
+            unit = f"day:{day}"
+            if self._resume(unit) is not None:
+                return
+            try:
+                entries = self.crawler.get_day_entries(day)
+            except FetchError as e:
+                self._fail_unit(unit, e)
+                return
+            if not entries:
+                # 当天的列表不存在或尚未发布, 不记入检查点, 下次运行重新检查
+                logger.info(f"{self.source} {day}没有条目")
+                return
+            self._collect(unit, entries, {"entries": len(entries)})
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="backfill-day") as executor:
+            # 每天使用独立的上下文副本, 来源标签等上下文变量在线程中可见
+            futures = [executor.submit(contextvars.copy_context().run, load_day, day)
+                       for day in iter_days(self.start_date, self.end_date)]
+            for future in futures:
+                future.result()
+
+
+class BackfillManager:
+    def __init__(self, max_jobs: int = 2):
+        """
+        在后台线程中执行API提交的回填任务, 同一来源与日期范围同时只执行一个
+
+        Args:
+            max_jobs: 同时执行的任务数, 其余任务排队
+        """
+        super(BackfillManager, self).__init__()
+        self._executor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="backfill")
+        self._jobs: Dict[str, Tuple[BackfillJob, Future]] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, source: str, start_date: str, end_date: Optional[str] = None, workers: int = BACKFILL_WORKERS) -> BackfillResponse:
+        """
+        提交回填任务, 相同的任务正在执行或排队时返回其进度
+
+        Raises:
+            ValueError: 来源不存在或不支持回填、日期不合法
+        """
+        job = BackfillJob(source, start_date, end_date, workers=workers)
+        with self._lock:
+            existing = self._jobs.get(job.job_id)
+            if existing is not None and not existing[1].done():
+                return existing[0].snapshot()
+            self._jobs[job.job_id] = (job, self._executor.submit(job.run))
+        return job.snapshot()
+
+    def status(self, source: str, start_date: str, end_date: Optional[str] = None) -> Optional[BackfillResponse]:
+        """
+        任务进度: 本进程中提交过的任务返回其进度, 否则根据检查点文件返回已完成的单元数, 都没有时返回None
+        """
+        end_date = end_date or datetime.today().strftime(r"%Y-%m-%d")
+        with self._lock:
+            existing = self._jobs.get(f"{source}_{start_date}_{end_date}")
+        if existing is not None:
+            return existing[0].snapshot()
+        checkpoint = BackfillCheckpoint.for_job(source, start_date, end_date)
+        if not os.path.exists(checkpoint.path):
+            return None
+        units = checkpoint.units()
+        return BackfillResponse(source=source,
+                                start_date=start_date,
+                                end_date=end_date,
+                                status="FINISHED" if checkpoint.finished else "PENDING",
+                                units_done=len(units),
+                                news_count=sum(record.get("news", 0) for record in units.values()))
+
+    def shutdown(self):
+        """取消所有任务, 已完成的页面保存在检查点中"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job, _ in jobs:
+            job.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+backfill_manager = BackfillManager(max_jobs=int(os.getenv("BACKFILL_MAX_JOBS", "2")))
+
+
+def parse_job_spec(spec: str, default_start: Optional[str], default_end: Optional[str]) -> Tuple[str, str, Optional[str]]:
+    """
+    解析命令行中的 来源[=起始日期..结束日期]
+
+    Example:
+        transport=2025-01-01..2025-03-31 -> ("transport", "2025-01-01", "2025-03-31")
+        cctv -> ("cctv", default_start, default_end)
+
+    Raises:
+        ValueError: 没有起始日期
+    """
+    source, _, date_range = spec.partition("=")
+    start_date, _, end_date = date_range.partition("..")
+    start_date = start_date or default_start
+    if not start_date:
+        raise ValueError(f"{source}缺少起始日期, 使用{source}=YYYY-MM-DD..YYYY-MM-DD或--start指定")
+    return source, start_date, end_date or default_end
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="按日期范围回填来源的历史新闻, 中断后重新运行可从检查点继续")
+    arg_parser.add_argument("jobs", nargs="+", help="来源或 来源=起始日期..结束日期, 如transport=2025-01-01..2025-03-31")
+    arg_parser.add_argument("--start", default=None, help="未单独指定日期的来源使用的起始日期")
+    arg_parser.add_argument("--end", default=None, help="未单独指定日期的来源使用的结束日期, 默认为当天")
+    arg_parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS, help="每个来源同时处理的列表页(或天)数")
+    arg_parser.add_argument("--checkpoint-dir", default=None, help="检查点目录, 默认为BACKFILL_DIR")
+    args = arg_parser.parse_args(argv)
+
+    try:
+        jobs = [BackfillJob(source, start_date, end_date, workers=args.workers, checkpoint_dir=args.checkpoint_dir)
+                for source, start_date, end_date in (parse_job_spec(spec, args.start, args.end) for spec in args.jobs)]
+    except ValueError as e:
+        arg_parser.error(str(e))
+    # 不同来源的源站互不影响, 同时回填
+    executor = ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="backfill")
+    futures = [executor.submit(job.run) for job in jobs]
+    try:
+        results: List[BackfillResponse] = [future.result() for future in futures]
+    except KeyboardInterrupt:
+        # 正在处理的页面完成并写入检查点后退出
+        logger.info("收到中断, 等待正在处理的页面完成")
+        for job in jobs:
+            job.cancel()
+        results = [future.result() for future in futures]
+    finally:
+        executor.shutdown(wait=True)
+    for result in results:
+        print(result.model_dump_json())
+    return 0 if all(result.status == "FINISHED" for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
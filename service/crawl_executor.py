@@ -0,0 +1,126 @@
+import sys
+sys.path.append(".")
+import os
+import logging
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, TypeVar
+
+from utils import metrics_registry, profile_thread
+
+
+logger = logging.getLogger(__name__)
+T = TypeVar("T")
+
+
+def _run_profiled(func: Callable[..., T], *args, **kwargs) -> T:
+    """在线程池中执行func, 分析本次请求时执行期间计入采样"""
+    with profile_thread():
+        return func(*args, **kwargs)
+
+
+class CrawlRejectedError(RuntimeError):
+    """爬虫执行器排队已满时抛出, API层转换为503"""
+    def __init__(self, source: str, queue_depth: int):
+        super(CrawlRejectedError, self).__init__(f"{source}爬虫任务排队已满({queue_depth}), 请稍后重试")
+        self.source = source
+        self.queue_depth = queue_depth
+
+
+class CrawlExecutor:
+    def __init__(self,
+                 max_workers: int = 8,
+                 source_concurrency: int = 2,
+                 queue_depth: int = 16,
+                 source_limits: Optional[Dict[str, int]] = None):
+        """
+        将同步爬虫放到独立的有界线程池中执行, 避免阻塞FastAPI事件循环
+
+        Args:
+            max_workers: 爬虫线程池最大线程数
+            source_concurrency: 每个来源默认同时执行的最大爬虫数
+            queue_depth: 每个来源允许排队(含执行中)的最大任务数, 超出后直接拒绝
+            source_limits: 按来源单独指定的并发数, 覆盖source_concurrency
+        """
+        super(CrawlExecutor, self).__init__()
+        self.max_workers = max_workers
+        self.source_concurrency = source_concurrency
+        self.queue_depth = queue_depth
+        self.source_limits = source_limits or {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crawl")
+        # 以下状态只在事件循环线程中读写, 无需加锁
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._pending: Dict[str, int] = {}
+        self._running: Dict[str, int] = {}
+
+    def _get_semaphore(self, source: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(source)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.source_limits.get(source, self.source_concurrency))
+            self._semaphores[source] = semaphore
+        return semaphore
+
+    def pending(self, source: str) -> int:
+        """返回来源当前排队及执行中的任务数"""
+        return self._pending.get(source, 0)
+
+    def check_capacity(self, source: str):
+        """
+        检查来源是否还能接收新任务
+
+        Raises:
+            CrawlRejectedError: 来源排队任务数达到上限
+        """
+        if self.pending(source) >= self.queue_depth:
+            logger.warning(f"{source}爬虫任务排队已满, 拒绝新请求")
+            raise CrawlRejectedError(source, self.queue_depth)
+
+    async def run(self, source: str, func: Callable[..., T], *args, **kwargs) -> T:
+        """
+        在爬虫线程池中执行func并等待结果
+
+        Args:
+            source: 来源名称, 用于并发与排队限制
+            func: 同步执行的爬虫函数, 如crawler.get_news
+
+        Raises:
+            CrawlRejectedError: 来源排队任务数达到上限
+        """
+        self.check_capacity(source)
+        self._pending[source] = self.pending(source) + 1
+        try:
+            async with self._get_semaphore(source):
+                loop = asyncio.get_running_loop()
+                # 复制当前上下文, 使上下文变量在线程池中同样可见
+                context = contextvars.copy_context()
+                call = functools.partial(context.run, _run_profiled, func, *args, **kwargs)
+                self._running[source] = self._running.get(source, 0) + 1
+                try:
+                    return await loop.run_in_executor(self._executor, call)
+                finally:
+                    self._running[source] -= 1
+        finally:
+            self._pending[source] -= 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """各来源执行中与排队中的任务数"""
+        return {source: {"running": self._running.get(source, 0),
+                         "queued": pending - self._running.get(source, 0)}
+                for source, pending in list(self._pending.items())}
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+# 执行器参数可通过环境变量CRAWL_MAX_WORKERS、CRAWL_SOURCE_CONCURRENCY、CRAWL_QUEUE_DEPTH配置
+crawl_executor = CrawlExecutor(max_workers=int(os.getenv("CRAWL_MAX_WORKERS", "8")),
+                               source_concurrency=int(os.getenv("CRAWL_SOURCE_CONCURRENCY", "2")),
+                               queue_depth=int(os.getenv("CRAWL_QUEUE_DEPTH", "16")))
+
+
+metrics_registry.gauge("crawler_crawls_in_flight", "各来源正在执行的爬取数", ("source",),
+                       callback=lambda: {(source, ): item["running"] for source, item in crawl_executor.snapshot().items()})
+metrics_registry.gauge("crawler_crawls_queued", "各来源等待执行的爬取数", ("source",),
+                       callback=lambda: {(source, ): item["queued"] for source, item in crawl_executor.snapshot().items()})
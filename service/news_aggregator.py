@@ -0,0 +1,103 @@
+import sys
+sys.path.append(".")
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from model import AggregatedNewsResponse, NewsResponse, SourceStatus
+from utils import DEADLINE_ERR_CODE, deadline_scope
+from .crawl_executor import CrawlRejectedError
+from .news_service import get_source_news, DEADLINE_GRACE
+from .sources import SOURCES
+
+
+logger = logging.getLogger(__name__)
+
+
+# 聚合接口默认的整体超时秒数
+DEFAULT_AGGREGATE_TIMEOUT = float(os.getenv("AGGREGATE_TIMEOUT", "30"))
+
+
+def resolve_sources(sources: Optional[List[str]] = None) -> List[str]:
+    """
+    校验来源名称并按SOURCES中的顺序去重, 为空时返回全部来源
+
+    Raises:
+        ValueError: 存在未定义的来源
+    """
+    if not sources:
+        return list(SOURCES)
+    unknown = [source for source in sources if source not in SOURCES]
+    if unknown:
+        raise ValueError(f"未知的来源: {', '.join(unknown)}, 可选: {', '.join(SOURCES)}")
+    return [source for source in SOURCES if source in sources]
+
+
+def _source_status(task: asyncio.Task, elapsed_ms: float) -> SourceStatus:
+    if task.cancelled():
+        return SourceStatus(status="ERROR", err_code="500", err_info="任务被取消", elapsed_ms=elapsed_ms)
+    error = task.exception()
+    if isinstance(error, CrawlRejectedError):
+        return SourceStatus(status="ERROR", err_code="503", err_info=f"Crawler busy: {error}", elapsed_ms=elapsed_ms)
+    if error is not None:
+        return SourceStatus(status="ERROR", err_code="500", err_info=f"{error}", elapsed_ms=elapsed_ms)
+    result: NewsResponse = task.result()
+    status = "TIMEOUT" if result.status == "ERROR" and result.err_code == DEADLINE_ERR_CODE else result.status
+    return SourceStatus(status=status, err_code=result.err_code, err_info=result.err_info,
+                        count=len(result.news_list or []), elapsed_ms=elapsed_ms)
+
+
+async def aggregate_news(sources: Optional[List[str]] = None,
+                         timeout: Optional[float] = None) -> AggregatedNewsResponse:
+    """
+    并发获取多个来源的新闻并合并, 总耗时取决于最慢的来源而非各来源之和
+
+    Args:
+        sources: 来源名称列表, 为空时获取全部来源
+        timeout: 整体时限秒数, 各来源只返回时限内获取到的新闻, 一条都没有获取到的来源标记为TIMEOUT, 默认AGGREGATE_TIMEOUT
+
+    Returns:
+        合并后的新闻列表(按来源顺序)以及每个来源的状态
+    """
+    sources = resolve_sources(sources)
+    timeout = DEFAULT_AGGREGATE_TIMEOUT if timeout is None else timeout
+    started_at = time.perf_counter()
+    finished_at: Dict[str, float] = {}
+
+    def on_done(source: str):
+        return lambda _: finished_at.setdefault(source, round((time.perf_counter() - started_at) * 1000, 1))
+
+    tasks: Dict[str, asyncio.Task] = {}
+    # 整体时限通过上下文传递给各来源, 每个来源取整体时限与自身默认时限中较早的一个
+    with deadline_scope(timeout):
+        for source in sources:
+            task = asyncio.ensure_future(get_source_news(source))
+            task.add_done_callback(on_done(source))
+            tasks[source] = task
+    _, pending = await asyncio.wait(tasks.values(), timeout=timeout + DEADLINE_GRACE)
+    for task in pending:
+        # 只取消等待, 来源的爬取任务受shield保护, 完成后仍会写入缓存供下次请求使用
+        task.cancel()
+
+    news_list = []
+    statuses: Dict[str, SourceStatus] = {}
+    for source, task in tasks.items():
+        if task in pending:
+            statuses[source] = SourceStatus(status="TIMEOUT", err_code=DEADLINE_ERR_CODE,
+                                            err_info=f"超过{timeout:g}秒未完成", elapsed_ms=timeout * 1000)
+            continue
+        statuses[source] = _source_status(task, finished_at.get(source, 0.0))
+        if statuses[source].status == "OK":
+            news_list.extend(task.result().news_list or [])
+
+    failed = [f"{source}({status.err_info})" for source, status in statuses.items() if status.status != "OK"]
+    if failed:
+        logger.warning(f"聚合新闻部分来源失败: {'; '.join(failed)}")
+    if len(failed) == len(sources):
+        return AggregatedNewsResponse(news_list=None, status="ERROR", err_code="500",
+                                      err_info=f"所有来源均失败: {'; '.join(failed)}", sources=statuses)
+    return AggregatedNewsResponse(news_list=news_list,
+                                  err_info=f"{len(failed)}个来源失败: {'; '.join(failed)}" if failed else None,
+                                  sources=statuses)
@@ -0,0 +1,139 @@
+import sys
+sys.path.append(".")
+import time
+import asyncio
+import logging
+import contextvars
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from model import NewsResponse
+from utils import expired, deadline_scope, CACHE_REQUESTS
+
+
+logger = logging.getLogger(__name__)
+
+
+# 各来源的缓存策略: (新鲜期秒数, 过期后仍可返回旧数据并后台刷新的秒数)
+# 新闻联播为前一日内容、Aibase为每日简报, 政府网站在工作时间内更新
+SOURCE_CACHE_POLICY: Dict[str, Tuple[float, float]] = {
+    "cctv": (6 * 3600, 24 * 3600),
+    "ai": (2 * 3600, 24 * 3600),
+    "transport": (30 * 60, 6 * 3600),
+    "commerce": (30 * 60, 6 * 3600),
+}
+DEFAULT_CACHE_POLICY: Tuple[float, float] = (10 * 60, 3600)
+
+
+@dataclass
+class CacheEntry:
+    value: NewsResponse
+    created_at: float  # time.monotonic()时间戳
+
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+
+class NewsCache:
+    def __init__(self,
+                 policies: Optional[Dict[str, Tuple[float, float]]] = None,
+                 default_policy: Tuple[float, float] = DEFAULT_CACHE_POLICY):
+        """
+        进程内的新闻响应缓存, 支持按来源TTL、过期后返回旧数据并后台刷新、同一来源并发加载合并
+
+        Args:
+            policies: 按来源指定的(ttl, stale_ttl)
+            default_policy: 未指定来源的缓存策略
+        """
+        super(NewsCache, self).__init__()
+        self.policies = policies if policies is not None else dict(SOURCE_CACHE_POLICY)
+        self.default_policy = default_policy
+        # 以下状态只在事件循环线程中读写, 无需加锁
+        self._entries: Dict[str, CacheEntry] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def policy(self, source: str) -> Tuple[float, float]:
+        return self.policies.get(source, self.default_policy)
+
+    @staticmethod
+    def is_cacheable(value: NewsResponse) -> bool:
+        """只缓存成功的响应, 错误结果下次请求重新爬取"""
+        return value.status == "OK"
+
+    def get(self, source: str) -> Optional[CacheEntry]:
+        return self._entries.get(source)
+
+    def put(self, source: str, value: NewsResponse):
+        if self.is_cacheable(value):
+            self._entries[source] = CacheEntry(value=value, created_at=time.monotonic())
+
+    def invalidate(self, source: Optional[str] = None):
+        if source is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(source, None)
+
+    async def _load(self, source: str, loader: Callable[[], Awaitable[NewsResponse]], timeout: Optional[float]) -> NewsResponse:
+        # 上下文复制自触发加载的请求, 时限改为加载自身的时限, 不受该请求较短的timeout影响
+        with deadline_scope(timeout, inherit=False):
+            value = await loader()
+            partial = expired()
+        if partial:
+            # 超出加载时限时爬虫只返回了部分结果, 不写入缓存
+            logger.info(f"{source}爬取超出时限, 结果不写入缓存")
+        else:
+            self.put(source, value)
+        return value
+
+    def refresh(self, source: str, loader: Callable[[], Awaitable[NewsResponse]], timeout: Optional[float] = None) -> asyncio.Task:
+        """
+        触发一次加载, 同一来源已有加载任务时直接复用该任务
+        加载任务复制触发加载的请求的上下文, 分阶段计时、来源标签与采样分析器记录在该请求中,
+        时限则只使用timeout, 不继承该请求的时限; 各请求只以自己的时限等待任务
+
+        Args:
+            timeout: 加载的时限秒数, None表示不限时
+
+        Returns:
+            加载任务, 结果为最新的NewsResponse
+        """
+        task = self._inflight.get(source)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._load(source, loader, timeout), context=contextvars.copy_context())
+            self._inflight[source] = task
+            task.add_done_callback(lambda _: self._inflight.pop(source, None))
+        return task
+
+    async def get_or_load(self, source: str, loader: Callable[[], Awaitable[NewsResponse]], timeout: Optional[float] = None) -> NewsResponse:
+        """
+        优先返回缓存结果, 必要时通过loader加载
+
+        Args:
+            source: 来源名称, 作为缓存键
+            loader: 返回NewsResponse的协程函数, 如lambda: crawl_executor.run(...)
+            timeout: 需要加载时加载任务的时限秒数, 与调用方自身的时限无关
+        """
+        ttl, stale_ttl = self.policy(source)
+        entry = self._entries.get(source)
+        if entry is not None:
+            age = entry.age()
+            if age < ttl:
+                CACHE_REQUESTS.inc("response", "hit")
+                return entry.value
+            if age < ttl + stale_ttl:
+                # 先返回旧数据, 后台刷新缓存
+                CACHE_REQUESTS.inc("response", "stale")
+                task = self.refresh(source, loader, timeout)
+                task.add_done_callback(self._log_refresh_error)
+                return entry.value
+        CACHE_REQUESTS.inc("response", "miss")
+        # shield保证单个请求被取消时不会中断其他请求共享的加载任务
+        return await asyncio.shield(self.refresh(source, loader, timeout))
+
+    @staticmethod
+    def _log_refresh_error(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"后台刷新缓存失败: {task.exception()}")
+
+
+news_cache = NewsCache()
@@ -0,0 +1,67 @@
+import sys
+sys.path.append(".")
+import asyncio
+from typing import Optional, Tuple
+
+from model import NewsResponse
+from utils import CIRCUIT_OPEN_ERR_CODE, DEADLINE_ERR_CODE, deadline_scope, remaining, profiling_scope, SamplingProfiler
+from .crawl_executor import crawl_executor
+from .news_cache import news_cache
+from .sources import crawl_source, get_deadline
+
+
+# 时限到达后继续等待爬虫返回部分结果的秒数
+DEADLINE_GRACE = 1.0
+
+
+async def load_source_news(source: str) -> NewsResponse:
+    """在爬虫线程池中爬取来源, 不经过缓存"""
+    return await crawl_executor.run(source, crawl_source, source)
+
+
+async def get_source_news(source: str, timeout: Optional[float] = None) -> NewsResponse:
+    """
+    获取来源的新闻, 优先返回缓存(含调度器预爬取的结果), 并发请求只触发一次爬取
+    源站熔断或超出时限时返回最近一次成功的结果(即使已超出缓存有效期), 没有时返回对应错误
+
+    Args:
+        source: 来源名称
+        timeout: 本次请求的时限秒数, 默认使用来源的时限, 只限制本次请求的等待; 共享的爬取始终使用来源的时限
+    """
+    timeout = get_deadline(source) if timeout is None else timeout
+    with deadline_scope(timeout):
+        try:
+            # 共享的爬取使用来源的默认时限, 本次请求的时限只限制等待, 并留出返回部分结果的时间
+            result = await asyncio.wait_for(news_cache.get_or_load(source, lambda: load_source_news(source), get_deadline(source)),
+                                            timeout=max(remaining(), 0) + DEADLINE_GRACE) # type: ignore
+        except asyncio.TimeoutError:
+            result = NewsResponse(news_list=None, status="ERROR", err_code=DEADLINE_ERR_CODE, err_info=f"超出请求时限{timeout:g}秒")
+    if result.status == "ERROR" and result.err_code in (CIRCUIT_OPEN_ERR_CODE, DEADLINE_ERR_CODE):
+        entry = news_cache.get(source)
+        if entry is not None:
+            return entry.value.model_copy(update={"err_info": f"{result.err_info}, 返回{entry.age() / 60:.0f}分钟前的结果"})
+    return result
+
+
+async def refresh_source_news(source: str) -> NewsResponse:
+    """强制重新爬取来源并更新缓存, 与正在进行的同来源爬取合并"""
+    return await asyncio.shield(news_cache.refresh(source, lambda: load_source_news(source), get_deadline(source)))
+
+
+async def profile_source_news(source: str, timeout: Optional[float] = None, interval: float = 0.005) -> Tuple[NewsResponse, SamplingProfiler]:
+    """
+    对来源执行一次爬取并采样调用栈, 不读写缓存, 也不与正在进行的同来源爬取合并, 保证采样到的是本次爬取
+
+    Args:
+        source: 来源名称
+        timeout: 本次爬取的时限秒数, 默认使用来源的时限
+        interval: 采样间隔秒数
+
+    Returns:
+        (爬取结果, 已停止的采样分析器)
+    """
+    timeout = get_deadline(source) if timeout is None else timeout
+    with profiling_scope(interval=interval) as profiler:
+        with deadline_scope(timeout):
+            result = await load_source_news(source)
+    return result, profiler
@@ -0,0 +1,82 @@
+import sys
+sys.path.append(".")
+import time
+import asyncio
+import threading
+from typing import AsyncIterator, Iterator, Optional, Union
+
+from model import News
+from utils import FetchResult, deadline_scope, source_scope, CACHE_REQUESTS, CRAWL_DURATION, CRAWL_ITEMS
+from .crawl_executor import crawl_executor
+from .news_cache import news_cache
+from .sources import SOURCES, get_deadline
+
+
+_STREAM_END = object()
+
+
+def iter_source_news(source: str) -> Iterator[Union[News, FetchResult]]:
+    """同步逐条产出来源的新闻, 在爬虫线程池中调用"""
+    return SOURCES[source].build_crawler().iter_news()
+
+
+async def stream_source_news(source: str, timeout: Optional[float] = None) -> AsyncIterator[Union[News, FetchResult]]:
+    """
+    异步逐条产出来源的新闻
+    缓存仍在有效期内时直接产出缓存结果, 否则在爬虫线程池中执行iter_news并将结果转发到事件循环
+
+    Args:
+        source: 来源名称
+        timeout: 本次请求的时限秒数, 默认使用来源的时限, 到达时限后不再获取新的详情页
+
+    Yields:
+        News, 获取或解析失败的详情页以FetchResult形式产出
+
+    Raises:
+        CrawlRejectedError: 来源排队任务数达到上限
+        Exception: 爬虫本身抛出的异常, 如列表页解析失败
+    """
+    entry = news_cache.get(source)
+    ttl, _ = news_cache.policy(source)
+    if entry is not None and entry.age() < ttl:
+        CACHE_REQUESTS.inc("response", "hit")
+        for news in entry.value.news_list or []:
+            yield news
+        return
+    CACHE_REQUESTS.inc("response", "miss")
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop_event = threading.Event()
+
+    def pump():
+        started_at, count, status = time.perf_counter(), 0, "ERROR"
+        with source_scope(source):
+            generator = iter_source_news(source)
+            try:
+                for item in generator:
+                    if stop_event.is_set():
+                        # 客户端已断开, 停止获取剩余详情页
+                        break
+                    count += isinstance(item, News)
+                    loop.call_soon_threadsafe(queue.put_nowait, item)
+                status = "OK"
+            finally:
+                generator.close()
+                CRAWL_DURATION.observe(time.perf_counter() - started_at, source, status)
+                CRAWL_ITEMS.observe(count, source)
+
+    with deadline_scope(get_deadline(source) if timeout is None else timeout):
+        # 任务创建时复制当前上下文, 时限随之传递到爬虫线程
+        task = loop.create_task(crawl_executor.run(source, pump))
+    # 完成回调排在线程转发的数据之后执行, 保证结束标记是最后一个元素
+    task.add_done_callback(lambda _: queue.put_nowait(_STREAM_END))
+    try:
+        while True:
+            item = await queue.get()
+            if item is _STREAM_END:
+                break
+            yield item
+        await task
+    finally:
+        stop_event.set()
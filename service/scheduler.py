@@ -0,0 +1,194 @@
+import sys
+sys.path.append(".")
+import os
+import random
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from .sources import SOURCES, get_schedule
+from .news_service import refresh_source_news
+
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_cron_field(field: str, low: int, high: int) -> Set[int]:
+    """解析cron的单个字段, 支持 *、*/n、a-b、a-b/n、a,b,c"""
+    values: Set[int] = set()
+    for part in field.split(","):
+        expr, _, step_text = part.partition("/")
+        step = int(step_text) if step_text else 1
+        if expr == "*":
+            start, end = low, high
+        elif "-" in expr:
+            start_text, end_text = expr.split("-", 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = int(expr)
+            end = high if step_text else start
+        if start < low or end > high or start > end or step < 1:
+            raise ValueError(f"cron字段超出范围: {field}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    def __init__(self,
+                 expression: str):
+        """
+        标准5段cron表达式(分 时 日 月 周), 周的取值0-6, 0表示周日; 日与周同时限制时需同时满足
+
+        Example:
+            CronSchedule("*/30 8-18 * * 1-5")  # 工作日8点到18点每30分钟
+        """
+        super(CronSchedule, self).__init__()
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron表达式必须包含5个字段: {expression}")
+        self.expression = expression
+        self.minutes = _parse_cron_field(fields[0], 0, 59)
+        self.hours = _parse_cron_field(fields[1], 0, 23)
+        self.days = _parse_cron_field(fields[2], 1, 31)
+        self.months = _parse_cron_field(fields[3], 1, 12)
+        self.weekdays = {day % 7 for day in _parse_cron_field(fields[4], 0, 7)}
+
+    def _day_matches(self, moment: datetime) -> bool:
+        # datetime.weekday()中0为周一, 转换为cron中0为周日
+        return (moment.month in self.months and moment.day in self.days
+                and (moment.weekday() + 1) % 7 in self.weekdays)
+
+    def next_after(self, moment: datetime) -> datetime:
+        """返回严格晚于moment的下一次触发时间"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 4)
+        while candidate < limit:
+            if not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+                continue
+            if candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+                continue
+            return candidate
+        raise ValueError(f"cron表达式没有可触发的时间: {self.expression}")
+
+
+class IntervalSchedule:
+    _UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+    def __init__(self,
+                 expression: str):
+        """
+        固定间隔调度, 表达式形如"@every 30m"、"@every 2h"、"@every 900"(秒)
+        """
+        super(IntervalSchedule, self).__init__()
+        self.expression = expression
+        value = expression[len("@every"):].strip()
+        unit = value[-1].lower()
+        if unit in self._UNITS:
+            self.seconds = float(value[:-1]) * self._UNITS[unit]
+        else:
+            self.seconds = float(value)
+        if self.seconds <= 0:
+            raise ValueError(f"调度间隔必须大于0: {expression}")
+
+    def next_after(self, moment: datetime) -> datetime:
+        return moment + timedelta(seconds=self.seconds)
+
+
+def parse_schedule(expression: str):
+    """根据表达式创建CronSchedule或IntervalSchedule"""
+    expression = expression.strip()
+    if expression.startswith("@every"):
+        return IntervalSchedule(expression)
+    return CronSchedule(expression)
+
+
+class CrawlScheduler:
+    def __init__(self,
+                 jitter: float = 60.0,
+                 run_on_start: bool = True):
+        """
+        应用内的爬虫调度器, 按各来源的发布节奏预先爬取并写入缓存
+
+        Args:
+            jitter: 每次触发前额外随机等待的最大秒数, 避免多个来源或多个worker同时请求
+            run_on_start: 启动后是否立即为每个来源执行一次预爬取
+        """
+        super(CrawlScheduler, self).__init__()
+        self.jitter = jitter
+        self.run_on_start = run_on_start
+        self._jobs: Dict[str, tuple] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._running: Set[str] = set()
+
+    def add_job(self, name: str, expression: str, job: Callable[[], Awaitable]):
+        """
+        注册调度任务
+
+        Args:
+            name: 任务名称, 同名任务不会并行执行
+            expression: cron表达式或"@every 30m"形式的间隔
+            job: 无参协程函数
+        """
+        self._jobs[name] = (parse_schedule(expression), job)
+
+    async def _run_job(self, name: str, job: Callable[[], Awaitable]):
+        if name in self._running:
+            logger.info(f"调度任务{name}上一次执行尚未结束, 跳过本次")
+            return
+        self._running.add(name)
+        started_at = datetime.now()
+        try:
+            await job()
+            logger.info(f"调度任务{name}执行完成, 耗时{(datetime.now() - started_at).total_seconds():.1f}秒")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"调度任务{name}执行失败: {e}")
+        finally:
+            self._running.discard(name)
+
+    async def _loop(self, name: str):
+        schedule, job = self._jobs[name]
+        if self.run_on_start:
+            await asyncio.sleep(random.uniform(0, self.jitter))
+            await self._run_job(name, job)
+        while True:
+            next_run = schedule.next_after(datetime.now())
+            delay = (next_run - datetime.now()).total_seconds() + random.uniform(0, self.jitter)
+            logger.info(f"调度任务{name}下次执行时间: {next_run:%Y-%m-%d %H:%M}")
+            await asyncio.sleep(max(delay, 0))
+            await self._run_job(name, job)
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        for name in self._jobs:
+            self._tasks.append(loop.create_task(self._loop(name), name=f"schedule-{name}"))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+
+def create_crawl_scheduler() -> Optional[CrawlScheduler]:
+    """
+    为所有来源创建调度器, 通过环境变量配置:
+        SCHEDULER_ENABLED: 是否启用(默认1)
+        SCHEDULER_JITTER: 随机等待的最大秒数(默认60)
+        SCHEDULER_RUN_ON_START: 启动时是否立即预爬取(默认1)
+        SCHEDULE_<来源名大写>: 覆盖来源的调度规则
+    """
+    if os.getenv("SCHEDULER_ENABLED", "1").lower() not in ("1", "true", "yes"):
+        return None
+    scheduler = CrawlScheduler(jitter=float(os.getenv("SCHEDULER_JITTER", "60")),
+                               run_on_start=os.getenv("SCHEDULER_RUN_ON_START", "1").lower() in ("1", "true", "yes"))
+    for source in SOURCES:
+        scheduler.add_job(source, get_schedule(source), lambda source=source: refresh_source_news(source))
+    return scheduler
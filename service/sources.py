@@ -0,0 +1,97 @@
+import sys
+sys.path.append(".")
+import os
+import time
+import logging
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Dict, Optional
+
+from ai_news import AiNewsCrawler
+from gov_news import CommerceNewsCrawler
+from generic_news import ExtractionPlan, GenericNewsCrawler, load_source_configs
+from model import NewsResponse
+from utils import source_scope, CRAWL_DURATION, CRAWL_ITEMS
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SourceSpec:
+    """新闻来源定义: 入口url、爬虫类以及预爬取的调度规则"""
+    name: str
+    url: str
+    crawler_cls: Callable
+    schedule: str
+    deadline: float = 20.0  # API请求未指定时限时使用的默认秒数
+
+    def build_crawler(self):
+        return self.crawler_cls(url=self.url)
+
+
+# 调度规则为cron表达式(分 时 日 月 周)或"@every 30m"形式的固定间隔,
+# 可通过环境变量SCHEDULE_<来源名大写>覆盖, 如SCHEDULE_CCTV="0 20 * * *"
+# 请求时限可通过环境变量DEADLINE_<来源名大写>覆盖, 如DEADLINE_COMMERCE="45"
+# 新闻联播、交通部由config/sources/*.yaml描述, 在下方register_config_sources()中注册
+SOURCES: Dict[str, SourceSpec] = {
+    # Aibase每日上午发布一篇日报
+    "ai": SourceSpec(name="ai",
+                     url=r"https://news.aibase.com/zh/daily",
+                     crawler_cls=AiNewsCrawler,
+                     schedule="0 7-12 * * *",
+                     deadline=15.0),
+    # 商务部在工作日的工作时间内更新
+    "commerce": SourceSpec(name="commerce",
+                           url=r"https://www.mofcom.gov.cn/",
+                           crawler_cls=CommerceNewsCrawler,
+                           schedule="*/30 8-18 * * 1-5",
+                           deadline=30.0),
+}
+
+
+def register_config_sources(config_dir: Optional[str] = None) -> Dict[str, SourceSpec]:
+    """
+    读取YAML来源配置并注册为使用通用爬虫的来源, 与已注册的来源同名时覆盖
+    每个来源的提取计划只在此处编译一次, 之后每次爬取复用
+
+    Args:
+        config_dir: 配置目录, 默认读取环境变量SOURCE_CONFIG_DIR, 未设置时为config/sources
+
+    Raises:
+        ValueError: 配置文件不合法
+    """
+    registered = {}
+    for config in load_source_configs(config_dir):
+        plan = ExtractionPlan(config)
+        registered[config.name] = SourceSpec(name=config.name,
+                                             url=config.url,
+                                             crawler_cls=partial(GenericNewsCrawler, plan),
+                                             schedule=config.schedule,
+                                             deadline=config.deadline)
+        logger.debug(f"从{config.source_file}加载来源{config.name}")
+    SOURCES.update(registered)
+    return registered
+
+
+# 交通部、新闻联播等 列表页 -> 详情页 结构的来源由config/sources/*.yaml描述
+register_config_sources()
+
+
+def get_schedule(source: str) -> str:
+    return os.getenv(f"SCHEDULE_{source.upper()}", SOURCES[source].schedule)
+
+
+def get_deadline(source: str) -> float:
+    return float(os.getenv(f"DEADLINE_{source.upper()}", SOURCES[source].deadline))
+
+
+def crawl_source(source: str) -> NewsResponse:
+    """同步执行一次来源的完整爬取, 在爬虫线程池中调用"""
+    started_at = time.perf_counter()
+    # 爬取过程中的抓取、解码、解析指标以该来源为标签
+    with source_scope(source):
+        result = SOURCES[source].build_crawler().get_news()
+    CRAWL_DURATION.observe(time.perf_counter() - started_at, source, result.status)
+    CRAWL_ITEMS.observe(len(result.news_list or []), source)
+    return result
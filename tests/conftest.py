@@ -0,0 +1,26 @@
+"""
+测试的公共配置: 在导入应用之前关闭调度器与文章存储, HTTP缓存写入临时目录, 爬虫请求改写到本地回放源站
+回放源站不需要限速, 提高令牌桶速率使多次爬取不必排队
+"""
+import os
+import tempfile
+
+os.environ["SCHEDULER_ENABLED"] = "0"
+os.environ["ARTICLE_STORE_PATH"] = ""
+os.environ["HTTP_CACHE_DIR"] = tempfile.mkdtemp(prefix="http_cache_")
+os.environ["RATE_LIMIT_RPS"] = "1000"
+
+import pytest
+
+from benchmark.replay_origin import OriginBehavior, ReplayOrigin
+from utils import set_url_rewrites
+
+
+@pytest.fixture(scope="session")
+def replay_origin():
+    """在随机端口启动回放源站, 并将四个源站的地址改写到该源站"""
+    origin = ReplayOrigin(port=0, behavior=OriginBehavior(latency=0.01, jitter=0), seed=0).start()
+    set_url_rewrites(origin.rewrite_rules())
+    yield origin
+    set_url_rewrites([])
+    origin.stop()
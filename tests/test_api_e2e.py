@@ -0,0 +1,89 @@
+"""
+端到端测试: 应用通过回放源站爬取交通部新闻, 检查Server-Timing中的各阶段耗时与各级缓存是否生效
+"""
+import re
+import asyncio
+from collections import Counter
+
+import httpx
+import pytest
+
+from main import app
+from service.news_cache import news_cache
+from utils.list_snapshot import get_list_snapshots
+
+
+TRANSPORT_PATH = "/api/get_transport_gov_news"
+TRANSPORT_HOST = "www.mot.gov.cn"
+
+
+def origin_requests(origin) -> Counter:
+    """回放源站收到的交通部请求数, 按状态码统计"""
+    return Counter(origin.snapshot().get(TRANSPORT_HOST, {}))
+
+
+def timing_phases(response: httpx.Response) -> dict:
+    """解析Server-Timing响应头, 返回 阶段名 -> 调用次数"""
+    phases = {}
+    for item in response.headers.get("server-timing", "").split(","):
+        name = item.strip().split(";", 1)[0]
+        calls = re.search(r'desc="(\d+) calls"', item)
+        phases[name] = int(calls.group(1)) if calls else None
+    return phases
+
+
+@pytest.fixture(scope="module")
+def transport_requests(replay_origin):
+    """
+    在同一个应用生命周期内依次执行: 冷启动请求、命中响应缓存的请求、清空响应缓存与列表快照后经HTTP缓存条件请求的请求
+    返回每一步的(响应, 本步源站收到的请求数)
+    """
+    async def run():
+        steps = {}
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver") as client:
+                news_cache.invalidate()
+                get_list_snapshots().clear()
+                for step in ("cold", "cached", "revalidated"):
+                    if step == "revalidated":
+                        news_cache.invalidate()
+                        get_list_snapshots().clear()
+                    before = origin_requests(replay_origin)
+                    response = await client.get(TRANSPORT_PATH)
+                    steps[step] = (response, origin_requests(replay_origin) - before)
+        return steps
+    return asyncio.run(run())
+
+
+def test_cold_request_reports_crawl_phases(transport_requests):
+    response, requests = transport_requests["cold"]
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "OK", body
+    assert body["news_list"]
+    phases = timing_phases(response)
+    # 共享爬取的各阶段计入触发它的请求: 列表页与全部详情页都经过限速等待与请求
+    fetches = sum(requests.values())
+    assert fetches == len(body["news_list"]) + 1
+    for name in ("wait", "fetch", "decode", "extract"):
+        assert phases.get(name) == fetches, response.headers["server-timing"]
+    assert "total" in phases
+
+
+def test_second_request_served_from_response_cache(transport_requests):
+    cold, _ = transport_requests["cold"]
+    response, requests = transport_requests["cached"]
+    assert response.status_code == 200
+    assert response.json() == cold.json()
+    assert sum(requests.values()) == 0
+    assert "fetch" not in timing_phases(response)
+
+
+def test_recrawl_revalidates_through_http_cache(transport_requests):
+    cold, _ = transport_requests["cold"]
+    response, requests = transport_requests["revalidated"]
+    assert response.json()["news_list"] == cold.json()["news_list"]
+    # 回放源站的响应带ETag, 列表页以条件请求重新校验;
+    # 详情页只下载到正文标签为止, 截断的响应体不写入HTTP缓存, 需要重新下载
+    assert requests["304"] == 1
+    assert requests["200"] == len(cold.json()["news_list"])
@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+import utils.tool
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from utils.tool import fetch_html
+
+
+def open_breaker(cooldown: float = 0.0, half_open_max_calls: int = 1) -> CircuitBreaker:
+    breaker = CircuitBreaker("example.com", failure_threshold=2, cooldown=cooldown, half_open_max_calls=half_open_max_calls)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_consecutive_failures():
+    breaker = open_breaker(cooldown=60)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker("example.com", failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_status(200)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_allows_limited_probes():
+    breaker = open_breaker(cooldown=0, half_open_max_calls=1)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_status(200)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_failed_probe_reopens():
+    breaker = open_breaker(cooldown=0.05)
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_status(503)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_release_returns_probe_slot():
+    breaker = open_breaker(cooldown=0)
+    breaker.before_call()
+    breaker.release()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call()
+
+
+class BrokenSession:
+    """请求时抛出非网络异常的会话"""
+    def get(self, *args, **kwargs):
+        raise ValueError("unexpected")
+
+
+def test_fetch_html_releases_probe_on_unexpected_error(monkeypatch):
+    breaker = open_breaker(cooldown=0)
+    monkeypatch.setattr(utils.tool, "get_circuit_breaker", lambda host: breaker)
+    monkeypatch.setattr(utils.tool, "get_session", lambda url: BrokenSession())
+    monkeypatch.setattr(utils.tool, "get_http_cache", lambda: None)
+    with pytest.raises(ValueError):
+        fetch_html("https://example.com/a.html", retries=1)
+    # 未得到结果的探测请求不占用半开状态的名额
+    breaker.before_call()
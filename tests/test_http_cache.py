@@ -0,0 +1,55 @@
+import os
+import time
+
+import requests
+
+from utils.http_cache import HttpCache
+
+
+def make_response(body: bytes = b"<html></html>", **headers) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response._content = body
+    response.headers.update({"ETag": '"v1"', **headers})
+    return response
+
+
+def test_store_and_conditional_headers(tmp_path):
+    cache = HttpCache(str(tmp_path))
+    cache.store("https://example.com/a.html", make_response(**{"Last-Modified": "Mon, 01 Sep 2025 00:00:00 GMT"}), encoding="utf-8")
+    cached = cache.get("https://example.com/a.html")
+    assert cached.text == "<html></html>"
+    assert not cached.is_fresh()
+    assert cached.conditional_headers() == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Sep 2025 00:00:00 GMT"}
+
+
+def test_no_store_and_uncacheable_responses_are_skipped(tmp_path):
+    cache = HttpCache(str(tmp_path))
+    cache.store("https://example.com/a.html", make_response(**{"Cache-Control": "no-store"}), encoding="utf-8")
+    response = make_response()
+    del response.headers["ETag"]
+    cache.store("https://example.com/b.html", response, encoding="utf-8")
+    assert cache.get("https://example.com/a.html") is None
+    assert cache.get("https://example.com/b.html") is None
+
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    cache = HttpCache(str(tmp_path), max_entries=10)
+    for index in range(10):
+        cache.store(f"https://example.com/{index}.html", make_response(), encoding="utf-8")
+        # 保证各文件的修改时间不同
+        time.sleep(0.01)
+    cache.get("https://example.com/0.html")
+    cache.store("https://example.com/10.html", make_response(), encoding="utf-8")
+    kept = [index for index in range(11) if cache.get(f"https://example.com/{index}.html") is not None]
+    # 超出上限后淘汰到上限的90%, 最近读取过的0号保留
+    assert kept == [0, 3, 4, 5, 6, 7, 8, 9, 10]
+
+
+def test_size_limit_counts_existing_files(tmp_path):
+    HttpCache(str(tmp_path)).store("https://example.com/old.html", make_response(b"x" * 1000), encoding="utf-8")
+    cache = HttpCache(str(tmp_path), max_bytes=1500)
+    cache.store("https://example.com/new.html", make_response(b"y" * 1000), encoding="utf-8")
+    assert cache.get("https://example.com/old.html") is None
+    assert cache.get("https://example.com/new.html") is not None
+    assert sum(len(files) for _, _, files in os.walk(tmp_path)) == 1
@@ -0,0 +1,88 @@
+from model import News
+from utils.article_store import canonicalize_url
+from utils.fetcher import FetchResult
+from utils.list_snapshot import ListSnapshotStore, collect_changed
+
+
+ENTRIES = {
+    "新闻A;2025-09-01": "https://example.com/a.html",
+    "新闻B;2025-09-01": "https://example.com/b.html",
+}
+
+
+def make_news(title: str, url: str) -> News:
+    return News(title=title, url=url, origin="测试", summary="", publish_date="2025-09-01")
+
+
+class FakeCollector:
+    """记录每次被请求的条目, failing中的url返回失败结果, 与collect_news一样同一url只产出一条新闻"""
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+
+    def __call__(self, entries):
+        self.calls.append(dict(entries))
+        news_list, failures, seen = [], [], set()
+        for title, url in entries.items():
+            if canonicalize_url(url) in seen:
+                continue
+            seen.add(canonicalize_url(url))
+            if url in self.failing:
+                failures.append(FetchResult(url=url, error="超时"))
+            else:
+                news_list.append(make_news(title, url))
+        return news_list, failures
+
+
+def test_unchanged_list_reuses_snapshot():
+    snapshots = ListSnapshotStore()
+    collector = FakeCollector()
+    collect_changed("list", ENTRIES, collector, snapshots=snapshots)
+    news_list, failures = collect_changed("list", ENTRIES, collector, snapshots=snapshots)
+    assert len(collector.calls) == 1
+    assert [news.url for news in news_list] == list(ENTRIES.values())
+    assert failures == []
+
+
+def test_only_added_entries_are_fetched():
+    snapshots = ListSnapshotStore()
+    collector = FakeCollector()
+    collect_changed("list", ENTRIES, collector, snapshots=snapshots)
+    entries = {"新闻C;2025-09-02": "https://example.com/c.html", **ENTRIES}
+    news_list, _ = collect_changed("list", entries, collector, snapshots=snapshots)
+    assert list(collector.calls[-1]) == ["新闻C;2025-09-02"]
+    assert [news.url for news in news_list] == list(entries.values())
+
+
+def test_partial_failure_keeps_previous_snapshot():
+    """有条目获取失败时不更新快照, 下次爬取重新获取失败的与本次新增的条目"""
+    snapshots = ListSnapshotStore()
+    collect_changed("list", ENTRIES, FakeCollector(), snapshots=snapshots)
+    entries = {
+        "新闻C;2025-09-02": "https://example.com/c.html",
+        "新闻D;2025-09-02": "https://example.com/d.html",
+        **ENTRIES,
+    }
+    collector = FakeCollector(failing={"https://example.com/d.html"})
+    news_list, failures = collect_changed("list", entries, collector, snapshots=snapshots)
+    assert [result.url for result in failures] == ["https://example.com/d.html"]
+    assert len(news_list) == 3
+
+    collector.failing.clear()
+    news_list, failures = collect_changed("list", entries, collector, snapshots=snapshots)
+    assert set(collector.calls[-1]) == {"新闻C;2025-09-02", "新闻D;2025-09-02"}
+    assert [news.url for news in news_list] == list(entries.values())
+    assert failures == []
+
+    # 全部成功后快照更新, 列表不变时不再获取
+    collect_changed("list", entries, collector, snapshots=snapshots)
+    assert len(collector.calls) == 2
+
+
+def test_duplicate_urls_appear_once():
+    snapshots = ListSnapshotStore()
+    entries = {**ENTRIES, "新闻A(重复);2025-09-01": "https://example.com/a.html#top"}
+    news_list, _ = collect_changed("list", entries, FakeCollector(), snapshots=snapshots)
+    assert [news.url for news in news_list] == list(ENTRIES.values())
+    news_list, _ = collect_changed("list", entries, FakeCollector(), snapshots=snapshots)
+    assert [news.url for news in news_list] == list(ENTRIES.values())
@@ -0,0 +1,69 @@
+import threading
+
+from utils.pagination import filter_entries, iter_days, oldest_date, walk_pages
+
+
+def make_pages(*dates_per_page):
+    """每页的条目为 标题;日期 -> url, dates_per_page中每一项为一页的日期列表"""
+    return [{f"第{page}页第{index}条;{publish_date}": f"https://example.com/{page}/{index}.html"
+             for index, publish_date in enumerate(dates)}
+            for page, dates in enumerate(dates_per_page)]
+
+
+class PageLoader:
+    def __init__(self, pages, missing=None):
+        self.pages = pages
+        self.missing = missing
+        self.loaded = []
+        self._lock = threading.Lock()
+
+    def __call__(self, page):
+        with self._lock:
+            self.loaded.append(page)
+        if self.missing is not None and page >= self.missing:
+            return None
+        return self.pages[page] if page < len(self.pages) else {}
+
+
+def test_stops_after_page_older_than_since():
+    loader = PageLoader(make_pages(["2025-09-03"], ["2025-09-02"], ["2025-09-01", "2025-08-31"], ["2025-08-30"]))
+    result = list(walk_pages(loader, since="2025-09-01", workers=1))
+    # 最早日期早于起始日期的页面仍然产出, 由调用方过滤条目
+    assert [page for page, _ in result] == [0, 1, 2]
+    assert loader.loaded == [0, 1, 2]
+
+
+def test_stops_on_empty_page():
+    loader = PageLoader(make_pages(["2025-09-03"], ["2025-09-02"]))
+    result = list(walk_pages(loader, since="2025-01-01", workers=1))
+    assert [page for page, _ in result] == [0, 1]
+    assert loader.loaded == [0, 1, 2]
+
+
+def test_stops_on_missing_page():
+    loader = PageLoader(make_pages(["2025-09-03"], ["2025-09-02"], ["2025-09-01"]), missing=1)
+    result = list(walk_pages(loader, since="2025-01-01", workers=1))
+    assert [page for page, _ in result] == [0]
+
+
+def test_respects_max_pages_and_first_page():
+    loader = PageLoader(make_pages(*[["2025-09-03"]] * 10))
+    result = list(walk_pages(loader, since="2025-01-01", workers=2, max_pages=3, first_page=4))
+    assert sorted(page for page, _ in result) == [4, 5, 6]
+    assert sorted(loader.loaded) == [4, 5, 6]
+
+
+def test_concurrent_walk_yields_every_page_before_stop():
+    loader = PageLoader(make_pages(*[["2025-09-03"]] * 5, ["2025-08-01"], *[["2025-07-01"]] * 10))
+    result = list(walk_pages(loader, since="2025-09-01", workers=3))
+    pages = sorted(page for page, _ in result)
+    assert pages[:6] == [0, 1, 2, 3, 4, 5]
+    # 停止页之后最多还有已提交的workers-1个页码
+    assert max(loader.loaded) <= 5 + 2
+
+
+def test_entry_helpers():
+    entries = make_pages(["2025-09-03", "2025-08-30", "2025-09-01"])[0]
+    assert oldest_date(entries) == "2025-08-30"
+    assert len(filter_entries(entries, "2025-09-01", "2025-09-03")) == 2
+    assert iter_days("2025-08-30", "2025-09-01") == ["2025-09-01", "2025-08-31", "2025-08-30"]
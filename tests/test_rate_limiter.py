@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+from utils.deadline import DeadlineExceeded
+from utils.rate_limiter import AdaptiveConcurrency, HostLimiter, TokenBucket, _parse_host_rates
+
+
+def test_token_bucket_burst_then_rate():
+    bucket = TokenBucket(rate=10, burst=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # 之后的请求按速率预定, 等待时间依次增加1/rate
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+
+def test_token_bucket_refills():
+    bucket = TokenBucket(rate=100, burst=1)
+    assert bucket.reserve() == 0.0
+    time.sleep(0.02)
+    assert bucket.reserve() == 0.0
+
+
+def test_token_bucket_pause():
+    bucket = TokenBucket(rate=100, burst=5)
+    bucket.pause(1)
+    assert bucket.reserve() == pytest.approx(1, abs=0.05)
+
+
+def test_aimd_increases_when_saturated():
+    concurrency = AdaptiveConcurrency(initial=2, max_limit=4)
+    assert concurrency.acquire(timeout=0)
+    assert concurrency.acquire(timeout=0)
+    # 每轮(约limit个请求)增加1
+    for _ in range(3):
+        concurrency.record(0.1)
+    assert concurrency.limit == 3
+    for _ in range(10):
+        concurrency.record(0.1)
+    assert concurrency.limit == 4
+
+
+def test_aimd_does_not_increase_when_idle():
+    concurrency = AdaptiveConcurrency(initial=4, max_limit=8)
+    for _ in range(10):
+        concurrency.record(0.1)
+    assert concurrency.limit == 4
+
+
+def test_aimd_halves_on_overload():
+    concurrency = AdaptiveConcurrency(initial=8, max_limit=8)
+    concurrency.record(0.1, overloaded=True)
+    assert concurrency.limit == 4
+    concurrency.record(0.1, overloaded=True)
+    concurrency.record(0.1, overloaded=True)
+    concurrency.record(0.1, overloaded=True)
+    assert concurrency.limit == 1
+
+
+def test_aimd_acquire_times_out_at_limit():
+    concurrency = AdaptiveConcurrency(initial=1, max_limit=1)
+    assert concurrency.acquire(timeout=0)
+    assert not concurrency.acquire(timeout=0.01)
+    concurrency.release()
+    assert concurrency.acquire(timeout=0)
+
+
+def test_host_limiter_slot_respects_timeout():
+    limiter = HostLimiter("example.com", TokenBucket(rate=1, burst=1), AdaptiveConcurrency(initial=2))
+    with limiter.slot(timeout=1):
+        pass
+    with pytest.raises(DeadlineExceeded):
+        with limiter.slot(timeout=0.1):
+            pass
+    assert limiter.concurrency.in_flight == 0
+
+
+def test_parse_host_rates():
+    assert _parse_host_rates("WWW.MOT.GOV.CN=1, www.mofcom.gov.cn=0.5,,bad") == {"www.mot.gov.cn": 1.0, "www.mofcom.gov.cn": 0.5}
@@ -0,0 +1,64 @@
+from datetime import datetime
+
+import pytest
+
+from service.scheduler import CronSchedule, IntervalSchedule, _parse_cron_field, parse_schedule
+
+
+@pytest.mark.parametrize("field, low, high, expected", [
+    ("*", 0, 5, {0, 1, 2, 3, 4, 5}),
+    ("*/2", 0, 5, {0, 2, 4}),
+    ("1-3", 0, 5, {1, 2, 3}),
+    ("1-5/2", 0, 5, {1, 3, 5}),
+    ("1,3,5", 0, 5, {1, 3, 5}),
+    ("3/2", 0, 9, {3, 5, 7, 9}),
+    ("0,10-12", 0, 59, {0, 10, 11, 12}),
+])
+def test_parse_cron_field(field, low, high, expected):
+    assert _parse_cron_field(field, low, high) == expected
+
+
+@pytest.mark.parametrize("field", ["60", "5-3", "*/0", "-1", "a"])
+def test_parse_cron_field_rejects_invalid(field):
+    with pytest.raises(ValueError):
+        _parse_cron_field(field, 0, 59)
+
+
+def test_cron_requires_five_fields():
+    with pytest.raises(ValueError):
+        CronSchedule("*/5 * * *")
+
+
+def test_cron_sunday_as_0_or_7():
+    assert CronSchedule("0 0 * * 7").weekdays == {0}
+    assert CronSchedule("0 0 * * 0").weekdays == {0}
+
+
+def test_cron_next_after_workdays():
+    schedule = CronSchedule("*/30 8-18 * * 1-5")
+    # 2025-09-05是周五
+    assert schedule.next_after(datetime(2025, 9, 5, 8, 10)) == datetime(2025, 9, 5, 8, 30)
+    assert schedule.next_after(datetime(2025, 9, 5, 8, 30, 15)) == datetime(2025, 9, 5, 9, 0)
+    # 周五18:30之后跳到下周一8:00
+    assert schedule.next_after(datetime(2025, 9, 5, 18, 30)) == datetime(2025, 9, 8, 8, 0)
+
+
+def test_cron_next_after_month_boundary():
+    schedule = CronSchedule("15 6 1 * *")
+    assert schedule.next_after(datetime(2025, 9, 1, 6, 15)) == datetime(2025, 10, 1, 6, 15)
+    assert schedule.next_after(datetime(2025, 12, 31, 23, 59)) == datetime(2026, 1, 1, 6, 15)
+
+
+def test_cron_without_trigger_time():
+    with pytest.raises(ValueError):
+        CronSchedule("0 0 31 2 *").next_after(datetime(2025, 1, 1))
+
+
+def test_parse_schedule_interval():
+    schedule = parse_schedule(" @every 30m ")
+    assert isinstance(schedule, IntervalSchedule)
+    assert schedule.seconds == 1800
+    assert parse_schedule("@every 900").seconds == 900
+    assert schedule.next_after(datetime(2025, 9, 5, 8, 0)) == datetime(2025, 9, 5, 8, 30)
+    with pytest.raises(ValueError):
+        parse_schedule("@every 0s")
@@ -4,22 +4,204 @@
 
 from .tool import (
     get_html_from_url,
+    fetch_html,
+    FetchError,
     get_few_days_ago,
     join_urls,
     is_valid_url,
     get_domain_from_url,
+    rewrite_url,
+    set_url_rewrites,
+    parse_url_rewrites,
     create_session,
+    get_session,
+    SessionRegistry,
+    session_registry,
     set_random_user_agent,
     DEFAULT_HEADERS
 )
+from .fetcher import (
+    FetchEngine,
+    FetchResult,
+    get_fetch_engine,
+    fetch_all,
+    summarize_failures,
+    collect_news,
+    iter_collect_news
+)
+from .parser import (
+    parse_html,
+    parse_document,
+    find_target,
+    build_xpath,
+    HTML_PARSER
+)
+from .encoding import (
+    detect_encoding,
+    EncodingDetector
+)
+from .http_cache import (
+    HttpCache,
+    get_http_cache
+)
+from .article_store import (
+    ArticleStore,
+    canonicalize_url,
+    get_article_store
+)
+from .rate_limiter import (
+    TokenBucket,
+    AdaptiveConcurrency,
+    HostLimiter,
+    rate_limiter_registry,
+    get_host_limiter
+)
+from .circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CIRCUIT_OPEN_ERR_CODE,
+    circuit_breaker_registry,
+    get_circuit_breaker
+)
+from .deadline import (
+    DeadlineExceeded,
+    DEADLINE_ERR_CODE,
+    deadline_scope,
+    remaining,
+    expired,
+    check_deadline,
+    clamp_timeout
+)
+from .metrics import (
+    MetricsRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    metrics_registry,
+    get_metrics_registry,
+    source_scope,
+    current_source,
+    CACHE_REQUESTS,
+    CRAWL_DURATION,
+    CRAWL_ITEMS
+)
+from .timing import (
+    PhaseTimer,
+    timing_scope,
+    current_timer,
+    phase,
+    record_phase
+)
+from .parse_pool import (
+    ParsePool,
+    get_parse_pool,
+    shutdown_parse_pool
+)
+from .list_snapshot import (
+    ListSnapshot,
+    ListSnapshotStore,
+    list_fingerprint,
+    collect_changed,
+    get_list_snapshots
+)
+from .pagination import (
+    entry_date,
+    oldest_date,
+    filter_entries,
+    parse_date,
+    iter_days,
+    walk_pages
+)
+from .profiler import (
+    SamplingProfiler,
+    profiling_scope,
+    profile_thread
+)
 
 __all__ = [
     'get_html_from_url',
+    'fetch_html',
+    'FetchError',
     'get_few_days_ago',
     'join_urls',
     'is_valid_url',
     'get_domain_from_url',
+    'rewrite_url',
+    'set_url_rewrites',
+    'parse_url_rewrites',
     'create_session',
+    'get_session',
+    'SessionRegistry',
+    'session_registry',
     'set_random_user_agent',
-    'DEFAULT_HEADERS'
+    'DEFAULT_HEADERS',
+    'FetchEngine',
+    'FetchResult',
+    'get_fetch_engine',
+    'fetch_all',
+    'summarize_failures',
+    'collect_news',
+    'iter_collect_news',
+    'parse_html',
+    'parse_document',
+    'find_target',
+    'build_xpath',
+    'HTML_PARSER',
+    'detect_encoding',
+    'EncodingDetector',
+    'HttpCache',
+    'get_http_cache',
+    'ArticleStore',
+    'canonicalize_url',
+    'get_article_store',
+    'TokenBucket',
+    'AdaptiveConcurrency',
+    'HostLimiter',
+    'rate_limiter_registry',
+    'get_host_limiter',
+    'CircuitBreaker',
+    'CircuitOpenError',
+    'CIRCUIT_OPEN_ERR_CODE',
+    'circuit_breaker_registry',
+    'get_circuit_breaker',
+    'DeadlineExceeded',
+    'DEADLINE_ERR_CODE',
+    'deadline_scope',
+    'remaining',
+    'expired',
+    'check_deadline',
+    'clamp_timeout',
+    'MetricsRegistry',
+    'Counter',
+    'Gauge',
+    'Histogram',
+    'metrics_registry',
+    'get_metrics_registry',
+    'source_scope',
+    'current_source',
+    'CACHE_REQUESTS',
+    'CRAWL_DURATION',
+    'CRAWL_ITEMS',
+    'PhaseTimer',
+    'timing_scope',
+    'current_timer',
+    'phase',
+    'record_phase',
+    'ParsePool',
+    'get_parse_pool',
+    'shutdown_parse_pool',
+    'ListSnapshot',
+    'ListSnapshotStore',
+    'list_fingerprint',
+    'collect_changed',
+    'get_list_snapshots',
+    'entry_date',
+    'oldest_date',
+    'filter_entries',
+    'parse_date',
+    'iter_days',
+    'walk_pages',
+    'SamplingProfiler',
+    'profiling_scope',
+    'profile_thread'
 ]
\ No newline at end of file
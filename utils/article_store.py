@@ -0,0 +1,128 @@
+"""
+持久化文章存储，按规范化url保存已解析的详情页，避免重复下载与解析
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse, urlunparse
+
+from model import News
+
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    规范化url: 协议与域名小写, 去掉默认端口与锚点, 保留路径和查询参数
+
+    Example:
+        HTTPS://WWW.MOT.GOV.CN:443/a/b.html#top -> https://www.mot.gov.cn/a/b.html
+    """
+    parsed_url = urlparse(url.strip())
+    scheme = parsed_url.scheme.lower()
+    netloc = (parsed_url.hostname or "").lower()
+    if parsed_url.port and parsed_url.port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{parsed_url.port}"
+    return urlunparse((scheme, netloc, parsed_url.path or "/", parsed_url.params, parsed_url.query, ""))
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ArticleStore:
+    def __init__(self,
+                 db_path: str):
+        """
+        基于SQLite的文章存储, 线程安全
+
+        Args:
+            db_path: 数据库文件路径, 传入":memory:"时仅保存在内存中
+        """
+        super(ArticleStore, self).__init__()
+        self.db_path = db_path
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    url TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    origin TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    publish_date TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+
+    def get_many(self, urls: Iterable[str]) -> Dict[str, News]:
+        """
+        批量查询已保存的文章
+
+        Returns:
+            规范化url到News的映射, 未保存的url不在结果中
+        """
+        canonical_urls = list({canonicalize_url(url) for url in urls})
+        if not canonical_urls:
+            return {}
+        placeholders = ",".join("?" * len(canonical_urls))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT url, title, origin, summary, publish_date FROM articles WHERE url IN ({placeholders})",
+                canonical_urls).fetchall()
+        return {row[0]: News(title=row[1], url=row[0], origin=row[2], summary=row[3], publish_date=row[4])
+                for row in rows}
+
+    def get(self, url: str) -> Optional[News]:
+        return self.get_many([url]).get(canonicalize_url(url))
+
+    def save_many(self, news_list: List[News]):
+        """保存或更新文章, 以规范化url为主键"""
+        if not news_list:
+            return
+        now = time.time()
+        rows = [(canonicalize_url(news.url), news.title, news.origin, news.summary, news.publish_date,
+                 content_hash(news.summary), now) for news in news_list]
+        with self._lock, self._conn:
+            self._conn.executemany("""
+                INSERT INTO articles (url, title, origin, summary, publish_date, content_hash, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    title=excluded.title, origin=excluded.origin, summary=excluded.summary,
+                    publish_date=excluded.publish_date, content_hash=excluded.content_hash,
+                    fetched_at=excluded.fetched_at
+            """, rows)
+
+    def save(self, news: News):
+        self.save_many([news])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_store: Optional[ArticleStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_article_store() -> Optional[ArticleStore]:
+    """
+    获取进程内共享的文章存储, 路径通过环境变量ARTICLE_STORE_PATH配置(默认data/articles.db)
+    ARTICLE_STORE_PATH设置为空字符串时关闭文章存储, 返回None
+    """
+    global _default_store
+    db_path = os.getenv("ARTICLE_STORE_PATH", os.path.join("data", "articles.db"))
+    if not db_path:
+        return None
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ArticleStore(db_path=db_path)
+        return _default_store
@@ -0,0 +1,319 @@
+"""
+常驻无头浏览器池，复用Playwright/Selenium浏览器实例渲染列表页
+"""
+import os
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from playwright.sync_api import sync_playwright, Page, Route, Error as PlaywrightError
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+from .tool import DEFAULT_HEADERS
+from .metrics import metrics_registry
+
+
+logger = logging.getLogger(__name__)
+T = TypeVar("T")
+
+
+# 渲染列表页时拦截的资源类型
+BLOCKED_RESOURCE_TYPES = {"image", "font", "stylesheet", "media"}
+# Selenium通过CDP拦截的url模式
+BLOCKED_URL_PATTERNS = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+                        "*.css", "*.woff", "*.woff2", "*.ttf", "*.otf", "*.mp4", "*.mp3"]
+BROWSER_ARGS = ["--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu"]
+
+
+class PlaywrightBrowserPool:
+    def __init__(self,
+                 size: int = 2,
+                 max_uses: int = 50,
+                 headless: bool = True):
+        """
+        Playwright浏览器池, 每个工作线程持有一个常驻的Chromium实例
+        Playwright同步API只能在启动它的线程中使用, 因此渲染任务提交到池内线程执行
+
+        Args:
+            size: 工作线程数, 即同时存在的浏览器实例上限
+            max_uses: 单个浏览器渲染多少次后重启, 防止内存持续增长
+            headless: 是否使用无头模式
+        """
+        super(PlaywrightBrowserPool, self).__init__()
+        self.size = size
+        self.max_uses = max_uses
+        self.headless = headless
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="playwright")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.active_browsers = 0
+        self.busy_pages = 0
+
+    def _launch(self):
+        state = self._local
+        playwright = sync_playwright().start()
+        try:
+            browser = playwright.chromium.launch(headless=self.headless, args=BROWSER_ARGS)
+        except Exception:
+            # 启动失败时必须停止Playwright, 否则该线程中残留的事件循环会影响下次启动
+            playwright.stop()
+            raise
+        state.playwright = playwright
+        state.browser = browser
+        state.uses = 0
+        with self._lock:
+            self.active_browsers += 1
+        logger.info(f"启动Chromium实例({threading.current_thread().name})")
+
+    def _close_local(self):
+        state = self._local
+        if getattr(state, "playwright", None) is None:
+            return
+        try:
+            state.browser.close()
+        except Exception as e:
+            logger.warning(f"关闭Chromium实例出错: {e}")
+        try:
+            state.playwright.stop()
+        except Exception as e:
+            logger.warning(f"停止Playwright出错: {e}")
+        state.playwright = None
+        state.browser = None
+        with self._lock:
+            self.active_browsers -= 1
+
+    def _ensure_browser(self):
+        state = self._local
+        browser = getattr(state, "browser", None)
+        if browser is not None and (not browser.is_connected() or state.uses >= self.max_uses):
+            # 浏览器已崩溃或使用次数达到上限, 重启
+            self._close_local()
+            browser = None
+        if browser is None:
+            self._launch()
+        return state.browser
+
+    @staticmethod
+    def _block_resources(route: Route):
+        if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+            route.abort()
+        else:
+            route.continue_()
+
+    def _run_in_worker(self, task: Callable[[Page], T]) -> T:
+        browser = self._ensure_browser()
+        # 每次渲染使用独立的浏览器上下文, cookie与缓存互不影响
+        context = browser.new_context(user_agent=DEFAULT_HEADERS["User-Agent"])
+        context.route("**/*", self._block_resources)
+        with self._lock:
+            self.busy_pages += 1
+        try:
+            return task(context.new_page())
+        except PlaywrightError:
+            if not browser.is_connected():
+                self._close_local()
+            raise
+        finally:
+            with self._lock:
+                self.busy_pages -= 1
+            try:
+                context.close()
+            except PlaywrightError:
+                pass
+            self._local.uses = getattr(self._local, "uses", 0) + 1
+
+    def run(self, task: Callable[[Page], T], timeout: Optional[float] = None) -> T:
+        """
+        在池中的浏览器上执行渲染任务
+
+        Args:
+            task: 接收新页面对象的函数, 在池内线程中执行
+            timeout: 等待结果的最长秒数
+        """
+        return self._executor.submit(self._run_in_worker, task).result(timeout=timeout)
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"size": self.size, "active": self.active_browsers, "busy": self.busy_pages}
+
+    def shutdown(self):
+        """在各工作线程中关闭浏览器, 然后关闭线程池"""
+        barrier = threading.Barrier(self.size)
+
+        def close_worker():
+            self._close_local()
+            try:
+                # 保证每个工作线程恰好执行一次关闭任务
+                barrier.wait(timeout=10)
+            except threading.BrokenBarrierError:
+                pass
+
+        for _ in range(self.size):
+            self._executor.submit(close_worker)
+        self._executor.shutdown(wait=True)
+
+
+def create_chrome_driver(headless: bool = True) -> webdriver.Chrome:
+    """创建拦截图片、字体、样式等资源的ChromeDriver"""
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument('--headless=new')
+    for arg in BROWSER_ARGS:
+        options.add_argument(arg)
+    options.add_argument('--window-size=1920,1080')
+    options.add_argument(f'--user-agent={DEFAULT_HEADERS["User-Agent"]}')
+    options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    driver = webdriver.Chrome(options=options)
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+    driver.implicitly_wait(5)  # 设置隐式等待时间
+    return driver
+
+
+class SeleniumDriverPool:
+    def __init__(self,
+                 size: int = 2,
+                 max_uses: int = 50,
+                 driver_factory: Callable[[], webdriver.Chrome] = create_chrome_driver):
+        """
+        ChromeDriver池, 驱动实例按需创建、用完归还, 达到使用次数上限或出错时回收
+
+        Args:
+            size: 同时存在的驱动实例上限
+            max_uses: 单个驱动使用多少次后重启
+            driver_factory: 创建驱动的函数
+        """
+        super(SeleniumDriverPool, self).__init__()
+        self.size = size
+        self.max_uses = max_uses
+        self.driver_factory = driver_factory
+        self._idle: "queue.LifoQueue[webdriver.Chrome]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._uses: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.active_drivers = 0
+        self.busy_drivers = 0
+
+    def _quit(self, driver: webdriver.Chrome):
+        with self._lock:
+            self._uses.pop(id(driver), None)
+            self.active_drivers -= 1
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"关闭ChromeDriver出错: {e}")
+
+    @contextmanager
+    def driver(self, timeout: Optional[float] = None) -> Iterator[webdriver.Chrome]:
+        """
+        借出一个驱动, 使用结束后清理cookie并归还
+
+        Args:
+            timeout: 等待空闲驱动的最长秒数
+        """
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("等待空闲ChromeDriver超时")
+        driver = None
+        try:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                driver = self.driver_factory()
+                with self._lock:
+                    self.active_drivers += 1
+            with self._lock:
+                self.busy_drivers += 1
+            healthy = True
+            try:
+                yield driver
+            except WebDriverException:
+                healthy = False
+                raise
+            finally:
+                with self._lock:
+                    self.busy_drivers -= 1
+                    uses = self._uses.get(id(driver), 0) + 1
+                    self._uses[id(driver)] = uses
+                if healthy and uses < self.max_uses:
+                    try:
+                        # 清理状态, 保证下次借出时互不影响
+                        driver.delete_all_cookies()
+                        driver.get("about:blank")
+                        self._idle.put(driver)
+                    except WebDriverException:
+                        self._quit(driver)
+                else:
+                    self._quit(driver)
+        finally:
+            self._slots.release()
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"size": self.size, "active": self.active_drivers, "busy": self.busy_drivers}
+
+    def shutdown(self):
+        while True:
+            try:
+                self._quit(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+
+_pools_lock = threading.Lock()
+_playwright_pool: Optional[PlaywrightBrowserPool] = None
+_selenium_pools: Dict[bool, SeleniumDriverPool] = {}
+
+
+def get_playwright_pool() -> PlaywrightBrowserPool:
+    """获取共享的Playwright浏览器池, 通过环境变量BROWSER_POOL_SIZE、BROWSER_MAX_USES配置"""
+    global _playwright_pool
+    with _pools_lock:
+        if _playwright_pool is None:
+            _playwright_pool = PlaywrightBrowserPool(size=int(os.getenv("BROWSER_POOL_SIZE", "2")),
+                                                     max_uses=int(os.getenv("BROWSER_MAX_USES", "50")))
+        return _playwright_pool
+
+
+def get_selenium_pool(headless: bool = True) -> SeleniumDriverPool:
+    """获取共享的ChromeDriver池, 有头与无头模式分别使用独立的池"""
+    with _pools_lock:
+        pool = _selenium_pools.get(headless)
+        if pool is None:
+            pool = SeleniumDriverPool(size=int(os.getenv("BROWSER_POOL_SIZE", "2")),
+                                      max_uses=int(os.getenv("BROWSER_MAX_USES", "50")),
+                                      driver_factory=lambda: create_chrome_driver(headless=headless))
+            _selenium_pools[headless] = pool
+        return pool
+
+
+def shutdown_browser_pools():
+    """关闭所有浏览器池, 在应用退出时调用"""
+    global _playwright_pool
+    with _pools_lock:
+        pools: List = list(_selenium_pools.values())
+        _selenium_pools.clear()
+        if _playwright_pool is not None:
+            pools.append(_playwright_pool)
+            _playwright_pool = None
+    for pool in pools:
+        pool.shutdown()
+
+
+def browser_pool_snapshot() -> Dict[str, Dict[str, int]]:
+    """已创建的浏览器池的容量、实例数与正在使用的实例数"""
+    with _pools_lock:
+        pools: Dict[str, Any] = {f"selenium_{'headless' if headless else 'headed'}": pool for headless, pool in _selenium_pools.items()}
+        if _playwright_pool is not None:
+            pools["playwright"] = _playwright_pool
+    return {name: pool.snapshot() for name, pool in pools.items()}
+
+
+def _pool_gauge(key: str) -> Callable[[], Dict[Tuple[str, ...], float]]:
+    return lambda: {(name, ): item[key] for name, item in browser_pool_snapshot().items()}
+
+
+metrics_registry.gauge("crawler_browser_pool_size", "浏览器池的实例上限", ("pool",), callback=_pool_gauge("size"))
+metrics_registry.gauge("crawler_browser_pool_active", "浏览器池中已启动的实例数", ("pool",), callback=_pool_gauge("active"))
+metrics_registry.gauge("crawler_browser_pool_busy", "浏览器池中正在渲染的实例数", ("pool",), callback=_pool_gauge("busy"))
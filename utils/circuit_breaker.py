@@ -0,0 +1,163 @@
+"""
+按域名熔断：源站连续失败后在冷却期内直接失败，冷却结束后放行少量探测请求
+"""
+import os
+import time
+import logging
+import threading
+from typing import Dict, Optional
+
+from .metrics import metrics_registry
+
+
+logger = logging.getLogger(__name__)
+
+
+# 熔断时爬虫返回的错误码
+CIRCUIT_OPEN_ERR_CODE = "503"
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态时抛出, 请求不会发往源站"""
+    def __init__(self, host: str, retry_in: float):
+        super(CircuitOpenError, self).__init__(f"{host}连续请求失败, 已熔断, {retry_in:.0f}秒后重试")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self,
+                 name: str,
+                 failure_threshold: int = 5,
+                 cooldown: float = 60.0,
+                 half_open_max_calls: int = 1):
+        """
+        熔断器, 状态依次为 关闭 -> 打开 -> 半开 -> 关闭/打开
+
+        Args:
+            name: 熔断器名称, 一般为域名
+            failure_threshold: 连续失败多少次后打开
+            cooldown: 打开后经过多少秒进入半开状态
+            half_open_max_calls: 半开状态下允许同时进行的探测请求数
+        """
+        super(CircuitBreaker, self).__init__()
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.half_open_max_calls = half_open_max_calls
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def _transition(self, state: str):
+        if state != self._state:
+            logger.warning(f"{self.name}熔断器 {self._state} -> {state}")
+            self._state = state
+
+    def _refresh_state(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+            self._transition(self.HALF_OPEN)
+            self._probes = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def before_call(self):
+        """
+        请求前调用, 熔断器打开或半开状态的探测名额已用完时抛出CircuitOpenError
+
+        Raises:
+            CircuitOpenError: 请求不应发往源站
+        """
+        with self._lock:
+            self._refresh_state()
+            if self._state == self.OPEN:
+                raise CircuitOpenError(self.name, self.cooldown - (time.monotonic() - self._opened_at))
+            if self._state == self.HALF_OPEN:
+                if self._probes >= self.half_open_max_calls:
+                    raise CircuitOpenError(self.name, 0)
+                self._probes += 1
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self._state == self.HALF_OPEN:
+                self._transition(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                # 半开状态下探测失败立即重新打开
+                self._opened_at = time.monotonic()
+                self._transition(self.OPEN)
+
+    def release(self):
+        """放弃已通过before_call的请求且不计入结果, 归还半开状态的探测名额"""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record_status(self, status_code: int):
+        """根据HTTP状态码记录结果, 5xx与429视为源站故障, 其余状态码说明源站可用"""
+        if status_code >= 500 or status_code == 429:
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def snapshot(self) -> Dict[str, object]:
+        return {"state": self.state, "failures": self._failures}
+
+
+class CircuitBreakerRegistry:
+    def __init__(self,
+                 failure_threshold: int = 5,
+                 cooldown: float = 60.0):
+        """进程级熔断器注册表, 每个域名一个熔断器"""
+        super(CircuitBreakerRegistry, self).__init__()
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, host: Optional[str]) -> CircuitBreaker:
+        host = (host or "").lower()
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(host, failure_threshold=self.failure_threshold, cooldown=self.cooldown)
+                self._breakers[host] = breaker
+            return breaker
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+# 通过环境变量配置:
+#   CIRCUIT_FAILURE_THRESHOLD: 连续失败多少次后熔断(默认5)
+#   CIRCUIT_COOLDOWN: 熔断后多少秒放行探测请求(默认60)
+circuit_breaker_registry = CircuitBreakerRegistry(failure_threshold=int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5")),
+                                                  cooldown=float(os.getenv("CIRCUIT_COOLDOWN", "60")))
+
+
+def get_circuit_breaker(host: Optional[str]) -> CircuitBreaker:
+    """获取域名对应的共享熔断器"""
+    return circuit_breaker_registry.get(host)
+
+
+# 熔断器状态在指标中的取值
+_STATE_VALUES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+metrics_registry.gauge("crawler_circuit_state", "各域名熔断器状态, 0关闭 1半开 2打开", ("host",),
+                       callback=lambda: {(host, ): _STATE_VALUES[item["state"]] for host, item in circuit_breaker_registry.snapshot().items()})
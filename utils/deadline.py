@@ -0,0 +1,79 @@
+"""
+请求级时限：API层设置截止时间，通过上下文变量传递到爬虫、抓取与渲染
+"""
+import time
+import contextvars
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+# 时限超出时爬虫返回的错误码
+DEADLINE_ERR_CODE = "504"
+
+# 截止时间为time.monotonic()时间戳, None表示不限时
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("crawl_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """请求时限已用完时抛出, 不再发起新的请求"""
+    def __init__(self, action: str = ""):
+        super(DeadlineExceeded, self).__init__(f"超出请求时限{', ' + action if action else ''}")
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float], inherit: bool = True) -> Iterator[Optional[float]]:
+    """
+    在当前上下文中设置时限, 已有更早的截止时间时保留更早的
+    线程池任务需要通过contextvars.copy_context()传递
+
+    Args:
+        seconds: 从现在起可用的秒数, None表示不额外限制
+        inherit: 是否受上下文中已有时限的约束, False时只使用seconds, 用于多个请求共享的任务
+    """
+    current = _deadline.get() if inherit else None
+    expires_at = current
+    if seconds is not None:
+        candidate = time.monotonic() + seconds
+        expires_at = candidate if current is None else min(current, candidate)
+    token = _deadline.set(expires_at)
+    try:
+        yield expires_at
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """当前上下文剩余的秒数, 不限时返回None"""
+    expires_at = _deadline.get()
+    return None if expires_at is None else expires_at - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check_deadline(action: str = ""):
+    """
+    时限已用完时抛出DeadlineExceeded
+
+    Raises:
+        DeadlineExceeded: 当前上下文的时限已用完
+    """
+    if expired():
+        raise DeadlineExceeded(action)
+
+
+def clamp_timeout(timeout: Optional[float], action: str = "") -> Optional[float]:
+    """
+    将超时时间限制在剩余时限内
+
+    Raises:
+        DeadlineExceeded: 当前上下文的时限已用完
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded(action)
+    return left if timeout is None else min(timeout, left)
@@ -0,0 +1,102 @@
+"""
+响应编码检测：HTTP头 -> <meta charset> -> 同域名记忆 -> 统计检测
+"""
+import re
+import codecs
+import logging
+import threading
+from typing import Dict, Optional
+
+from charset_normalizer import from_bytes
+
+
+logger = logging.getLogger(__name__)
+
+
+# 只在文档前几KB中查找<meta charset>
+META_SNIFF_BYTES = 4096
+# 统计检测最多分析的字节数
+DETECT_SAMPLE_BYTES = 64 * 1024
+
+_HEADER_CHARSET_RE = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+
+
+def normalize_encoding(name: Optional[str]) -> Optional[str]:
+    """校验编码名称, 并将gb2312等子集编码提升为gb18030, 无效时返回None"""
+    if not name:
+        return None
+    try:
+        codec_name = codecs.lookup(name.strip()).name
+    except LookupError:
+        return None
+    # 政府网站常声明gb2312却包含超出其范围的字符
+    if codec_name in ("gb2312", "gbk"):
+        return "gb18030"
+    return codec_name
+
+
+def charset_from_content_type(content_type: Optional[str]) -> Optional[str]:
+    if not content_type:
+        return None
+    match = _HEADER_CHARSET_RE.search(content_type)
+    return normalize_encoding(match.group(1)) if match else None
+
+
+def charset_from_meta(content: bytes) -> Optional[str]:
+    match = _META_CHARSET_RE.search(content[:META_SNIFF_BYTES])
+    return normalize_encoding(match.group(1).decode("ascii", errors="ignore")) if match else None
+
+
+class EncodingDetector:
+    def __init__(self):
+        """按域名记忆检测结果的编码检测器, 线程安全"""
+        super(EncodingDetector, self).__init__()
+        self._host_encodings: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def remembered(self, host: Optional[str]) -> Optional[str]:
+        return self._host_encodings.get(host or "")
+
+    def remember(self, host: Optional[str], encoding: str):
+        with self._lock:
+            self._host_encodings[host or ""] = encoding
+
+    def detect(self,
+               content: bytes,
+               content_type: Optional[str] = None,
+               host: Optional[str] = None) -> str:
+        """
+        检测响应体编码
+
+        Args:
+            content: 响应体字节
+            content_type: Content-Type响应头
+            host: 响应所属域名, 用于记忆检测结果
+
+        Returns:
+            编码名称, 检测失败时返回utf-8
+        """
+        encoding = charset_from_content_type(content_type) or charset_from_meta(content)
+        if encoding:
+            self.remember(host, encoding)
+            return encoding
+        encoding = self.remembered(host)
+        if encoding:
+            return encoding
+        # 前面步骤都没有结果时才做统计检测, 且只分析前DETECT_SAMPLE_BYTES字节
+        best = from_bytes(content[:DETECT_SAMPLE_BYTES]).best()
+        encoding = normalize_encoding(best.encoding if best else None) or "utf-8"
+        logger.debug(f"{host}统计检测编码结果: {encoding}")
+        self.remember(host, encoding)
+        return encoding
+
+
+encoding_detector = EncodingDetector()
+
+
+def detect_encoding(content: bytes,
+                    content_type: Optional[str] = None,
+                    host: Optional[str] = None) -> str:
+    """使用共享的编码检测器检测响应体编码"""
+    return encoding_detector.detect(content, content_type=content_type, host=host)
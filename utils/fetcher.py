@@ -0,0 +1,271 @@
+"""
+并发抓取引擎，各爬虫将详情页url列表交给引擎统一获取
+"""
+import os
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Optional, Dict, List, Iterable, Iterator, Tuple, Union
+
+from model import News
+from .tool import fetch_html, get_domain_from_url, FetchError, logger
+from .article_store import ArticleStore, canonicalize_url
+from .deadline import DeadlineExceeded, expired, remaining
+from .metrics import CACHE_REQUESTS, PARSE_DURATION, current_source
+from .timing import phase, current_timer
+from .parse_pool import get_parse_pool, ParsePool, PhaseTimes
+from .profiler import profile_thread
+
+
+@dataclass
+class FetchResult:
+    """单个url的抓取结果, 成功时html不为空, 失败时error记录原因"""
+    url: str
+    html: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.html is not None
+
+
+class FetchEngine:
+    def __init__(self,
+                 max_workers: int = 16):
+        """
+        基于有界线程池的并发抓取引擎
+        同一域名的并发数与请求速率由fetch_html中的按域名限速器控制
+
+        Args:
+            max_workers: 线程池最大线程数
+        """
+        super(FetchEngine, self).__init__()
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+
+    def _fetch_one(self, url: str, **kwargs) -> FetchResult:
+        if expired():
+            # 时限已用完, 排队中的请求不再发出
+            return FetchResult(url=url, error="超出请求时限, 未获取")
+        try:
+            # 分析本次请求时, 抓取线程执行期间计入采样
+            with profile_thread():
+                html = fetch_html(url=url, **kwargs)
+            return FetchResult(url=url, html=html)
+        except DeadlineExceeded as e:
+            return FetchResult(url=url, error=str(e))
+        except FetchError as e:
+            return FetchResult(url=url, error=e.reason)
+        except Exception as e:
+            return FetchResult(url=url, error=f"{type(e).__name__}: {e}")
+
+    def _submit(self, url: str, **kwargs) -> Future:
+        # 每个任务使用独立的上下文副本, 使请求时限等上下文变量在抓取线程中可见
+        context = contextvars.copy_context()
+        return self._executor.submit(context.run, self._fetch_one, url, **kwargs)
+
+    def fetch_all(self, urls: Iterable[str], **kwargs) -> List[FetchResult]:
+        """
+        并发获取一组url, 结果顺序与输入顺序一致
+
+        Args:
+            urls: 待获取的url列表
+            kwargs: 透传给fetch_html的参数, 如timeout、retries
+
+        Returns:
+            与urls一一对应的FetchResult列表
+        """
+        futures = [self._submit(url, **kwargs) for url in urls]
+        results = [future.result() for future in futures]
+        for result in results:
+            if not result.ok:
+                logger.warning(f"详情页获取失败 {result.url}: {result.error}")
+        return results
+
+    def iter_fetch(self, urls: Iterable[str], **kwargs) -> Iterator[FetchResult]:
+        """
+        并发获取一组url, 按完成顺序逐个产出结果
+        生成器提前关闭时取消尚未开始的请求
+        """
+        futures = [self._submit(url, **kwargs) for url in urls]
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                if not result.ok:
+                    logger.warning(f"详情页获取失败 {result.url}: {result.error}")
+                yield result
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+_default_engine: Optional[FetchEngine] = None
+_default_engine_lock = threading.Lock()
+
+
+def get_fetch_engine() -> FetchEngine:
+    """获取进程内共享的抓取引擎, 线程数可通过环境变量FETCH_MAX_WORKERS配置"""
+    global _default_engine
+    with _default_engine_lock:
+        if _default_engine is None:
+            _default_engine = FetchEngine(max_workers=int(os.getenv("FETCH_MAX_WORKERS", "16")))
+        return _default_engine
+
+
+def fetch_all(urls: Iterable[str], **kwargs) -> List[FetchResult]:
+    """使用共享抓取引擎并发获取一组url"""
+    return get_fetch_engine().fetch_all(urls, **kwargs)
+
+
+def summarize_failures(results: List[FetchResult]) -> Optional[str]:
+    """汇总失败的url及原因, 全部成功时返回None"""
+    failures = [f"{result.url}({result.error})" for result in results if not result.ok]
+    if not failures:
+        return None
+    return f"{len(failures)}个详情页获取失败: " + "; ".join(failures)
+
+
+def iter_collect_news(entries: Dict[str, str],
+                      build_news: Callable[[str, str, str], News],
+                      store: Optional[ArticleStore] = None,
+                      until: Optional[Tuple[str, Dict[str, str]]] = None) -> Iterator[Union[News, FetchResult]]:
+    """
+    逐个产出一组详情页的新闻: 先产出文章存储中已有的文章, 其余url并发获取, 按完成顺序解析后产出并保存
+    请求时限用完后不再发起新的请求, 未获取的url以FetchResult形式产出
+
+    Args:
+        entries: 列表页解析出的 标题->详情页url 映射
+        build_news: 解析函数, 参数为(标题, url, html), 返回News
+        store: 文章存储, 为空时不读写存储
+        until: build_news只需要的正文标签(标签名, 属性), 传入时该标签结束后即停止下载详情页
+
+    Yields:
+        News, 获取或解析失败的详情页以FetchResult形式产出
+    """
+    stored = store.get_many(entries.values()) if store is not None else {}
+    pending: Dict[str, str] = {}
+    for title, url in entries.items():
+        news = stored.get(canonicalize_url(url))
+        if news is not None:
+            yield news
+        else:
+            pending[url] = title
+    if store is not None:
+        CACHE_REQUESTS.inc("article", "hit", amount=len(entries) - len(pending))
+        CACHE_REQUESTS.inc("article", "miss", amount=len(pending))
+    if stored:
+        logger.debug("文章存储命中%d篇, 待获取%d篇", len(entries) - len(pending), len(pending))
+
+    # 保存到文章存储的详情页之后直接从存储读取, 不再写入HTTP缓存
+    fetch_results = get_fetch_engine().iter_fetch(pending.keys(), until=until, cache_response=store is None)
+    parse_pool = get_parse_pool()
+    if parse_pool is not None and parse_pool.accepts(build_news):
+        yield from _iter_parse_in_pool(parse_pool, fetch_results, pending, build_news, store)
+        return
+    for fetch_result in fetch_results:
+        if not fetch_result.ok:
+            yield fetch_result
+            continue
+        if expired():
+            yield FetchResult(url=fetch_result.url, error="超出请求时限, 未解析")
+            continue
+        try:
+            with phase("extract"):
+                news = build_news(pending[fetch_result.url], fetch_result.url, fetch_result.html) # type: ignore
+        except Exception as e:
+            logger.warning(f"详情页解析失败 {fetch_result.url}: {e}")
+            yield FetchResult(url=fetch_result.url, error=f"解析失败: {type(e).__name__}: {e}")
+            continue
+        if store is not None:
+            store.save(news)
+        yield news
+
+
+def _record_pool_phases(phases: PhaseTimes):
+    """将子进程中的解析耗时计入当前请求与解析指标"""
+    timer = current_timer()
+    if timer is not None:
+        for name, (seconds, count) in phases.items():
+            timer.add(name, seconds, count)
+    if "parse" in phases:
+        PARSE_DURATION.observe(phases["parse"][0], current_source())
+
+
+def _finish_parse(future: Future, url: str, store: Optional[ArticleStore]) -> Union[News, FetchResult]:
+    try:
+        news, phases = future.result()
+    except Exception as e:
+        logger.warning(f"详情页解析失败 {url}: {e}")
+        return FetchResult(url=url, error=f"解析失败: {type(e).__name__}: {e}")
+    _record_pool_phases(phases)
+    if store is not None:
+        store.save(news)
+    return news
+
+
+def _iter_parse_in_pool(parse_pool: ParsePool,
+                        fetch_results: Iterator[FetchResult],
+                        pending: Dict[str, str],
+                        build_news: Callable[[str, str, str], News],
+                        store: Optional[ArticleStore]) -> Iterator[Union[News, FetchResult]]:
+    """
+    获取完成的详情页交给解析进程池, 多个页面同时在不同的CPU核心上解析, 解析完成即产出
+    时限到达后不再等待尚未完成的解析
+    """
+    parsing: Dict[Future, str] = {}
+    try:
+        for fetch_result in fetch_results:
+            if not fetch_result.ok:
+                yield fetch_result
+            elif expired():
+                yield FetchResult(url=fetch_result.url, error="超出请求时限, 未解析")
+            else:
+                future = parse_pool.submit(build_news, pending[fetch_result.url], fetch_result.url, fetch_result.html) # type: ignore
+                parsing[future] = fetch_result.url
+            # 等待下一个页面获取完成前, 先产出已经解析完的新闻
+            for future in [future for future in parsing if future.done()]:
+                yield _finish_parse(future, parsing.pop(future), store)
+        try:
+            for future in as_completed(list(parsing), timeout=remaining()):
+                yield _finish_parse(future, parsing.pop(future), store)
+        except TimeoutError:
+            for url in parsing.values():
+                yield FetchResult(url=url, error="超出请求时限, 未解析")
+            parsing.clear()
+    finally:
+        for future in parsing:
+            future.cancel()
+
+
+def collect_news(entries: Dict[str, str],
+                 build_news: Callable[[str, str, str], News],
+                 store: Optional[ArticleStore] = None,
+                 until: Optional[Tuple[str, Dict[str, str]]] = None) -> Tuple[List[News], List[FetchResult]]:
+    """
+    汇总一组详情页的新闻: 已保存的文章直接读取, 其余url并发获取后解析并保存
+
+    Args:
+        entries: 列表页解析出的 标题->详情页url 映射
+        build_news: 解析函数, 参数为(标题, url, html), 返回News
+        store: 文章存储, 为空时不读写存储
+        until: build_news只需要的正文标签(标签名, 属性), 传入时该标签结束后即停止下载详情页
+
+    Returns:
+        (与entries顺序一致的News列表, 获取或解析失败的FetchResult列表)
+        多个条目指向同一url(规范化后)时, 新闻只出现一次, 位于第一个条目的位置
+    """
+    news_by_url: Dict[str, News] = {}
+    failures: List[FetchResult] = []
+    for item in iter_collect_news(entries, build_news, store=store, until=until):
+        if isinstance(item, FetchResult):
+            failures.append(item)
+        else:
+            news_by_url[canonicalize_url(item.url)] = item
+    news_list = []
+    for url in entries.values():
+        # pop保证同一url的新闻只出现一次
+        news = news_by_url.pop(canonicalize_url(url), None)
+        if news is not None:
+            news_list.append(news)
+    return news_list, failures
@@ -0,0 +1,289 @@
+"""
+基于磁盘的HTTP条件请求缓存，保存响应体与ETag/Last-Modified校验信息
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+
+logger = logging.getLogger(__name__)
+
+
+def parse_cache_control(value: str) -> Dict[str, Optional[str]]:
+    """解析Cache-Control响应头, 如 'public, max-age=600' -> {'public': None, 'max-age': '600'}"""
+    directives: Dict[str, Optional[str]] = {}
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, arg = part.partition("=")
+        directives[name.strip().lower()] = arg.strip().strip('"') or None
+    return directives
+
+
+def compute_expires_at(headers, now: float) -> float:
+    """
+    根据Cache-Control的max-age或Expires计算缓存过期时间戳, 无法确定时返回now(需重新校验)
+    """
+    directives = parse_cache_control(headers.get("Cache-Control", ""))
+    if "no-cache" in directives:
+        return now
+    max_age = directives.get("max-age")
+    if max_age is not None:
+        try:
+            age = int(headers.get("Age", "0") or 0)
+            return now + max(int(max_age) - age, 0)
+        except ValueError:
+            return now
+    expires = headers.get("Expires")
+    if expires:
+        try:
+            return parsedate_to_datetime(expires).timestamp()
+        except (TypeError, ValueError):
+            return now
+    return now
+
+
+class CachedResponse:
+    def __init__(self,
+                 url: str,
+                 content: bytes,
+                 meta: Dict):
+        super(CachedResponse, self).__init__()
+        self.url = url
+        self.content = content
+        self.meta = meta
+
+    @property
+    def encoding(self) -> Optional[str]:
+        return self.meta.get("encoding")
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return self.meta.get("headers", {})
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.meta.get("expires_at", 0)
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """构造条件请求头"""
+        headers = {}
+        if self.meta.get("etag"):
+            headers["If-None-Match"] = self.meta["etag"]
+        if self.meta.get("last_modified"):
+            headers["If-Modified-Since"] = self.meta["last_modified"]
+        return headers
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+
+class HttpCache:
+    # 超出上限时淘汰到上限的该比例, 避免之后每次写入都触发淘汰
+    PRUNE_TARGET = 0.9
+
+    def __init__(self,
+                 cache_dir: str,
+                 max_entries: int = 0,
+                 max_bytes: int = 0):
+        """
+        磁盘HTTP缓存, 每个url对应一个文件, 首行为元信息json, 其后为响应体
+        元信息与响应体一次原子写入, 并发读取或写入中途崩溃都不会读到不匹配的校验信息与响应体
+        文件的修改时间记录最近一次使用, 条目数或总大小超出上限时按最近最少使用淘汰
+
+        Args:
+            cache_dir: 缓存目录
+            max_entries: 最多保存的条目数, 0表示不限制
+            max_bytes: 缓存文件的总大小上限(字节), 0表示不限制
+        """
+        super(HttpCache, self).__init__()
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pruning = False
+        files = self._list_files()
+        self._entries = len(files)
+        self._bytes = sum(size for _, size, _ in files)
+
+    def _list_files(self) -> List[Tuple[float, int, str]]:
+        """列出全部缓存文件的(修改时间, 大小, 路径)"""
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if not name.endswith(".cache"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _over_limit(self, entries: int, size: int, ratio: float = 1.0) -> bool:
+        return (self.max_entries > 0 and entries > self.max_entries * ratio) or \
+               (self.max_bytes > 0 and size > self.max_bytes * ratio)
+
+    def _account(self, entries: int, size: int):
+        """记录写入带来的条目数与大小变化, 超出上限时淘汰最久未使用的条目"""
+        with self._lock:
+            self._entries += entries
+            self._bytes += size
+            if self._pruning or not self._over_limit(self._entries, self._bytes):
+                return
+            self._pruning = True
+        try:
+            self.prune()
+        finally:
+            with self._lock:
+                self._pruning = False
+
+    def prune(self) -> int:
+        """
+        按修改时间从旧到新删除缓存文件, 直到条目数与总大小都不超过上限的PRUNE_TARGET
+        重新统计磁盘上的文件, 多个进程共用缓存目录时计数也会得到校正
+
+        Returns:
+            删除的条目数
+        """
+        files = sorted(self._list_files())
+        entries = len(files)
+        size = sum(file_size for _, file_size, _ in files)
+        removed = 0
+        for _, file_size, path in files:
+            if not self._over_limit(entries, size, ratio=self.PRUNE_TARGET):
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"删除HTTP缓存失败 {path}: {e}")
+                continue
+            entries -= 1
+            size -= file_size
+            removed += 1
+        with self._lock:
+            self._entries = entries
+            self._bytes = size
+        if removed:
+            logger.info(f"HTTP缓存超出上限, 淘汰{removed}个最久未使用的条目, 剩余{entries}个({size}字节)")
+        return removed
+
+    def _path(self, url: str) -> str:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], f"{key}.cache")
+
+    @staticmethod
+    def _atomic_write(path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        path = self._path(url)
+        try:
+            with open(path, "rb") as f:
+                header = f.readline()
+                content = f.read()
+            meta = json.loads(header)
+        except (OSError, ValueError):
+            return None
+        try:
+            # 更新修改时间, 淘汰时按最近一次使用排序
+            os.utime(path)
+        except OSError:
+            pass
+        return CachedResponse(url=url, content=content, meta=meta)
+
+    def _write(self, url: str, meta: Dict, content: bytes):
+        # json.dumps的结果不含换行, 首行即为完整的元信息
+        header = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+        data = header + b"\n" + content
+        path = self._path(url)
+        try:
+            previous_size = os.path.getsize(path)
+        except OSError:
+            previous_size = None
+        self._atomic_write(path, data)
+        if previous_size is None:
+            self._account(1, len(data))
+        else:
+            self._account(0, len(data) - previous_size)
+
+    def store(self, url: str, response: requests.Response, encoding: Optional[str], content: Optional[bytes] = None):
+        """
+        保存200响应, 带no-store或没有任何校验/缓存信息的响应不保存
+
+        Args:
+            content: 响应体, 流式读取的响应需要传入, 默认使用response.content
+        """
+        headers = response.headers
+        directives = parse_cache_control(headers.get("Cache-Control", ""))
+        if "no-store" in directives:
+            return
+        now = time.time()
+        meta = {
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "expires_at": compute_expires_at(headers, now),
+            "stored_at": now,
+            "encoding": encoding,
+            "headers": {"Content-Type": headers.get("Content-Type", "")},
+        }
+        if not meta["etag"] and not meta["last_modified"] and meta["expires_at"] <= now:
+            # 既不能条件请求也不新鲜, 缓存没有意义
+            return
+        try:
+            self._write(url, meta, response.content if content is None else content)
+        except OSError as e:
+            logger.warning(f"写入HTTP缓存失败 {url}: {e}")
+
+    def refresh(self, url: str, cached: CachedResponse, response: requests.Response):
+        """收到304后更新校验信息与过期时间"""
+        now = time.time()
+        meta = dict(cached.meta)
+        meta["etag"] = response.headers.get("ETag") or meta.get("etag")
+        meta["last_modified"] = response.headers.get("Last-Modified") or meta.get("last_modified")
+        if "Cache-Control" in response.headers or "Expires" in response.headers:
+            meta["expires_at"] = compute_expires_at(response.headers, now)
+        meta["stored_at"] = now
+        cached.meta = meta
+        try:
+            self._write(url, meta, cached.content)
+        except OSError as e:
+            logger.warning(f"更新HTTP缓存失败 {url}: {e}")
+
+
+_default_cache: Optional[HttpCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_http_cache() -> Optional[HttpCache]:
+    """
+    获取进程内共享的HTTP缓存, 目录通过环境变量HTTP_CACHE_DIR配置(默认data/http_cache)
+    HTTP_CACHE_DIR设置为空字符串时关闭HTTP缓存, 返回None
+    条目数与总大小上限通过HTTP_CACHE_MAX_ENTRIES(默认10000)与HTTP_CACHE_MAX_BYTES(默认256MB)配置, 0表示不限制
+    """
+    global _default_cache
+    cache_dir = os.getenv("HTTP_CACHE_DIR", os.path.join("data", "http_cache"))
+    if not cache_dir:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HttpCache(cache_dir=cache_dir,
+                                       max_entries=int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "10000")),
+                                       max_bytes=int(os.getenv("HTTP_CACHE_MAX_BYTES", str(256 * 1024 * 1024))))
+        return _default_cache
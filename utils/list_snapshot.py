@@ -0,0 +1,137 @@
+"""
+列表指纹: 记录每个列表最近一次成功爬取时的条目与对应的新闻
+列表未变化时直接返回上次的新闻, 不再获取任何详情页; 列表变化时只获取新增的条目
+"""
+import os
+import re
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from model import News
+from .article_store import canonicalize_url
+from .metrics import CACHE_REQUESTS
+
+
+# 获取一组条目的详情页, 返回(新闻列表, 失败结果), 如各爬虫的collect
+Collector = Callable[[Dict[str, str]], Tuple[List[News], list]]
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def entry_key(title: str, url: str) -> str:
+    """条目的规范化表示: 标题(含日期)合并空白, url规范化"""
+    return f"{_WHITESPACE.sub(' ', title).strip()}\t{canonicalize_url(url)}"
+
+
+def list_fingerprint(entries: Dict[str, str]) -> str:
+    """
+    列表的指纹, 只取决于条目的标题、日期与url, 与条目顺序、空白和url写法无关
+
+    Args:
+        entries: 标题;日期 -> 详情页url 的映射
+    """
+    keys = sorted(entry_key(title, url) for title, url in entries.items())
+    return hashlib.sha256("\n".join(keys).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class ListSnapshot:
+    """一次成功爬取的列表指纹, 以及每个条目解析出的新闻"""
+    fingerprint: str
+    news: Dict[str, List[News]] = field(default_factory=dict)
+
+    def news_list(self, entries: Dict[str, str]) -> List[News]:
+        return [news for title, url in entries.items() for news in self.news.get(entry_key(title, url), [])]
+
+
+class ListSnapshotStore:
+    def __init__(self):
+        """进程内按列表保存最近一次成功爬取的快照, 线程安全"""
+        super(ListSnapshotStore, self).__init__()
+        self._snapshots: Dict[str, ListSnapshot] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[ListSnapshot]:
+        with self._lock:
+            return self._snapshots.get(key)
+
+    def put(self, key: str, snapshot: ListSnapshot):
+        with self._lock:
+            self._snapshots[key] = snapshot
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+
+
+def collect_changed(key: str,
+                    entries: Dict[str, str],
+                    collect: Collector,
+                    snapshots: Optional[ListSnapshotStore] = None) -> Tuple[List[News], list]:
+    """
+    按列表指纹获取一组条目的新闻: 与上次成功爬取相同时直接返回上次的新闻, 否则只获取新增的条目
+    本次有条目获取失败时不更新快照, 下次爬取重新获取这些条目
+
+    Args:
+        key: 列表的标识, 如 爬虫类名:列表页url
+        entries: 标题;日期 -> 详情页url 的映射
+        collect: 获取一组条目的函数, 返回(新闻列表, 失败结果), 新闻的url与条目的url对应
+        snapshots: 快照存储, 默认使用共享存储, 未开启时直接获取全部条目
+
+    Returns:
+        (与entries顺序一致的新闻列表, 失败结果)
+    """
+    snapshots = snapshots if snapshots is not None else get_list_snapshots()
+    if snapshots is None:
+        return collect(entries)
+    fingerprint = list_fingerprint(entries)
+    previous = snapshots.get(key)
+    if previous is not None and previous.fingerprint == fingerprint:
+        CACHE_REQUESTS.inc("list", "hit")
+        return previous.news_list(entries), []
+    CACHE_REQUESTS.inc("list", "miss")
+
+    known = previous.news if previous is not None else {}
+    # 指向未变化条目的url的新增条目不需要获取
+    known_urls = {canonicalize_url(url) for title, url in entries.items() if entry_key(title, url) in known}
+    added = {title: url for title, url in entries.items()
+             if entry_key(title, url) not in known and canonicalize_url(url) not in known_urls}
+    news_list, failed_results = collect(added) if added else ([], [])
+    # 新获取的新闻按url对应回条目, 一个条目可能对应多条新闻(如一篇日报)
+    fetched: Dict[str, List[News]] = {}
+    for news in news_list:
+        fetched.setdefault(canonicalize_url(news.url), []).append(news)
+    snapshot = ListSnapshot(fingerprint=fingerprint)
+    seen = set()
+    for title, url in entries.items():
+        # 与collect_news一致, 多个条目指向同一url时新闻只出现一次, 位于第一个有新闻的条目
+        canonical_url = canonicalize_url(url)
+        if canonical_url in seen:
+            continue
+        key_of_entry = entry_key(title, url)
+        entry_news = known.get(key_of_entry) or fetched.pop(canonical_url, None)
+        if entry_news:
+            seen.add(canonical_url)
+            snapshot.news[key_of_entry] = entry_news
+    if not failed_results:
+        snapshots.put(key, snapshot)
+    return snapshot.news_list(entries), failed_results
+
+
+_default_snapshots: Optional[ListSnapshotStore] = None
+_default_snapshots_lock = threading.Lock()
+
+
+def get_list_snapshots() -> Optional[ListSnapshotStore]:
+    """
+    获取进程内共享的列表快照存储, 环境变量LIST_FINGERPRINT设置为0时关闭, 返回None
+    """
+    global _default_snapshots
+    if os.getenv("LIST_FINGERPRINT", "1") == "0":
+        return None
+    with _default_snapshots_lock:
+        if _default_snapshots is None:
+            _default_snapshots = ListSnapshotStore()
+        return _default_snapshots
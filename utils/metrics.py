@@ -0,0 +1,301 @@
+"""
+进程内指标: 计数器、仪表盘与直方图, 由/metrics接口按Prometheus文本格式导出
+记录一次指标只需一次加锁与字典查找, 不引入额外依赖
+"""
+import time
+import bisect
+import threading
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .timing import phase
+
+
+LabelValues = Tuple[str, ...]
+
+# 耗时直方图的默认分桶(秒)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 解码、解析等CPU操作的分桶(秒)
+CPU_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+# 没有来源上下文时(如直接运行爬虫)使用的来源标签
+UNKNOWN_SOURCE = "unknown"
+
+# 当前正在爬取的来源, 随上下文传递到爬虫线程与详情页抓取线程, 用作指标的source标签
+_current_source: ContextVar[str] = ContextVar("current_source", default=UNKNOWN_SOURCE)
+
+
+@contextmanager
+def source_scope(source: str) -> Iterator[None]:
+    """在该作用域内记录的指标使用source作为来源标签"""
+    token = _current_source.set(source)
+    try:
+        yield
+    finally:
+        _current_source.reset(token)
+
+
+def current_source() -> str:
+    return _current_source.get()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super(_Metric, self).__init__()
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _check(self, labels: LabelValues):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name}需要标签{self.labelnames}, 实际传入{labels}")
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}", *self.samples()]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """只增不减的计数器"""
+        super(Counter, self).__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        """按标签值(与labelnames顺序一致)增加计数"""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in items]
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self,
+                 name: str,
+                 documentation: str,
+                 labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], Dict[LabelValues, float]]] = None):
+        """
+        可增可减的仪表盘
+
+        Args:
+            callback: 导出时调用, 返回 标签值 -> 当前值, 用于线程池、浏览器池等已有状态, 无需在业务代码中维护
+        """
+        super(Gauge, self).__init__(name, documentation, labelnames)
+        self.callback = callback
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        if self.callback is not None:
+            values.update(self.callback())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in values.items()]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self,
+                 name: str,
+                 documentation: str,
+                 labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """直方图, 每组标签保存各分桶的计数与总和"""
+        super(Histogram, self).__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签: [各分桶计数..., +Inf分桶计数, 总和], 分桶计数不累加, 导出时再累加
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                self._check(labels)
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        """记录代码块的耗时秒数"""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, *labels)
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return int(sum(series[:-1])) if series is not None else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        lines = []
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = 'le="%s"' % _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {_format_value(cumulative)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """进程级指标注册表, 同名指标只创建一次"""
+        super(MetricsRegistry, self).__init__()
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"指标{name}已注册为{metric.type_name}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self,
+              name: str,
+              documentation: str,
+              labelnames: Sequence[str] = (),
+              callback: Optional[Callable[[], Dict[LabelValues, float]]] = None) -> Gauge:
+        gauge = self._get_or_create(Gauge, name, documentation, labelnames)
+        if callback is not None:
+            gauge.callback = callback
+        return gauge
+
+    def histogram(self,
+                  name: str,
+                  documentation: str,
+                  labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """按Prometheus文本格式(0.0.4)导出所有指标"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """获取进程内共享的指标注册表"""
+    return metrics_registry
+
+
+# 抓取层指标, host为源站域名
+FETCH_DURATION = metrics_registry.histogram("crawler_fetch_duration_seconds",
+                                            "单次HTTP请求的耗时, 不含限速等待",
+                                            ("host",))
+FETCH_RESPONSE_BYTES = metrics_registry.histogram("crawler_fetch_response_bytes",
+                                                  "下载的响应体字节数",
+                                                  ("host",),
+                                                  buckets=(1024, 4096, 16384, 65536, 262144, 1048576, 4194304))
+FETCH_RESPONSES = metrics_registry.counter("crawler_fetch_responses_total",
+                                           "按状态码统计的HTTP响应数",
+                                           ("host", "status"))
+FETCH_RETRIES = metrics_registry.counter("crawler_fetch_retries_total",
+                                         "请求失败后的重试次数",
+                                         ("host",))
+FETCH_FAILURES = metrics_registry.counter("crawler_fetch_failures_total",
+                                          "按异常类型统计的请求失败次数",
+                                          ("host", "reason"))
+FETCH_EARLY_STOPS = metrics_registry.counter("crawler_fetch_early_stops_total",
+                                             "目标标签结束后提前停止下载的响应数",
+                                             ("host",))
+CACHE_REQUESTS = metrics_registry.counter("crawler_cache_requests_total",
+                                          "各级缓存的命中情况, cache为response/http/article",
+                                          ("cache", "result"))
+
+# 解码与解析指标, source为来源名称
+DECODE_DURATION = metrics_registry.histogram("crawler_decode_duration_seconds",
+                                             "响应体编码检测与解码的耗时",
+                                             ("source",),
+                                             buckets=CPU_BUCKETS)
+PARSE_DURATION = metrics_registry.histogram("crawler_parse_duration_seconds",
+                                            "HTML解析(构建文档树)的耗时",
+                                            ("source",),
+                                            buckets=CPU_BUCKETS)
+
+# 爬取指标
+CRAWL_DURATION = metrics_registry.histogram("crawler_crawl_duration_seconds",
+                                            "一次完整爬取的耗时",
+                                            ("source", "status"),
+                                            buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0))
+CRAWL_ITEMS = metrics_registry.histogram("crawler_crawl_items",
+                                         "一次爬取产出的新闻条数",
+                                         ("source",),
+                                         buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200))
+
+
+def observe_parse(func: Callable) -> Callable:
+    """装饰解析函数, 按当前来源记录耗时, 同时计入当前请求的parse阶段"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started_at = time.perf_counter()
+        try:
+            with phase("parse"):
+                return func(*args, **kwargs)
+        finally:
+            PARSE_DURATION.observe(time.perf_counter() - started_at, _current_source.get())
+    return wrapper
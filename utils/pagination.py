@@ -0,0 +1,105 @@
+"""
+历史列表的翻页: 列表页按发布时间倒序排列, 多个页码并发获取, 某一页的最早日期早于起始日期后不再翻页
+列表条目统一为 标题;日期 -> 详情页url 的映射
+"""
+import logging
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# 加载一页列表, 参数为从0开始的页码, 页面不存在时返回None
+PageLoader = Callable[[int], Optional[Dict[str, str]]]
+
+
+def entry_date(title: str) -> Optional[str]:
+    """从 标题;日期 中取出日期, 没有日期时返回None"""
+    _, separator, publish_date = title.rpartition(";")
+    return publish_date if separator else None
+
+
+def oldest_date(entries: Dict[str, str]) -> Optional[str]:
+    """列表中最早的发布日期, YYYY-MM-DD格式可以直接按字符串比较"""
+    dates = [publish_date for publish_date in map(entry_date, entries) if publish_date]
+    return min(dates) if dates else None
+
+
+def filter_entries(entries: Dict[str, str], start_date: str, end_date: str) -> Dict[str, str]:
+    """只保留发布日期在[start_date, end_date]内的条目"""
+    return {title: url for title, url in entries.items()
+            if start_date <= (entry_date(title) or "") <= end_date}
+
+
+def parse_date(text: str) -> date:
+    """
+    解析YYYY-MM-DD格式的日期
+
+    Raises:
+        ValueError: 日期格式不正确
+    """
+    return datetime.strptime(text, r"%Y-%m-%d").date()
+
+
+def iter_days(start_date: str, end_date: str) -> List[str]:
+    """[start_date, end_date]内的每一天, 从end_date开始倒序排列"""
+    start, end = parse_date(start_date), parse_date(end_date)
+    return [(end - timedelta(days=offset)).strftime(r"%Y-%m-%d") for offset in range((end - start).days + 1)]
+
+
+def walk_pages(load_page: PageLoader,
+               since: str,
+               workers: int = 4,
+               max_pages: int = 500,
+               first_page: int = 0) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """
+    从first_page开始并发获取列表页, 按完成顺序产出(页码, 条目)
+
+    同时获取workers个页码, 某一页不存在、没有条目或最早日期早于since时不再提交之后的页码,
+    已提交的页码仍然执行完毕并产出
+
+    Args:
+        load_page: 加载一页列表的函数, 在线程池中执行
+        since: 起始日期(YYYY-MM-DD), 早于该日期的页面之后不再翻页
+        workers: 同时获取的页数
+        max_pages: 最多获取的页数
+        first_page: 第一个页码
+    """
+    last_page = first_page + max_pages
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="page") as executor:
+        running: Dict[Future, int] = {}
+        next_page = first_page
+        stop_page: Optional[int] = None
+
+        def submit():
+            nonlocal next_page
+            while len(running) < workers and next_page < last_page and (stop_page is None or next_page < stop_page):
+                # 请求时限、来源标签等上下文变量在翻页线程中同样可见
+                context = contextvars.copy_context()
+                running[executor.submit(context.run, load_page, next_page)] = next_page
+                next_page += 1
+
+        try:
+            submit()
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page = running.pop(future)
+                    entries = future.result()
+                    oldest = oldest_date(entries) if entries else None
+                    if not entries or (oldest is not None and oldest < since):
+                        # 之后的页码只会更早, 只保留已提交的更小页码
+                        stop_page = page + 1 if stop_page is None else min(stop_page, page + 1)
+                        logger.debug("第%d页%s, 不再翻页", page, "没有条目" if not entries else f"最早为{oldest}")
+                    if entries:
+                        yield page, entries
+                # 已提交但在停止页之后的页码不再需要
+                for future, page in list(running.items()):
+                    if stop_page is not None and page >= stop_page and future.cancel():
+                        running.pop(future)
+                submit()
+        finally:
+            for future in running:
+                future.cancel()
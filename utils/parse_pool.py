@@ -0,0 +1,161 @@
+"""
+解析进程池: 将详情页的解析与提取交给常驻子进程, 使解析不受GIL限制, 可以使用多个CPU核心
+子进程只返回提取出的News(标题、正文、日期等字段), 文档树不会传回主进程
+"""
+import os
+import types
+import pickle
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional, Tuple
+
+from model import News
+from .timing import PhaseTimer, timing_scope
+
+
+logger = logging.getLogger(__name__)
+
+# 子进程解析多少个页面后重启, 避免解析器缓存、内存碎片等导致的内存持续增长
+DEFAULT_MAX_TASKS_PER_CHILD = 200
+
+BuildNews = Callable[[str, str, str], News]
+PhaseTimes = Dict[str, Tuple[float, int]]
+
+
+def default_parse_workers() -> int:
+    """默认子进程数: 保留一个核心给事件循环与抓取线程, 至少1个"""
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def _warm_worker():
+    """子进程启动时导入解析相关模块, 第一个任务不再承担导入耗时"""
+    import bs4  # noqa: F401
+    import lxml.html  # noqa: F401
+    import lxml.etree  # noqa: F401
+    from . import parser  # noqa: F401
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _run_build_news(build_news: BuildNews, title: str, url: str, html_text: str) -> Tuple[News, PhaseTimes]:
+    """在子进程中执行解析, 同时返回各阶段耗时, 由主进程计入当前请求"""
+    timer = PhaseTimer()
+    with timing_scope(timer):
+        with timer.phase("extract"):
+            news = build_news(title, url, html_text)
+    return news, timer.phases()
+
+
+class ParsePool:
+    def __init__(self,
+                 max_workers: Optional[int] = None,
+                 max_tasks_per_child: int = DEFAULT_MAX_TASKS_PER_CHILD):
+        """
+        常驻的解析进程池
+
+        Args:
+            max_workers: 子进程数, 默认为CPU核心数-1
+            max_tasks_per_child: 每个子进程执行多少个任务后重启
+        """
+        super(ParsePool, self).__init__()
+        self.max_workers = max_workers or default_parse_workers()
+        self.max_tasks_per_child = max_tasks_per_child
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # 已检查过能否序列化的解析函数, 不能序列化的(如绑定了爬虫实例的方法)在当前线程解析
+        self._picklable: Dict[int, bool] = {}
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # 主进程中有抓取线程与事件循环, fork可能复制持有中的锁, 因此使用spawn启动子进程
+        return ProcessPoolExecutor(max_workers=self.max_workers,
+                                   mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_warm_worker,
+                                   max_tasks_per_child=self.max_tasks_per_child)
+
+    def start(self) -> "ParsePool":
+        """创建进程池并等待所有子进程启动完成"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._create_executor()
+                executor = self._executor
+            else:
+                return self
+        # 没有空闲子进程时每次提交都会启动一个新的子进程, 提交max_workers个任务即启动全部子进程
+        for future in [executor.submit(_ping) for _ in range(self.max_workers)]:
+            future.result()
+        logger.info(f"解析进程池已启动, 子进程{self.max_workers}个")
+        return self
+
+    def accepts(self, build_news: BuildNews) -> bool:
+        """解析函数能否交给子进程执行"""
+        key = id(build_news)
+        picklable = self._picklable.get(key)
+        if picklable is None:
+            try:
+                pickle.dumps(build_news)
+                picklable = True
+            except Exception:
+                picklable = False
+            if isinstance(build_news, types.FunctionType):
+                # 只缓存函数的结果, partial等临时对象销毁后id可能被复用
+                self._picklable[key] = picklable
+        return picklable
+
+    def submit(self, build_news: BuildNews, title: str, url: str, html_text: str) -> "Future[Tuple[News, PhaseTimes]]":
+        """
+        提交一个详情页的解析任务, 子进程异常退出导致进程池不可用时重建进程池后重新提交
+
+        Returns:
+            结果为(News, 各阶段耗时)的Future
+        """
+        self.start()
+        try:
+            return self._executor.submit(_run_build_news, build_news, title, url, html_text) # type: ignore
+        except BrokenProcessPool:
+            logger.warning("解析进程池不可用, 重建后重新提交")
+            with self._lock:
+                broken, self._executor = self._executor, None
+            broken.shutdown(wait=False, cancel_futures=True) # type: ignore
+            self.start()
+            return self._executor.submit(_run_build_news, build_news, title, url, html_text) # type: ignore
+
+    def shutdown(self, wait: bool = False):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_parse_pool: Optional[ParsePool] = None
+_parse_pool_lock = threading.Lock()
+
+
+def get_parse_pool() -> Optional[ParsePool]:
+    """
+    获取进程内共享的解析进程池, 未启用时返回None, 此时在抓取结果所在的线程中解析
+
+    通过环境变量PARSE_WORKERS启用: 0(默认)为不启用, auto为CPU核心数-1, 也可指定子进程数;
+    PARSE_MAX_TASKS_PER_CHILD为子进程重启前执行的任务数
+    """
+    global _parse_pool
+    workers = os.getenv("PARSE_WORKERS", "0").strip().lower()
+    if workers in ("", "0"):
+        return None
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ParsePool(max_workers=default_parse_workers() if workers == "auto" else int(workers),
+                                    max_tasks_per_child=int(os.getenv("PARSE_MAX_TASKS_PER_CHILD", str(DEFAULT_MAX_TASKS_PER_CHILD))))
+        return _parse_pool
+
+
+def shutdown_parse_pool():
+    """应用退出时关闭解析进程池"""
+    with _parse_pool_lock:
+        pool = _parse_pool
+    if pool is not None:
+        pool.shutdown()
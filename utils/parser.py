@@ -0,0 +1,204 @@
+"""
+HTML解析工具，默认使用lxml并只构建爬虫需要的子树
+"""
+import os
+import logging
+from typing import Dict, Optional
+
+import lxml.html
+from lxml import etree
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+
+from .metrics import observe_parse
+
+
+logger = logging.getLogger(__name__)
+
+
+# 默认解析器, 可通过环境变量HTML_PARSER切换为html5lib/html.parser
+HTML_PARSER = os.getenv("HTML_PARSER", "lxml")
+# 容错能力最强的解析器, 用于处理lxml解析失败的畸形页面
+FALLBACK_PARSER = "html5lib"
+_UTF8_HTML_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+
+
+def _fallback_enabled() -> bool:
+    return os.getenv("HTML_PARSER_FALLBACK", "0").lower() in ("1", "true", "yes")
+
+
+def _parse_html(html_text: str,
+                parse_only: Optional[SoupStrainer] = None,
+                parser: Optional[str] = None) -> BeautifulSoup:
+    parser = parser or HTML_PARSER
+    if parser == FALLBACK_PARSER:
+        # html5lib不支持parse_only, 只能解析整个文档
+        parse_only = None
+    return BeautifulSoup(html_text, parser, parse_only=parse_only)
+
+
+@observe_parse
+def parse_html(html_text: str,
+               parse_only: Optional[SoupStrainer] = None,
+               parser: Optional[str] = None) -> BeautifulSoup:
+    """
+    解析HTML文本
+
+    Args:
+        html_text: 已解码的HTML字符串, 无需再encode
+        parse_only: 只构建匹配的子树, 如SoupStrainer('div', id='Zoom')
+        parser: 解析器名称, 默认HTML_PARSER
+
+    Returns:
+        BeautifulSoup对象
+    """
+    return _parse_html(html_text, parse_only=parse_only, parser=parser)
+
+
+def _xpath_literal(value: str) -> str:
+    if "'" not in value:
+        return f"'{value}'"
+    parts = value.split("'")
+    return "concat(" + ", \"'\", ".join(f"'{part}'" for part in parts) + ")"
+
+
+def build_xpath(name: str, attrs: Optional[Dict[str, str]] = None) -> str:
+    """
+    将标签名和属性转换为与BeautifulSoup.find语义一致的XPath
+
+    Example:
+        build_xpath('div', {'id': 'Zoom'}) -> //div[@id='Zoom']
+        class为单个类名时匹配包含该类名的元素, 为多个类名时要求class属性完全一致
+    """
+    conditions = []
+    for attr, value in (attrs or {}).items():
+        if attr == "class" and " " not in value.strip():
+            conditions.append(f"contains(concat(' ', normalize-space(@class), ' '), {_xpath_literal(' ' + value.strip() + ' ')})")
+        elif attr == "class":
+            conditions.append(f"normalize-space(@class)={_xpath_literal(' '.join(value.split()))}")
+        else:
+            conditions.append(f"@{attr}={_xpath_literal(value)}")
+    predicate = "".join(f"[{condition}]" for condition in conditions)
+    return f"//{name}{predicate}"
+
+
+def element_matches(element: etree._Element, name: str, attrs: Optional[Dict[str, str]] = None) -> bool:
+    """判断lxml元素是否匹配标签名和属性, 规则与build_xpath一致"""
+    if element.tag != name:
+        return False
+    for attr, value in (attrs or {}).items():
+        actual = element.get(attr)
+        if actual is None:
+            return False
+        if attr == "class" and " " not in value.strip():
+            if value.strip() not in actual.split():
+                return False
+        elif attr == "class":
+            if " ".join(actual.split()) != " ".join(value.split()):
+                return False
+        elif actual != value:
+            return False
+    return True
+
+
+class TargetWatcher:
+    def __init__(self, name: str, attrs: Optional[Dict[str, str]] = None):
+        """
+        增量解析下载中的响应体, 检测目标标签(如正文所在的div)是否已经结束
+
+        按latin-1解析字节, 任何字节都能解码且不改变标签结构, 因此无需先确定页面编码;
+        相应地, 属性值含非ASCII字符的目标永远不会匹配, 此时会下载完整页面
+
+        Args:
+            name: 目标标签名, 如'div'
+            attrs: 目标标签属性, 如{'id': 'Zoom'}, 匹配规则与find_target一致
+        """
+        super(TargetWatcher, self).__init__()
+        self.name = name
+        self.attrs = attrs or {}
+        self.closed = False
+        # 只产出目标标签名的事件, 减少Python层遍历的元素数
+        self._parser = etree.HTMLPullParser(events=("start", "end"), tag=name, encoding="iso-8859-1")
+        self._target: Optional[etree._Element] = None
+
+    def feed(self, chunk: bytes) -> bool:
+        """
+        送入一段响应体字节
+
+        Returns:
+            目标标签是否已经结束, 结束后无需继续下载
+        """
+        if self.closed:
+            return True
+        self._parser.feed(chunk)
+        for event, element in self._parser.read_events():
+            if event == "start":
+                if self._target is None and element_matches(element, self.name, self.attrs):
+                    self._target = element
+            elif element is self._target:
+                self.closed = True
+                break
+        return self.closed
+
+
+@observe_parse
+def parse_document(html_text: str) -> Optional[etree._Element]:
+    """
+    使用lxml解析HTML文本, 返回文档根节点, 文档为空时返回None
+    """
+    return _parse_document(html_text)
+
+
+def _parse_document(html_text: str) -> Optional[etree._Element]:
+    try:
+        return lxml.html.document_fromstring(html_text)
+    except ValueError:
+        # 带有<?xml encoding=...?>声明的字符串不能直接解析, 转为utf-8字节后解析
+        return lxml.html.document_fromstring(html_text.encode("utf-8"), parser=_UTF8_HTML_PARSER)
+    except etree.ParserError:
+        return None
+
+
+def _find_target_by_xpath(html_text: str, name: str, attrs: Dict[str, str]) -> Optional[Tag]:
+    """lxml直接定位目标节点, 仅将该节点的子树转换为BeautifulSoup对象"""
+    root = _parse_document(html_text)
+    if root is None:
+        return None
+    nodes = root.xpath(build_xpath(name, attrs))
+    if not nodes:
+        return None
+    fragment = etree.tostring(nodes[0], encoding="unicode", method="html", with_tail=False)
+    return BeautifulSoup(fragment, "lxml").find(name, attrs=attrs) # type: ignore
+
+
+@observe_parse
+def find_target(html_text: str,
+                name: str,
+                attrs: Optional[Dict[str, str]] = None,
+                parser: Optional[str] = None,
+                fallback: Optional[bool] = None) -> Optional[Tag]:
+    """
+    只解析目标标签所在的子树并返回该标签
+    使用lxml时通过XPath直接定位节点, 其余解析器使用SoupStrainer过滤
+
+    Args:
+        html_text: 已解码的HTML字符串
+        name: 目标标签名, 如'div'
+        attrs: 目标标签属性, 如{'id': 'Zoom'}、{'class': 'art-con art-con-bottonmLine'}
+        parser: 解析器名称, 默认HTML_PARSER
+        fallback: 未找到目标时是否用html5lib重新解析整个文档, 默认读取环境变量HTML_PARSER_FALLBACK
+
+    Returns:
+        目标标签, 未找到时返回None
+    """
+    attrs = attrs or {}
+    if (parser or HTML_PARSER) == "lxml":
+        target = _find_target_by_xpath(html_text, name, attrs)
+    else:
+        soup = _parse_html(html_text, parse_only=SoupStrainer(name, attrs=attrs), parser=parser)
+        target = soup.find(name, attrs=attrs)
+    if fallback is None:
+        fallback = _fallback_enabled()
+    if target is None and fallback and (parser or HTML_PARSER) != FALLBACK_PARSER:
+        logger.info(f"未找到<{name} {attrs}>, 使用{FALLBACK_PARSER}重新解析")
+        target = _parse_html(html_text, parser=FALLBACK_PARSER).find(name, attrs=attrs)
+    return target # type: ignore
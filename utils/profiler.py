@@ -0,0 +1,123 @@
+"""
+按需开启的采样分析器: 定时采集参与本次爬取的线程的调用栈, 输出火焰图工具通用的折叠栈格式
+(每行为 分号分隔的调用栈 + 空格 + 采样次数, 可直接交给flamegraph.pl、speedscope等工具)
+"""
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Set
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005, max_depth: int = 128):
+        """
+        只采集通过profile_thread登记的线程, 同一进程中其他请求的线程不计入
+
+        Args:
+            interval: 采样间隔秒数
+            max_depth: 单个调用栈保留的最大层数, 超出时只保留最内层
+        """
+        super(SamplingProfiler, self).__init__()
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        # 线程id -> 登记次数, 同一线程可能嵌套登记(如爬虫线程中又同步执行抓取)
+        self._threads: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._labels: Dict[object, str] = {}
+
+    def add_thread(self, ident: int):
+        with self._lock:
+            self._threads[ident] = self._threads.get(ident, 0) + 1
+
+    def remove_thread(self, ident: int):
+        with self._lock:
+            count = self._threads.get(ident, 0) - 1
+            if count > 0:
+                self._threads[ident] = count
+            else:
+                self._threads.pop(ident, None)
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            # 以函数首行区分同名函数, 同一函数的不同行合并为一个节点; 分号是折叠栈的分隔符
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+            self._labels[code] = label
+        return label
+
+    def _sample(self):
+        with self._lock:
+            idents: Set[int] = set(self._threads)
+        if not idents:
+            return
+        frames = sys._current_frames()
+        for ident in idents:
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            self._stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        """折叠栈格式的采样结果, 按采样次数从多到少排列"""
+        return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+
+# 当前请求的分析器, 随上下文传递到爬虫线程与详情页抓取线程
+_current_profiler: ContextVar[Optional[SamplingProfiler]] = ContextVar("current_profiler", default=None)
+
+
+@contextmanager
+def profiling_scope(interval: float = 0.005) -> Iterator[SamplingProfiler]:
+    """在该作用域内启动采样分析器, 退出时停止采样"""
+    profiler = SamplingProfiler(interval=interval).start()
+    token = _current_profiler.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _current_profiler.reset(token)
+        profiler.stop()
+
+
+@contextmanager
+def profile_thread() -> Iterator[None]:
+    """
+    执行期间将当前线程登记到当前请求的分析器, 没有分析器时不做任何事
+    在线程池中执行任务时使用, 线程被复用执行其他请求时不会被采集
+    """
+    profiler = _current_profiler.get()
+    if profiler is None:
+        yield
+        return
+    ident = threading.get_ident()
+    profiler.add_thread(ident)
+    try:
+        yield
+    finally:
+        profiler.remove_thread(ident)
@@ -0,0 +1,311 @@
+"""
+按域名限速：令牌桶控制请求速率，AIMD控制器自适应调整并发数
+"""
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from .deadline import DeadlineExceeded
+from .metrics import metrics_registry
+
+
+logger = logging.getLogger(__name__)
+
+
+# 触发降速的HTTP状态码
+OVERLOAD_STATUS_CODES = {429, 503}
+
+
+class TokenBucket:
+    def __init__(self,
+                 rate: float = 2.0,
+                 burst: int = 4):
+        """
+        线程安全的令牌桶, 令牌不足时返回需要等待的秒数, 由调用方等待
+
+        Args:
+            rate: 每秒生成的令牌数, 即稳定状态下的请求速率
+            burst: 令牌桶容量, 即允许的瞬时突发请求数
+        """
+        super(TokenBucket, self).__init__()
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        预定一个令牌
+
+        Returns:
+            获得令牌前需要等待的秒数, 0表示可以立即请求
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            # 令牌可以为负数, 表示已被之后的请求预定
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._paused_until - now)
+
+    def pause(self, seconds: float):
+        """在seconds秒内不发放令牌, 用于遵守Retry-After"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def acquire(self):
+        """阻塞当前线程直到获得令牌"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+class AdaptiveConcurrency:
+    def __init__(self,
+                 name: str = "",
+                 initial: int = 2,
+                 min_limit: int = 1,
+                 max_limit: int = 8,
+                 latency_target: float = 3.0,
+                 error_threshold: float = 0.2,
+                 decrease_factor: float = 0.5):
+        """
+        AIMD并发控制器: 延迟与错误率正常时每轮并发数加1, 遇到429/503/超时或错误率过高时乘性减少
+
+        Args:
+            name: 控制器名称, 一般为域名, 用于日志
+            initial: 初始并发上限
+            min_limit: 并发上限的下限
+            max_limit: 并发上限的上限
+            latency_target: 响应耗时超过该秒数时不再增加并发
+            error_threshold: 错误率(指数滑动平均)超过该值时减少并发
+            decrease_factor: 减少并发时的乘数
+        """
+        super(AdaptiveConcurrency, self).__init__()
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.error_threshold = error_threshold
+        self.decrease_factor = decrease_factor
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self._in_flight = 0
+        self._error_rate = 0.0
+        self._latency = 0.0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def error_rate(self) -> float:
+        return self._error_rate
+
+    @property
+    def latency(self) -> float:
+        return self._latency
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """阻塞当前线程直到有空闲的并发名额, 超时返回False"""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._in_flight < self.limit, timeout=timeout):
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self):
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify()
+
+    def _set_limit(self, value: float, reason: str):
+        previous = self.limit
+        self._limit = min(max(value, self.min_limit), self.max_limit)
+        if self.limit != previous:
+            logger.info(f"{self.name}并发上限 {previous} -> {self.limit}({reason}), "
+                        f"错误率{self._error_rate:.2f}, 平均耗时{self._latency:.2f}秒")
+            self._condition.notify_all()
+
+    def record(self, latency: float, ok: bool = True, overloaded: bool = False):
+        """
+        记录一次请求结果并调整并发上限
+
+        Args:
+            latency: 请求耗时秒数
+            ok: 请求是否成功
+            overloaded: 是否收到429/503或请求超时
+        """
+        with self._condition:
+            failed = overloaded or not ok
+            self._error_rate = self._error_rate * 0.9 + (0.1 if failed else 0.0)
+            self._latency = latency if self._latency == 0 else self._latency * 0.8 + latency * 0.2
+            if overloaded:
+                self._set_limit(self._limit * self.decrease_factor, "服务端过载")
+            elif self._error_rate > self.error_threshold:
+                self._set_limit(self._limit * self.decrease_factor, "错误率过高")
+            elif ok and latency <= self.latency_target and self._in_flight >= self.limit - 1:
+                # 并发名额被充分使用时才增加, 每轮(约limit个请求)增加1
+                self._set_limit(self._limit + 1 / self._limit, "响应正常")
+
+
+class HostLimiter:
+    def __init__(self,
+                 host: str,
+                 bucket: TokenBucket,
+                 concurrency: AdaptiveConcurrency):
+        """单个域名的限速器, 组合令牌桶与并发控制器"""
+        super(HostLimiter, self).__init__()
+        self.host = host
+        self.bucket = bucket
+        self.concurrency = concurrency
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None) -> Iterator["HostLimiter"]:
+        """
+        在线程中等待并发名额与令牌, 请求结束后释放名额
+
+        Args:
+            timeout: 最长等待秒数, 一般为请求的剩余时限
+
+        Raises:
+            DeadlineExceeded: 在timeout内未获得名额或令牌
+        """
+        started_at = time.monotonic()
+        if not self.concurrency.acquire(timeout=None if timeout is None else max(timeout, 0)):
+            raise DeadlineExceeded(f"等待{self.host}并发名额")
+        try:
+            wait = self.bucket.reserve()
+            if timeout is not None and time.monotonic() - started_at + wait > timeout:
+                raise DeadlineExceeded(f"等待{self.host}限速令牌")
+            if wait > 0:
+                time.sleep(wait)
+            yield self
+        finally:
+            self.concurrency.release()
+
+    def record(self,
+               latency: float,
+               status_code: Optional[int] = None,
+               timeout: bool = False,
+               error: bool = False,
+               retry_after: Optional[float] = None):
+        """
+        记录请求结果
+
+        Args:
+            latency: 请求耗时秒数
+            status_code: HTTP状态码, 请求未得到响应时为None
+            timeout: 请求是否超时
+            error: 是否发生连接错误等其他失败
+            retry_after: 服务端返回的Retry-After秒数
+        """
+        overloaded = timeout or status_code in OVERLOAD_STATUS_CODES
+        ok = not error and not overloaded and (status_code is None or status_code < 500)
+        if retry_after:
+            self.bucket.pause(retry_after)
+            logger.info(f"{self.host}要求{retry_after:.0f}秒后重试, 暂停发放令牌")
+        self.concurrency.record(latency, ok=ok, overloaded=overloaded)
+
+    def snapshot(self) -> Dict[str, float]:
+        return {"rate": self.bucket.rate,
+                "burst": self.bucket.burst,
+                "limit": self.concurrency.limit,
+                "in_flight": self.concurrency.in_flight,
+                "error_rate": round(self.concurrency.error_rate, 3),
+                "latency": round(self.concurrency.latency, 3)}
+
+
+def _parse_host_rates(text: str) -> Dict[str, float]:
+    """解析"www.mot.gov.cn=1,www.mofcom.gov.cn=0.5"形式的按域名速率配置"""
+    rates: Dict[str, float] = {}
+    for item in text.split(","):
+        host, _, rate = item.partition("=")
+        if host.strip() and rate.strip():
+            rates[host.strip().lower()] = float(rate)
+    return rates
+
+
+class RateLimiterRegistry:
+    def __init__(self,
+                 rate: float = 2.0,
+                 burst: int = 30,
+                 initial_concurrency: int = 2,
+                 max_concurrency: int = 4,
+                 host_rates: Optional[Dict[str, float]] = None):
+        """
+        进程级限速器注册表, 每个域名一个HostLimiter
+
+        Args:
+            rate: 默认每秒请求数
+            burst: 令牌桶容量
+            initial_concurrency: 初始并发上限
+            max_concurrency: 并发上限的最大值
+            host_rates: 按域名覆盖的每秒请求数
+        """
+        super(RateLimiterRegistry, self).__init__()
+        self.rate = rate
+        self.burst = burst
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self.host_rates = host_rates or {}
+        self._limiters: Dict[str, HostLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, host: str) -> HostLimiter:
+        host = (host or "").lower()
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                rate = self.host_rates.get(host, self.rate)
+                limiter = HostLimiter(host,
+                                      TokenBucket(rate=rate, burst=self.burst),
+                                      AdaptiveConcurrency(name=host,
+                                                          initial=self.initial_concurrency,
+                                                          max_limit=self.max_concurrency))
+                self._limiters[host] = limiter
+                logger.info(f"{host}限速: {rate}次/秒, 突发{self.burst}, "
+                            f"并发上限{limiter.concurrency.limit}(最大{self.max_concurrency})")
+            return limiter
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """各域名当前的限速参数, 用于调优与监控"""
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {limiter.host: limiter.snapshot() for limiter in limiters}
+
+
+# 通过环境变量配置:
+#   RATE_LIMIT_RPS: 每个域名默认每秒请求数(默认2)
+#   RATE_LIMIT_BURST: 令牌桶容量(默认30, 可容纳一次爬取的列表页与全部详情页, 冷启动时不必按速率排队)
+#   RATE_LIMIT_HOSTS: 按域名覆盖速率, 如"www.mot.gov.cn=1,www.mofcom.gov.cn=0.5"
+#   FETCH_INITIAL_CONCURRENCY: 每个域名的初始并发数(默认2)
+#   FETCH_PER_HOST_LIMIT: 每个域名自适应并发的最大值(默认4)
+rate_limiter_registry = RateLimiterRegistry(rate=float(os.getenv("RATE_LIMIT_RPS", "2")),
+                                            burst=int(os.getenv("RATE_LIMIT_BURST", "30")),
+                                            initial_concurrency=int(os.getenv("FETCH_INITIAL_CONCURRENCY", "2")),
+                                            max_concurrency=int(os.getenv("FETCH_PER_HOST_LIMIT", "4")),
+                                            host_rates=_parse_host_rates(os.getenv("RATE_LIMIT_HOSTS", "")))
+
+
+def get_host_limiter(host: str) -> HostLimiter:
+    """获取域名对应的共享限速器"""
+    return rate_limiter_registry.get(host)
+
+
+def _limiter_gauge(key: str) -> Callable[[], Dict[Tuple[str, ...], float]]:
+    return lambda: {(host, ): item[key] for host, item in rate_limiter_registry.snapshot().items()}
+
+
+metrics_registry.gauge("crawler_host_concurrency_limit", "各域名当前的自适应并发上限", ("host",), callback=_limiter_gauge("limit"))
+metrics_registry.gauge("crawler_host_in_flight", "各域名正在进行的请求数", ("host",), callback=_limiter_gauge("in_flight"))
@@ -0,0 +1,117 @@
+"""
+单个请求的分阶段耗时: 限速等待(wait)、抓取(fetch)、解码(decode)、解析(parse)、提取(extract)、序列化(serialize)等
+计时器随上下文传递到爬虫线程与详情页抓取线程, 由API层输出为Server-Timing响应头与结构化日志
+"""
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class PhaseTimer:
+    def __init__(self):
+        """
+        累计各阶段的耗时与次数, 可被多个线程同时写入
+
+        阶段可以嵌套, 每个阶段只记录自身的耗时: 如提取(extract)过程中构建文档树的耗时计入parse, 不重复计入extract
+        并发抓取时各线程的耗时相加, 因此各阶段之和可能超过请求的总耗时
+        """
+        super(PhaseTimer, self).__init__()
+        self.started_at = time.perf_counter()
+        self._phases: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        # 每个线程当前所处的阶段栈, 元素为[阶段名, 开始时间, 子阶段耗时]
+        self._local = threading.local()
+
+    def add(self, name: str, seconds: float, count: int = 1):
+        """直接累加一个阶段的耗时"""
+        with self._lock:
+            phase = self._phases.get(name)
+            if phase is None:
+                self._phases[name] = [seconds, count]
+            else:
+                phase[0] += seconds
+                phase[1] += count
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        frame = [name, time.perf_counter(), 0.0]
+        stack.append(frame)
+        try:
+            yield
+        finally:
+            stack.pop()
+            elapsed = time.perf_counter() - frame[1]
+            self.add(name, elapsed - frame[2])
+            if stack:
+                stack[-1][2] += elapsed
+
+    def elapsed(self) -> float:
+        """从计时器创建到现在的秒数"""
+        return time.perf_counter() - self.started_at
+
+    def phases(self) -> Dict[str, Tuple[float, int]]:
+        """阶段名 -> (累计秒数, 次数), 按首次记录的顺序"""
+        with self._lock:
+            return {name: (seconds, int(count)) for name, (seconds, count) in self._phases.items()}
+
+    def server_timing(self, total: Optional[float] = None) -> str:
+        """
+        按Server-Timing响应头的格式输出各阶段耗时(毫秒)
+
+        Example:
+            fetch;dur=812.4;desc="12 calls", parse;dur=35.1;desc="13 calls", total;dur=905.0
+        """
+        items = [f'{name};dur={seconds * 1000:.1f};desc="{count} calls"' for name, (seconds, count) in self.phases().items()]
+        items.append(f"total;dur={(self.elapsed() if total is None else total) * 1000:.1f}")
+        return ", ".join(items)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """用于结构化日志的各阶段耗时, 单位为毫秒"""
+        return {name: {"ms": round(seconds * 1000, 1), "count": count} for name, (seconds, count) in self.phases().items()}
+
+
+# 当前请求的计时器, 没有请求上下文时(如调度器预爬取、直接运行爬虫)为None, 此时不记录
+_current_timer: ContextVar[Optional[PhaseTimer]] = ContextVar("current_timer", default=None)
+
+
+@contextmanager
+def timing_scope(timer: Optional[PhaseTimer] = None) -> Iterator[PhaseTimer]:
+    """在该作用域内(含复制了上下文的线程)记录的阶段耗时都写入timer"""
+    timer = timer if timer is not None else PhaseTimer()
+    token = _current_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _current_timer.reset(token)
+
+
+def current_timer() -> Optional[PhaseTimer]:
+    return _current_timer.get()
+
+
+def record_phase(name: str, seconds: float):
+    """将已测得的耗时计入当前请求的name阶段, 没有请求计时器时不做任何事"""
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.add(name, seconds)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    记录代码块属于name阶段的耗时, 没有请求计时器时不做任何事
+
+    Args:
+        name: 阶段名, 如wait、fetch、decode、parse、extract、serialize
+    """
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    with timer.phase(name):
+        yield
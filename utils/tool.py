@@ -1,17 +1,35 @@
 import requests
 from datetime import datetime, timedelta
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
+import os
 import time
 import random
+import threading
 from urllib.parse import urlparse, urljoin
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
 import logging
 
+from .http_cache import get_http_cache
+from .encoding import detect_encoding
+from .parser import TargetWatcher
+from .rate_limiter import get_host_limiter
+from .circuit_breaker import get_circuit_breaker, CircuitBreaker, CircuitOpenError
+from .deadline import DeadlineExceeded, check_deadline, clamp_timeout, remaining
+from .metrics import FETCH_DURATION, FETCH_RESPONSE_BYTES, FETCH_RESPONSES, FETCH_RETRIES, FETCH_FAILURES, CACHE_REQUESTS, DECODE_DURATION, FETCH_EARLY_STOPS, current_source
+from .timing import phase, record_phase
+
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# 流式读取响应体时每次读取的字节数
+STREAM_CHUNK_SIZE = 16 * 1024
+# 提前结束读取后, 剩余未读字节不超过该值时读完并保留keep-alive连接, 否则直接关闭连接
+STREAM_DRAIN_BYTES = int(os.getenv("STREAM_DRAIN_BYTES", str(32 * 1024)))
+
 # 默认请求头
 DEFAULT_HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -43,43 +61,187 @@ def join_urls(base_url, child_url):
     return urljoin(base_url, child_url)
 
 
-def get_html_from_url(url: Optional[str], 
-                     headers: Optional[Dict[str, str]] = None,
-                     timeout: int = 10,
-                     retries: int = 3,
-                     delay: float = 1.0) -> Optional[str]:
+# 表示页面不存在的HTTP状态码, 翻页或按日期访问历史列表时作为列表结束
+NOT_FOUND_STATUS_CODES = {404, 410}
+
+
+class FetchError(Exception):
+    """获取页面失败时抛出的异常, 记录出错的url、原因与最后一次响应的状态码"""
+    def __init__(self, url: Optional[str], reason: str, status_code: Optional[int] = None):
+        super(FetchError, self).__init__(f"{url}: {reason}")
+        self.url = url
+        self.reason = reason
+        self.status_code = status_code
+
+    @property
+    def not_found(self) -> bool:
+        """页面不存在, 而不是网络错误、超时或5xx等获取失败"""
+        return self.status_code in NOT_FOUND_STATUS_CODES
+
+
+def _release_early(response: requests.Response):
+    """提前结束读取后释放连接: 剩余内容较少时读完以复用连接, 否则关闭连接"""
+    content_length = response.headers.get("Content-Length", "")
+    left = int(content_length) - response.raw.tell() if content_length.isdigit() else None
+    if left is not None and left <= STREAM_DRAIN_BYTES:
+        response.raw.drain_conn()
+        response.raw.release_conn()
+    else:
+        response.close()
+
+
+def read_until_closed(response: requests.Response, until: Tuple[str, Dict[str, str]]) -> Tuple[bytes, bool]:
     """
-    通过requests库获取URL的HTML内容
+    流式读取响应体, 目标标签结束后停止读取
+
+    Args:
+        response: 以stream=True发出的请求的响应
+        until: 目标标签的(标签名, 属性), 如('div', {'id': 'Zoom'})
+
+    Returns:
+        (已读取的响应体, 是否提前结束), 页面中没有目标标签时读取完整响应体
+    """
+    watcher = TargetWatcher(*until)
+    chunks = []
+    try:
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            chunks.append(chunk)
+            if watcher.feed(chunk):
+                break
+        else:
+            return b"".join(chunks), False
+    except BaseException:
+        response.close()
+        raise
+    _release_early(response)
+    return b"".join(chunks), True
+
+
+def _decode(content: bytes, encoding: Optional[str]) -> str:
+    """与requests的Response.text一致, 无法识别的编码按utf-8宽松解码"""
+    try:
+        return str(content, encoding or "utf-8", errors="replace")
+    except (LookupError, TypeError):
+        return str(content, errors="replace")
+
+
+def fetch_html(url: Optional[str], 
+               headers: Optional[Dict[str, str]] = None,
+               timeout: int = 10,
+               retries: int = 3,
+               delay: float = 1.0,
+               until: Optional[Tuple[str, Dict[str, str]]] = None,
+               cache_response: bool = True) -> str:
+    """
+    通过requests库获取URL的HTML内容, 失败时抛出FetchError
     
     Args:
         url: 目标URL
-        headers: 请求头，默认为DEFAULT_HEADERS
-        timeout: 请求超时时间（秒）
-        retries: 重试次数
+        headers: 额外请求头，默认使用会话的请求头(DEFAULT_HEADERS+随机User-Agent)
+        timeout: 请求超时时间（秒）, 不超过当前请求的剩余时限
+        retries: 重试次数, 剩余时限不足以等待重试时提前结束
         delay: 重试延迟（秒）
+        until: 只需要页面中某个标签时传入其(标签名, 属性), 边下载边解析, 该标签结束后停止下载,
+               返回的HTML截止到该标签, 不写入HTTP缓存
+        cache_response: 是否将新获取的响应写入HTTP缓存, 之后不会再请求的页面(如已保存到文章存储的详情页)传入False
     
     Returns:
-        HTML内容字符串，如果失败返回None
+        HTML内容字符串
+    
+    Raises:
+        FetchError: url不合法或所有重试均失败
+        CircuitOpenError: 目标域名已熔断
+        DeadlineExceeded: 当前请求的时限已用完
     """
     if not is_valid_url(url=url): # type: ignore
         logger.error("请求失败: 输入的url不合法，请重新确认")
-        return None
-    else:
-        logger.info(f"正在请求{url}")
+        raise FetchError(url, "输入的url不合法")
+    # 每个请求都会经过的日志使用debug级别并延迟格式化, 未开启debug时几乎没有开销
+    logger.debug("正在请求%s", url)
+    
+    # 缓存仍在max-age有效期内时直接返回, 否则携带校验信息发起条件请求
+    http_cache = get_http_cache()
+    cached = http_cache.get(url) if http_cache is not None else None # type: ignore
+    if cached is not None and cached.is_fresh():
+        logger.debug("HTTP缓存命中: %s", url)
+        CACHE_REQUESTS.inc("http", "hit")
+        return cached.text
+    request_headers = dict(headers or {})
+    if cached is not None:
+        request_headers.update(cached.conditional_headers())
+    
+    # 复用目标域名的keep-alive会话, 未指定headers时使用会话自带的请求头
+    session = get_session(url) # type: ignore
     
-    if headers is None:
-        headers = DEFAULT_HEADERS.copy()
+    host = get_domain_from_url(url) or ""
+    # 按域名限速, 并根据响应耗时与错误自适应调整并发数
+    limiter = get_host_limiter(host)
+    # 源站连续失败时熔断, 熔断期间直接抛出CircuitOpenError, 不再重试
+    breaker = get_circuit_breaker(host)
     
+    last_error = "未知错误"
+    last_status: Optional[int] = None
     for attempt in range(retries):
         try:
-            logger.info(f"正在请求URL: {url} (尝试 {attempt + 1}/{retries})")
+            logger.debug("正在请求URL: %s (尝试 %d/%d)", url, attempt + 1, retries)
             
-            response = requests.get(
-                url,  # type: ignore
-                headers=headers, 
-                timeout=timeout,
-                verify=False  # 忽略SSL证书验证
-            )
+            check_deadline(f"未请求{url}")
+            breaker.before_call()
+            # 请求结果计入熔断器后为True, 否则(时限用完或其他异常)在finally中归还半开状态的探测名额
+            recorded = False
+            try:
+                # 等待限速名额与单次请求的超时都不超过剩余时限
+                wait_started_at = time.perf_counter()
+                with limiter.slot(timeout=remaining()):
+                    record_phase("wait", time.perf_counter() - wait_started_at)
+                    request_timeout = clamp_timeout(timeout, f"未请求{url}")
+                    started_at = time.monotonic()
+                    try:
+                        with phase("fetch"):
+                            response = session.get(
+                                rewrite_url(url),  # type: ignore
+                                headers=request_headers, 
+                                timeout=request_timeout,
+                                stream=until is not None
+                            )
+                            if until is not None and response.status_code == 200:
+                                content, truncated = read_until_closed(response, until)
+                            else:
+                                content, truncated = response.content, False
+                    except requests.exceptions.Timeout:
+                        if request_timeout < timeout: # type: ignore
+                            # 因剩余时限缩短的超时不计入源站故障
+                            raise DeadlineExceeded(f"请求{url}未完成")
+                        limiter.record(time.monotonic() - started_at, timeout=True)
+                        breaker.record_failure()
+                        recorded = True
+                        raise
+                    except requests.exceptions.RequestException:
+                        limiter.record(time.monotonic() - started_at, error=True)
+                        breaker.record_failure()
+                        recorded = True
+                        raise
+                    elapsed = time.monotonic() - started_at
+                    FETCH_DURATION.observe(elapsed, host)
+                    FETCH_RESPONSES.inc(host, str(response.status_code))
+                    limiter.record(elapsed, 
+                                   status_code=response.status_code, 
+                                   retry_after=parse_retry_after(response.headers.get("Retry-After")))
+                    breaker.record_status(response.status_code)
+                    recorded = True
+            except DeadlineExceeded:
+                FETCH_FAILURES.inc(host, "DeadlineExceeded")
+                raise
+            finally:
+                if not recorded:
+                    breaker.release()
+            
+            if response.status_code == 304 and cached is not None:
+                # 内容未变化, 使用缓存的响应体
+                http_cache.refresh(url, cached, response) # type: ignore
+                logger.debug("内容未变化(304)，使用HTTP缓存: %s", url)
+                CACHE_REQUESTS.inc("http", "revalidated")
+                return cached.text
             
             response.raise_for_status()  # 检查HTTP错误
             
@@ -87,24 +249,95 @@ def get_html_from_url(url: Optional[str],
             content_type = response.headers.get('content-type', '').lower()
             if 'text/html' not in content_type:
                 logger.warning(f"响应内容类型不是HTML: {content_type}")
-            response.encoding = response.apparent_encoding
-            html_content = response.text
-            logger.info(f"成功获取HTML内容，长度: {len(html_content)} 字符")
+            FETCH_RESPONSE_BYTES.observe(len(content), host)
+            if truncated:
+                logger.debug("目标标签已结束, 读取%d字节后停止下载: %s", len(content), url)
+                FETCH_EARLY_STOPS.inc(host)
+            # 依次使用响应头、<meta charset>、同域名记忆的编码, 都没有时才做统计检测
+            decode_started_at = time.perf_counter()
+            with phase("decode"):
+                encoding = detect_encoding(content, 
+                                           content_type=content_type, 
+                                           host=host)
+                html_content = _decode(content, encoding)
+            DECODE_DURATION.observe(time.perf_counter() - decode_started_at, current_source())
+            if http_cache is not None:
+                CACHE_REQUESTS.inc("http", "miss")
+                if not truncated and cache_response:
+                    # 截断的响应体不完整, 不能作为之后条件请求的缓存
+                    http_cache.store(url, response, content=content, encoding=encoding) # type: ignore
+            logger.debug("成功获取HTML内容，长度: %d 字符", len(html_content))
             return html_content
             
         except requests.exceptions.RequestException as e:
             logger.error(f"请求失败 (尝试 {attempt + 1}/{retries}): {e}")
+            last_error = f"{type(e).__name__}: {e}"
+            last_status = e.response.status_code if e.response is not None else None
+            FETCH_FAILURES.inc(host, type(e).__name__)
+            if last_status in NOT_FOUND_STATUS_CODES:
+                # 页面不存在, 重试也不会得到不同的结果
+                break
             
             if attempt < retries - 1:
                 # 添加随机延迟避免被ban
                 sleep_time = delay * (1 + random.random() * 0.5)
+                left = remaining()
+                if left is not None and left <= sleep_time:
+                    logger.info(f"剩余时限{max(left, 0):.2f}秒, 不再重试")
+                    break
                 logger.info(f"等待 {sleep_time:.2f} 秒后重试...")
+                FETCH_RETRIES.inc(host)
                 time.sleep(sleep_time)
             else:
                 logger.error(f"所有 {retries} 次尝试都失败了")
-                return None
     
-    return None
+    if breaker.state == CircuitBreaker.OPEN:
+        # 本次请求的失败触发了熔断, 调用方按源站不可用处理
+        raise CircuitOpenError(breaker.name, breaker.cooldown)
+    raise FetchError(url, last_error, status_code=last_status)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析Retry-After响应头, 支持秒数与HTTP日期两种格式"""
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value.strip())
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.now(retry_at.tzinfo)).total_seconds(), 0.0)
+
+
+def get_html_from_url(url: Optional[str], 
+                     headers: Optional[Dict[str, str]] = None,
+                     timeout: int = 10,
+                     retries: int = 3,
+                     delay: float = 1.0,
+                     until: Optional[Tuple[str, Dict[str, str]]] = None) -> Optional[str]:
+    """
+    通过requests库获取URL的HTML内容
+    
+    Args:
+        url: 目标URL
+        headers: 请求头，默认为DEFAULT_HEADERS
+        timeout: 请求超时时间（秒）
+        retries: 重试次数
+        delay: 重试延迟（秒）
+        until: 只需要的目标标签(标签名, 属性), 该标签结束后停止下载
+    
+    Returns:
+        HTML内容字符串，如果失败返回None
+    
+    Raises:
+        CircuitOpenError: 目标域名已熔断, 由调用方决定返回错误还是使用缓存
+        DeadlineExceeded: 当前请求的时限已用完
+    """
+    try:
+        return fetch_html(url=url, headers=headers, timeout=timeout, retries=retries, delay=delay, until=until)
+    except FetchError:
+        return None
 
 def is_valid_url(url: str) -> bool:
     """检查URL是否有效"""
@@ -122,12 +355,105 @@ def get_domain_from_url(url: str) -> Optional[str]:
     except:
         return None
 
-def create_session() -> requests.Session:
-    """创建并配置一个requests会话"""
+def parse_url_rewrites(text: str) -> List[Tuple[str, str]]:
+    """
+    解析"原地址前缀=替换前缀"形式的改写规则, 多条规则以逗号分隔
+
+    Example:
+        parse_url_rewrites("https://www.mot.gov.cn=http://127.0.0.1:8900/www.mot.gov.cn")
+        -> [("https://www.mot.gov.cn", "http://127.0.0.1:8900/www.mot.gov.cn")]
+    """
+    rules = []
+    for item in text.split(","):
+        prefix, _, replacement = item.partition("=")
+        if prefix.strip() and replacement.strip():
+            rules.append((prefix.strip(), replacement.strip()))
+    # 较长的前缀优先匹配
+    return sorted(rules, key=lambda rule: len(rule[0]), reverse=True)
+
+# 请求发出前的地址改写规则, 用于将爬虫指向本地回放源站做压测, 通过环境变量URL_REWRITE配置
+_url_rewrites: List[Tuple[str, str]] = parse_url_rewrites(os.getenv("URL_REWRITE", ""))
+
+def set_url_rewrites(rules: List[Tuple[str, str]]):
+    """替换进程内的地址改写规则, 传入空列表时关闭改写"""
+    global _url_rewrites
+    _url_rewrites = sorted(rules, key=lambda rule: len(rule[0]), reverse=True)
+
+def rewrite_url(url: str) -> str:
+    """
+    返回实际请求的地址
+    只改写发出的请求, 新闻url、缓存键、限速与熔断仍使用原地址, 因此各源站的限速与熔断在压测时保持独立
+    """
+    for prefix, replacement in _url_rewrites:
+        if url.startswith(prefix):
+            return replacement + url[len(prefix):]
+    return url
+
+def create_session(pool_size: int = 10) -> requests.Session:
+    """
+    创建并配置一个requests会话
+    
+    Args:
+        pool_size: 连接池保留的最大keep-alive连接数
+    """
     session = requests.Session()
-    session.headers.update(DEFAULT_HEADERS)
+    # 会话创建时固定一个随机User-Agent, 同一会话的请求头保持一致
+    session.headers.update(set_random_user_agent(DEFAULT_HEADERS))
+    session.verify = False  # 忽略SSL证书验证
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
     return session
 
+
+class SessionRegistry:
+    def __init__(self,
+                 pool_size: int = 10):
+        """
+        进程级会话注册表, 每个域名复用一个带连接池的keep-alive会话
+        
+        Args:
+            pool_size: 每个域名连接池保留的最大连接数
+        """
+        super(SessionRegistry, self).__init__()
+        self.pool_size = pool_size
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _host_key(url: str) -> str:
+        parsed_url = urlparse(url)
+        return f"{parsed_url.scheme}://{parsed_url.netloc}".lower()
+    
+    def get_session(self, url: str) -> requests.Session:
+        """获取url所属域名的共享会话, 不存在时创建"""
+        key = self._host_key(url)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = create_session(pool_size=self.pool_size)
+                self._sessions[key] = session
+                logger.debug(f"为{key}创建会话, 连接池大小: {self.pool_size}")
+        return session
+    
+    def reset(self, url: Optional[str] = None):
+        """关闭并移除会话, url为空时关闭全部; 下次请求会重建连接并更换User-Agent"""
+        with self._lock:
+            keys = [self._host_key(url)] if url else list(self._sessions.keys())
+            for key in keys:
+                session = self._sessions.pop(key, None)
+                if session is not None:
+                    session.close()
+
+
+# 连接池大小可通过环境变量HTTP_POOL_SIZE配置
+session_registry = SessionRegistry(pool_size=int(os.getenv("HTTP_POOL_SIZE", "10")))
+
+
+def get_session(url: str) -> requests.Session:
+    """获取url所属域名的共享keep-alive会话"""
+    return session_registry.get_session(url)
+
 def set_random_user_agent(headers: Dict[str, str]) -> Dict[str, str]:
     """设置随机User-Agent"""
     user_agents = [
@@ -149,9 +475,8 @@ if __name__ == "__main__":
     html = get_html_from_url(test_url)
     
     if html:
-        from bs4 import BeautifulSoup
-        soup = BeautifulSoup(html.encode('utf-8'), "html5lib")
-        ul_element = soup.find('ul', id="content")
+        from utils.parser import find_target
+        ul_element = find_target(html, 'ul', {'id': 'content'})
         print(f"HTML ul内容是：{ul_element}") # type: ignore
     else:
         print("获取HTML失败")